@@ -1,11 +1,17 @@
 """
 This script is used during development to compile ui and qrc files into python source files
+
+With --binary, qrc files are instead compiled into compressed binary .rcc files. Qt memory maps
+these when they are registered instead of the data being part of a (large) python module. A small
+<name>_rc.py module registering the .rcc file is still generated, so imports work the same way.
 """
 
 import subprocess
 import os
+import sys
 
 script_dir = os.path.dirname(os.path.realpath(__file__))
+binary = "--binary" in sys.argv[1:]
 uic = ""
 rcc = ""
 
@@ -34,9 +40,10 @@ if uic == "" and rcc == "":
     exit(1)
 
 # Remove old generated files
-for dirpath, dirnames, filenames in os.walk(os.path.join(script_dir, "app")):
+for dirpath, dirnames, filenames in os.walk(os.path.join(script_dir, "src")):
     for src_file in filenames:
-        if src_file.endswith('.py') and (src_file.startswith("ui_") or src_file.endswith("_rc.py")):
+        if (src_file.endswith('.py') and (src_file.startswith("ui_") or src_file.endswith("_rc.py"))) or \
+                src_file.endswith(".rcc"):
             print("[Deleting]: {0}".format(src_file))
             os.remove(os.path.join(dirpath, src_file))
 
@@ -54,8 +61,19 @@ for dirpath, dirnames, filenames in os.walk(os.path.join(script_dir, "ui")):
 for dirpath, dirnames, filenames in os.walk(os.path.join(script_dir, "res")):
     for src_file in filenames:
         if src_file.endswith('.qrc'):
-            dest_file = src_file.replace(".qrc", "") + "_rc.py"
+            name = src_file.replace(".qrc", "")
+            dest_file = name + "_rc.py"
             src_path = os.path.join(dirpath, src_file)
             dest_path = os.path.join(script_dir, "src", dest_file)
-            print("[Compiling]: {0} --> {1}".format(src_file, dest_file))
-            subprocess.run([rcc, src_path, "-o", dest_path])
+            if binary:
+                rcc_file = name + ".rcc"
+                print("[Compiling]: {0} --> {1}".format(src_file, rcc_file))
+                subprocess.run([rcc, "--binary", src_path, "-o", os.path.join(script_dir, "src", rcc_file)])
+                with open(dest_path, "w") as stub:
+                    stub.write("# Generated by compile.py --binary. Registers {0} (memory mapped by Qt).\n".format(rcc_file))
+                    stub.write("import os\n")
+                    stub.write("from PySide6.QtCore import QResource\n\n")
+                    stub.write("QResource.registerResource(os.path.join(os.path.dirname(os.path.abspath(__file__)), \"{0}\"))\n".format(rcc_file))
+            else:
+                print("[Compiling]: {0} --> {1}".format(src_file, dest_file))
+                subprocess.run([rcc, src_path, "-o", dest_path])
@@ -0,0 +1,78 @@
+"""
+PyInstaller bundle profiles. Used by windows/windows.spec and macos/macos.spec.
+The profile is chosen with the ARPIROBOT_BUNDLE_PROFILE environment variable.
+
+standard: Everything PyInstaller collects (same as before profiles existed)
+startup:  Optimized for cold start. Unused Qt modules, Qt plugins and translations are left out
+          (less to read from disk and map at start) and binaries are not UPX compressed (compressed
+          libraries must be decompressed every time the program starts). The build scripts compile
+          resources into memory mapped .rcc files for this profile (compile.py --binary).
+
+Both profiles use an unpacked (onedir) layout. A onefile bundle would have to extract itself to a
+temporary directory on every start.
+"""
+
+import os
+
+PROFILE = os.environ.get("ARPIROBOT_BUNDLE_PROFILE", "standard")
+if PROFILE not in ["standard", "startup"]:
+    raise ValueError(f"Unknown bundle profile '{PROFILE}' (standard or startup)")
+
+# The drive station only uses QtCore, QtGui, QtWidgets and QtNetwork
+UNUSED_MODULES = [
+    "PySide6.Qt3DAnimation", "PySide6.Qt3DCore", "PySide6.Qt3DExtras", "PySide6.Qt3DInput",
+    "PySide6.Qt3DLogic", "PySide6.Qt3DRender", "PySide6.QtBluetooth", "PySide6.QtCharts",
+    "PySide6.QtConcurrent", "PySide6.QtDataVisualization", "PySide6.QtDBus", "PySide6.QtDesigner",
+    "PySide6.QtHelp", "PySide6.QtHttpServer", "PySide6.QtLocation", "PySide6.QtMultimedia",
+    "PySide6.QtMultimediaWidgets", "PySide6.QtNetworkAuth", "PySide6.QtNfc", "PySide6.QtOpenGL",
+    "PySide6.QtOpenGLWidgets", "PySide6.QtPdf", "PySide6.QtPdfWidgets", "PySide6.QtPositioning",
+    "PySide6.QtPrintSupport", "PySide6.QtQml", "PySide6.QtQuick", "PySide6.QtQuick3D",
+    "PySide6.QtQuickControls2", "PySide6.QtQuickWidgets", "PySide6.QtRemoteObjects", "PySide6.QtScxml",
+    "PySide6.QtSensors", "PySide6.QtSerialBus", "PySide6.QtSerialPort", "PySide6.QtSpatialAudio",
+    "PySide6.QtSql", "PySide6.QtStateMachine", "PySide6.QtSvg", "PySide6.QtSvgWidgets",
+    "PySide6.QtTest", "PySide6.QtTextToSpeech", "PySide6.QtUiTools", "PySide6.QtWebChannel",
+    "PySide6.QtWebEngineCore", "PySide6.QtWebEngineQuick", "PySide6.QtWebEngineWidgets",
+    "PySide6.QtWebSockets", "PySide6.QtXml",
+    "tkinter", "unittest", "pydoc", "pydoc_data",
+]
+
+# Qt plugin directories needed by a widgets application (others are left out)
+# Image format plugins are not needed since the drive station only uses png (built into Qt)
+USED_PLUGIN_DIRS = ["platforms", "platformthemes", "styles", "iconengines", "generic"]
+
+# Qt libraries only needed by left out plugins (eg virtual keyboard and pdf image format)
+UNUSED_QT_LIBRARIES = ["Quick", "QuickWidgets", "Qml", "QmlModels", "QmlWorkerScript", "Pdf", "VirtualKeyboard"]
+
+
+def excludes():
+    return UNUSED_MODULES if PROFILE == "startup" else []
+
+
+def use_upx() -> bool:
+    return PROFILE != "startup"
+
+
+def _keep(dest: str) -> bool:
+    path = dest.replace("\\", "/")
+    parts = path.split("/")
+    if "translations" in parts:
+        # The drive station is not translated
+        return False
+    if "plugins" in parts:
+        idx = parts.index("plugins")
+        if idx + 1 < len(parts) - 1 and parts[idx + 1] not in USED_PLUGIN_DIRS:
+            return False
+    for part in parts:
+        name = part[3:] if part.startswith("lib") else part
+        for library in UNUSED_QT_LIBRARIES:
+            # Windows / Linux (Qt6Quick.dll, libQt6Quick.so.6) and macOS (QtQuick.framework)
+            if name.startswith(f"Qt6{library}.") or name == f"Qt{library}.framework":
+                return False
+    return True
+
+
+def filter_toc(toc):
+    # Removes unneeded Qt files from the binaries or datas of an Analysis
+    if PROFILE != "startup":
+        return toc
+    return [entry for entry in toc if _keep(entry[0])]
@@ -67,6 +67,8 @@ rm -rf dist/ArPiRobot-DriveStation || fail
 mkdir -p ./dist/ArPiRobot-DriveStation/
 
 cp -r ../src/ ./dist/ArPiRobot-DriveStation/
+# Compiled during install (for the python version installed there)
+find ./dist/ArPiRobot-DriveStation/src -type d -name __pycache__ -prune -exec rm -rf {} \;
 cp ../requirements.txt ./dist/ArPiRobot-DriveStation/
 cp -r ../res/icon.png ./dist/ArPiRobot-DriveStation/
 cp ../COPYING ./dist/ArPiRobot-DriveStation
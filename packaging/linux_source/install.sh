@@ -32,6 +32,11 @@ if ! python3 -m venv env; then
 fi
 source env/bin/activate
 python -m pip install -U -r requirements.txt > /dev/null
+
+# Compile python sources now. The install directory is not writable when the drive station runs
+# (not root), so otherwise every start would compile all sources again.
+echo "Compiling python sources"
+python -m compileall -q src
 deactivate
 
 # Desktop menu entry
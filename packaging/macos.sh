@@ -5,9 +5,11 @@
 ################################################################################
 
 PYTHON="python"
+PROFILE="standard"
 while true; do
   case "$1" in
     --python ) PYTHON="$2"; shift 2 ;;
+    --profile ) PROFILE="$2"; shift 2 ;;
     -- ) shift; break ;;
     * ) break ;;
   esac
@@ -43,7 +45,12 @@ VERSION=`head -1 ../res/version.txt`
 ################################################################################
 echo "**Compiling QT Resources and UI**"
 pushd ../ > /dev/null
-$PYTHON compile.py || fail
+if [ "$PROFILE" == "startup" ]; then
+    # Resources in memory mapped binary files instead of python modules
+    $PYTHON compile.py --binary || fail
+else
+    $PYTHON compile.py || fail
+fi
 popd > /dev/null
 
 
@@ -55,7 +62,7 @@ rm -rf macos/build/ || fail
 rm -rf macos/dist/ArPiRobot-DriveStation.app/ || fail
 rm -rf macos/dist/ArPiRobot-DriveStation/ || fail
 cd macos/
-pyinstaller macos.spec || fail
+ARPIROBOT_BUNDLE_PROFILE="$PROFILE" pyinstaller macos.spec || fail
 cd ..
 
 
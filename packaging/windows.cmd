@@ -2,9 +2,18 @@
 
 cd %~dp0
 
+rem Bundle profile (standard or startup, see bundle_profile.py)
+set ARPIROBOT_BUNDLE_PROFILE=standard
+if not "%~1"=="" set ARPIROBOT_BUNDLE_PROFILE=%~1
+
 echo **Compiling UI and Resources**
 cd ..
-python compile.py
+rem Startup profile: resources in memory mapped binary files instead of python modules
+if "%ARPIROBOT_BUNDLE_PROFILE%"=="startup" (
+    python compile.py --binary
+) else (
+    python compile.py
+)
 cd packaging
 
 echo **Creating PyInstaller Binary**
@@ -6,6 +6,15 @@ import os
 import sdl2dll
 sdl_dll_dir = os.path.dirname(sdl2dll.__file__)
 
+# Bundle profile (standard or startup, see bundle_profile.py)
+import sys
+sys.path.insert(0, os.path.join(SPECPATH, ".."))
+import bundle_profile
+
+# Binary resources (built by compile.py --binary)
+import glob
+rcc_files = [(path, ".") for path in glob.glob(os.path.join(SPECPATH, "..", "..", "src", "*.rcc"))]
+
 
 block_cipher = None
 
@@ -14,15 +23,17 @@ a = Analysis(['..\\..\\src\\main.py'],
              binaries=[],
              datas=[
                 (sdl_dll_dir, "sdl2dll")
-             ],
-             hiddenimports=[],
+             ] + rcc_files,
+             hiddenimports=["licenses_rc"],
              hookspath=[],
              runtime_hooks=[],
-             excludes=[],
+             excludes=bundle_profile.excludes(),
              win_no_prefer_redirects=False,
              win_private_assemblies=False,
              cipher=block_cipher,
              noarchive=False)
+a.binaries = bundle_profile.filter_toc(a.binaries)
+a.datas = bundle_profile.filter_toc(a.datas)
 pyz = PYZ(a.pure, a.zipped_data,
              cipher=block_cipher)
 exe = EXE(pyz,
@@ -33,7 +44,7 @@ exe = EXE(pyz,
           debug=False,
           bootloader_ignore_signals=False,
           strip=False,
-          upx=True,
+          upx=bundle_profile.use_upx(),
           console=False,
           icon='..\\..\\res\\icon.ico')
 coll = COLLECT(exe,
@@ -41,6 +52,6 @@ coll = COLLECT(exe,
                a.zipfiles,
                a.datas,
                strip=False,
-               upx=True,
+               upx=bundle_profile.use_upx(),
                upx_exclude=[],
                name='ArPiRobot-DriveStation')
@@ -10,6 +10,9 @@ class AboutDialog(QDialog):
         self.ui = Ui_AboutDialog()
         self.ui.setupUi(self)
 
+        # License text is only needed here, so it is not loaded at startup
+        import licenses_rc
+
         license_file = QFile(":/license_text.txt")
         if license_file.open(QFile.ReadOnly):
             self.ui.txt_license.setHtml(bytes(license_file.readAll()).decode())
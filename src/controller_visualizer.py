@@ -0,0 +1,156 @@
+from typing import List, Optional, Sequence, Tuple
+
+from PySide6.QtCore import QRect, QSize, Qt
+from PySide6.QtGui import QFont, QPainter, QPaintEvent, QResizeEvent
+from PySide6.QtWidgets import QStyle, QStyleOptionProgressBar, QWidget
+
+
+class ControllerVisualizer(QWidget):
+    """
+    Shows the full input state of one controller (axes, buttons and dpad) as progress bars.
+    A single custom painted widget. Only the bars whose values changed since the last frame
+    are repainted and nothing is repainted while the widget can't be seen.
+    """
+
+    AXIS_NAMES = ["LX", "LY", "RX", "RY", "L2", "R2"]
+    BUTTON_NAMES = ["A", "B", "X", "Y", "BACK", "GUIDE", "START", "L3", "R3", "L1", "R1"]
+
+    # (row, column) in the dpad grid for each dpad position number (0 = centered)
+    DPAD_CELLS = {0: (1, 1), 1: (0, 1), 3: (1, 2), 5: (2, 1), 7: (1, 0)}
+    DPAD_LABELS = {2: (0, 2), 4: (2, 2), 6: (2, 0), 8: (0, 0)}
+
+    # Bars filled for each dpad position number (diagonals fill both directions)
+    DPAD_FILLED = {0: (0,), 1: (1,), 2: (1, 3), 3: (3,), 4: (3, 5), 5: (5,), 6: (5, 7), 7: (7,), 8: (7, 1)}
+
+    MARGIN = 3
+    SPACING = 3
+
+    def __init__(self, parent: Optional[QWidget] = None):
+        super().__init__(parent)
+        self.__axes: Tuple[int, ...] = (0,) * len(self.AXIS_NAMES)
+        self.__buttons: Tuple[bool, ...] = (False,) * len(self.BUTTON_NAMES)
+        self.__dpad = 0
+
+        # Layout (recomputed on resize)
+        self.__title_rects: List[Tuple[QRect, str]] = []
+        self.__axis_rects: List[QRect] = []
+        self.__button_rects: List[QRect] = []
+        self.__dpad_rects = {}
+        self.__dpad_label_rects = {}
+
+    def minimumSizeHint(self) -> QSize:
+        row_height = self.fontMetrics().height()
+        return QSize(300, (len(self.AXIS_NAMES) + 1) * (row_height + self.SPACING) + 2 * self.MARGIN)
+
+    def is_showing(self) -> bool:
+        # Nothing can be seen if on a hidden tab or the window is minimized
+        return self.isVisible() and not self.window().isMinimized()
+
+    def set_state(self, axes: Sequence[int], buttons: Sequence[bool], dpad: int):
+        axes = tuple(axes)
+        buttons = tuple(buttons)
+
+        # Record the new state even if hidden so it is correct when next shown
+        old_axes, old_buttons, old_dpad = self.__axes, self.__buttons, self.__dpad
+        self.__axes, self.__buttons, self.__dpad = axes, buttons, dpad
+
+        if not self.is_showing():
+            return
+
+        # Repaint only the bars that changed
+        if axes != old_axes:
+            for i in range(len(axes)):
+                if axes[i] != old_axes[i]:
+                    self.update(self.__axis_rects[i])
+        if buttons != old_buttons:
+            for i in range(len(buttons)):
+                if buttons[i] != old_buttons[i]:
+                    self.update(self.__button_rects[i])
+        if dpad != old_dpad:
+            for pos in set(self.DPAD_FILLED.get(old_dpad, ())) | set(self.DPAD_FILLED.get(dpad, ())):
+                self.update(self.__dpad_rects[pos])
+
+    def clear_state(self):
+        self.set_state((0,) * len(self.AXIS_NAMES), (False,) * len(self.BUTTON_NAMES), 0)
+
+    ############################################################################
+    # Layout & Painting
+    ############################################################################
+
+    def resizeEvent(self, event: QResizeEvent):
+        super().resizeEvent(event)
+        self.__layout()
+
+    def __layout(self):
+        m = self.MARGIN
+        sp = self.SPACING
+        title_height = self.fontMetrics().height()
+        col_width = (self.width() - 2 * m - 2 * sp) // 3
+        top = m + title_height + sp
+        body_height = self.height() - top - m
+
+        def column_x(col: int) -> int:
+            return m + col * (col_width + sp)
+
+        def grid(col: int, rows: int, cols: int) -> List[List[QRect]]:
+            cell_w = (col_width - (cols - 1) * sp) // cols
+            cell_h = (body_height - (rows - 1) * sp) // rows
+            return [[QRect(column_x(col) + c * (cell_w + sp), top + r * (cell_h + sp), cell_w, cell_h)
+                     for c in range(cols)] for r in range(rows)]
+
+        self.__title_rects = [
+            (QRect(column_x(0), m, col_width, title_height), "Axes"),
+            (QRect(column_x(1), m, col_width, title_height), "Buttons"),
+            (QRect(column_x(2), m, col_width, title_height), "DPad"),
+        ]
+
+        self.__axis_rects = [row[0] for row in grid(0, len(self.AXIS_NAMES), 1)]
+
+        button_grid = grid(1, (len(self.BUTTON_NAMES) + 1) // 2, 2)
+        self.__button_rects = [button_grid[i // 2][i % 2] for i in range(len(self.BUTTON_NAMES))]
+
+        dpad_grid = grid(2, 3, 3)
+        self.__dpad_rects = {pos: dpad_grid[r][c] for pos, (r, c) in self.DPAD_CELLS.items()}
+        self.__dpad_label_rects = {pos: dpad_grid[r][c] for pos, (r, c) in self.DPAD_LABELS.items()}
+
+    def paintEvent(self, event: QPaintEvent):
+        painter = QPainter(self)
+        dirty = event.rect()
+        style = self.style()
+
+        def draw_bar(rect: QRect, minimum: int, maximum: int, value: int, text: str):
+            if not dirty.intersects(rect):
+                return
+            opt = QStyleOptionProgressBar()
+            opt.initFrom(self)
+            opt.state |= QStyle.State_Horizontal
+            opt.rect = rect
+            opt.minimum = minimum
+            opt.maximum = maximum
+            opt.progress = value
+            opt.text = text
+            opt.textVisible = True
+            opt.textAlignment = Qt.AlignCenter
+            style.drawControl(QStyle.CE_ProgressBar, opt, painter, self)
+
+        bold = QFont(self.font())
+        bold.setBold(True)
+        painter.setFont(bold)
+        for rect, title in self.__title_rects:
+            if dirty.intersects(rect):
+                painter.drawText(rect, Qt.AlignLeft | Qt.AlignVCenter, title)
+        painter.setFont(self.font())
+
+        for i, rect in enumerate(self.__axis_rects):
+            draw_bar(rect, -32768, 32767, self.__axes[i], f"{self.AXIS_NAMES[i]} ({i})")
+
+        for i, rect in enumerate(self.__button_rects):
+            draw_bar(rect, 0, 1, 1 if self.__buttons[i] else 0, f"{self.BUTTON_NAMES[i]} ({i})")
+
+        filled = self.DPAD_FILLED.get(self.__dpad, ())
+        for pos, rect in self.__dpad_rects.items():
+            draw_bar(rect, 0, 1, 1 if pos in filled else 0, str(pos))
+
+        for pos, rect in self.__dpad_label_rects.items():
+            if dirty.intersects(rect):
+                painter.drawText(rect, Qt.AlignCenter, str(pos))
@@ -0,0 +1,243 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from PySide6.QtCore import QAbstractListModel, QDir, QModelIndex, Qt, Signal
+
+from indicator_layouts import write_file_atomic
+
+import json
+
+
+class ControllerSlot:
+    """
+    One controller in the drive station's ordered controller list. A slot belongs to a physical
+    controller (identified by its key, see GamepadManager.device_key) and is kept while that
+    controller is unplugged, so it gets the same controller number when it is plugged back in.
+    """
+
+    # device_id of a slot whose controller is not connected
+    NO_DEVICE = -1
+
+    def __init__(self, key: str, name: str, device_id: int = NO_DEVICE):
+        self.key = key
+        self.name = name
+        self.device_id = device_id
+        self.active = False
+        self.index = -1
+        self.display = ""
+
+    @property
+    def connected(self) -> bool:
+        return self.device_id != self.NO_DEVICE
+
+    def set_index(self, idx: int):
+        # Display text is only rebuilt when the controller number changes
+        if idx != self.index:
+            self.index = idx
+            self.update_display()
+
+    def update_display(self):
+        if self.connected:
+            self.display = f"<p>({self.index}) <i>{self.name}</i></p>"
+        else:
+            self.display = f"<p>({self.index}) <i>{self.name}</i> (not connected)</p>"
+
+
+class ControllerRegistry(QAbstractListModel):
+    """
+    Ordered controller slots. A slot's position is the controller number sent to the robot.
+    Keeps a precomputed list of active (checked) controllers for the send path and a map
+    from SDL instance id to slot for constant time lookup.
+    Slot order is saved (by controller key) so controllers keep their numbers across unplugging
+    and restarting. An active slot whose controller is unplugged stays active and sends neutral
+    input (GamepadManager reads unknown devices as centered / released).
+    """
+
+    # Emitted whenever the list of active controllers changes
+    active_changed = Signal()
+
+    # Emitted if saving the slot order fails. Args: error message
+    save_failed = Signal(str)
+
+    def __init__(self, file_suffix: str = "", parent=None):
+        # file_suffix is added to the file name (separate slots for each robot session)
+        super().__init__(parent)
+        self.__SLOTS_FILE = QDir.homePath() + f"/.arpirobot/dscontrollers{file_suffix}.json"
+
+        self.__slots: List[ControllerSlot] = []
+        self.__by_device: Dict[int, ControllerSlot] = {}
+        self.__by_key: Dict[str, ControllerSlot] = {}
+        self.__active: List[Tuple[int, int]] = []
+        self.__load()
+
+    ############################################################################
+    # Registry
+    ############################################################################
+
+    @property
+    def active(self) -> List[Tuple[int, int]]:
+        # (controller number, device id) of each checked controller in order
+        return self.__active
+
+    def add(self, device_id: int, name: str, key: str) -> ControllerSlot:
+        # Connected controller. Reclaims the controller's slot if it has one.
+        slot = self.__by_key.get(key, None)
+        if slot is not None and not slot.connected:
+            slot.device_id = device_id
+            slot.name = name
+            slot.update_display()
+            self.__by_device[device_id] = slot
+            idx = self.index(slot.index)
+            self.dataChanged.emit(idx, idx, [Qt.DisplayRole])
+            if slot.active:
+                self.__update_active()
+            return slot
+
+        if slot is not None:
+            # Key in use by a connected controller (should not happen as keys are unique)
+            key = f"{key}#{device_id}"
+        slot = ControllerSlot(key, name, device_id)
+        row = len(self.__slots)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self.__slots.append(slot)
+        self.__by_device[device_id] = slot
+        self.__by_key[key] = slot
+        slot.set_index(row)
+        self.endInsertRows()
+        self.__save()
+        return slot
+
+    def remove(self, device_id: int) -> Optional[ControllerSlot]:
+        # Disconnected controller. Its slot is kept (and stays active) until it reconnects.
+        slot = self.__by_device.pop(device_id, None)
+        if slot is None:
+            return None
+        slot.device_id = ControllerSlot.NO_DEVICE
+        slot.update_display()
+        idx = self.index(slot.index)
+        self.dataChanged.emit(idx, idx, [Qt.DisplayRole])
+        if slot.active:
+            self.__update_active()
+        return slot
+
+    def forget(self, row: int) -> bool:
+        # Removes the slot of a controller that is not connected
+        if row < 0 or row >= len(self.__slots) or self.__slots[row].connected:
+            return False
+        slot = self.__slots[row]
+        self.beginRemoveRows(QModelIndex(), row, row)
+        del self.__slots[row]
+        del self.__by_key[slot.key]
+        self.endRemoveRows()
+        # Later controllers are renumbered
+        self.__renumber(row)
+        self.__update_active()
+        self.__save()
+        return True
+
+    def slot_for(self, device_id: int) -> Optional[ControllerSlot]:
+        return self.__by_device.get(device_id, None)
+
+    def slot_at(self, row: int) -> Optional[ControllerSlot]:
+        if row < 0 or row >= len(self.__slots):
+            return None
+        return self.__slots[row]
+
+    def device_at(self, row: int) -> Optional[int]:
+        # None if there is no slot at row or its controller is not connected
+        slot = self.slot_at(row)
+        if slot is None or not slot.connected:
+            return None
+        return slot.device_id
+
+    def __renumber(self, first_row: int):
+        # Update controller numbers (and displayed text) from first_row onward
+        for row in range(first_row, len(self.__slots)):
+            slot = self.__slots[row]
+            if slot.index != row:
+                slot.set_index(row)
+                idx = self.index(row)
+                self.dataChanged.emit(idx, idx, [Qt.DisplayRole])
+
+    def __update_active(self):
+        self.__active = [(slot.index, slot.device_id) for slot in self.__slots if slot.active]
+        self.active_changed.emit()
+
+    def __load(self):
+        # Saved slots start out not connected and inactive
+        try:
+            with open(self.__SLOTS_FILE, "r") as slots_file:
+                saved = json.load(slots_file)
+        except (OSError, ValueError):
+            return
+        if not isinstance(saved, list):
+            return
+        for item in saved:
+            if not isinstance(item, dict) or not isinstance(item.get("key", None), str) or item["key"] in self.__by_key:
+                continue
+            slot = ControllerSlot(item["key"], str(item.get("name", "")))
+            self.__slots.append(slot)
+            self.__by_key[slot.key] = slot
+            slot.set_index(len(self.__slots) - 1)
+
+    def __save(self):
+        # Few small writes (only when slots are added, removed or reordered)
+        data = json.dumps([{"key": slot.key, "name": slot.name} for slot in self.__slots], indent=4)
+        try:
+            QDir().mkpath(QDir.homePath() + "/.arpirobot")
+            write_file_atomic(self.__SLOTS_FILE, data.encode())
+        except OSError as e:
+            self.save_failed.emit(f"Unable to save controller order: {e}")
+
+    ############################################################################
+    # Model
+    ############################################################################
+
+    def rowCount(self, parent: QModelIndex = QModelIndex()) -> int:
+        if parent.isValid():
+            return 0
+        return len(self.__slots)
+
+    def data(self, index: QModelIndex, role: int = Qt.DisplayRole) -> Any:
+        if not index.isValid() or index.row() >= len(self.__slots):
+            return None
+        slot = self.__slots[index.row()]
+        if role == Qt.DisplayRole:
+            return slot.display
+        elif role == Qt.CheckStateRole:
+            return Qt.Checked if slot.active else Qt.Unchecked
+        return None
+
+    def setData(self, index: QModelIndex, value: Any, role: int = Qt.EditRole) -> bool:
+        if not index.isValid() or role != Qt.CheckStateRole:
+            return False
+        slot = self.__slots[index.row()]
+        slot.active = Qt.CheckState(value) == Qt.Checked
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        self.__update_active()
+        return True
+
+    def flags(self, index: QModelIndex) -> Qt.ItemFlags:
+        if not index.isValid():
+            # Dropping between items is allowed, dropping onto an item is not
+            return Qt.ItemIsDropEnabled
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable | Qt.ItemIsDragEnabled
+
+    def supportedDropActions(self) -> Qt.DropActions:
+        return Qt.MoveAction
+
+    def moveRows(self, source_parent: QModelIndex, source_row: int, count: int,
+                 destination_parent: QModelIndex, destination_child: int) -> bool:
+        # Used by the view for internal drag and drop reordering
+        if source_parent.isValid() or destination_parent.isValid() or count <= 0:
+            return False
+        if not self.beginMoveRows(QModelIndex(), source_row, source_row + count - 1, QModelIndex(), destination_child):
+            return False
+        moved = self.__slots[source_row:source_row + count]
+        del self.__slots[source_row:source_row + count]
+        insert_at = destination_child - count if destination_child > source_row else destination_child
+        self.__slots[insert_at:insert_at] = moved
+        self.endMoveRows()
+        self.__renumber(min(source_row, insert_at))
+        self.__update_active()
+        self.__save()
+        return True
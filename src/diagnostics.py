@@ -0,0 +1,300 @@
+from typing import Callable, Dict, List, Optional, Tuple
+
+from PySide6.QtCore import QTimer
+
+from metrics import metrics
+from util import logger
+
+import csv
+import json
+import platform
+import threading
+import time
+
+
+class TimerStats:
+    """
+    Firing statistics for one monitored timer
+    """
+    def __init__(self, name: str, timer: QTimer):
+        self.name = name
+        self.timer = timer
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.late_total_ms = 0.0
+        self.late_max_ms = 0.0
+        self.run_total_ms = 0.0
+        self.run_max_ms = 0.0
+        self.last_fire: Optional[float] = None
+
+    @property
+    def late_avg_ms(self) -> float:
+        return self.late_total_ms / self.count if self.count > 0 else 0.0
+
+    @property
+    def run_avg_ms(self) -> float:
+        return self.run_total_ms / self.count if self.count > 0 else 0.0
+
+
+class LoopMonitor:
+    """
+    Measures how late monitored QTimers fire (actual vs scheduled time), how long their handlers
+    take and the longest event loop stall along with the handler that most likely caused it.
+    """
+
+    # Stalls longer than this are logged to the DS log as they happen
+    STALL_LOG_THRESHOLD_MS = 100.0
+
+    def __init__(self):
+        self.__timers: Dict[str, TimerStats] = {}
+        self.__last_run_name = ""
+        self.__last_run_ms = 0.0
+        self.__last_stall_end = 0.0
+        self.__metric_stalls = metrics.counter("ds_event_loop_stalls_total", f"Event loop stalls over {self.STALL_LOG_THRESHOLD_MS:.0f} ms")
+        self.__metric_stall_max = metrics.gauge("ds_event_loop_stall_max_ms", "Longest event loop stall (ms) since start")
+        self.reset()
+
+    def reset(self):
+        for stats in self.__timers.values():
+            stats.reset()
+        self.longest_stall_ms = 0.0
+        self.longest_stall_cause = ""
+        self.stall_count = 0
+
+    def instrument(self, timer: QTimer, name: str, handler: Callable[[], None]) -> Callable[[], None]:
+        # Returns a wrapper for handler that records statistics. Connect the wrapper to timer.timeout.
+        stats = TimerStats(name, timer)
+        self.__timers[name] = stats
+        metric_fires = metrics.counter("ds_timer_fires_total", "Times a monitored timer fired", timer=name)
+        metric_late = metrics.counter("ds_timer_late_ms_total", "Total time (ms) a monitored timer fired after it was scheduled (event loop lag)", timer=name)
+
+        def wrapper():
+            start = time.perf_counter()
+            if stats.last_fire is not None and stats.timer.isActive():
+                # Scheduled time is one interval after the previous firing
+                late = max((start - stats.last_fire) * 1000.0 - stats.timer.interval(), 0.0)
+                stats.late_total_ms += late
+                metric_late.inc(late)
+                if late > stats.late_max_ms:
+                    stats.late_max_ms = late
+                if late > self.longest_stall_ms or late >= self.STALL_LOG_THRESHOLD_MS:
+                    self.__record_stall(name, late, start)
+            stats.last_fire = start
+            stats.count += 1
+            metric_fires.inc()
+
+            handler()
+
+            run = (time.perf_counter() - start) * 1000.0
+            stats.run_total_ms += run
+            if run > stats.run_max_ms:
+                stats.run_max_ms = run
+            self.__last_run_name = name
+            self.__last_run_ms = run
+        return wrapper
+
+    def __record_stall(self, late_timer: str, late_ms: float, now: float):
+        # If the most recent monitored handler ran for most of the stall it is the likely cause.
+        # Otherwise something outside the monitored timers blocked the event loop.
+        if self.__last_run_ms >= late_ms * 0.5:
+            cause = self.__last_run_name
+        else:
+            cause = "other event processing"
+
+        if late_ms > self.longest_stall_ms:
+            self.longest_stall_ms = late_ms
+            self.longest_stall_cause = cause
+        if late_ms > self.__metric_stall_max.value:
+            self.__metric_stall_max.set(late_ms)
+
+        # Every monitored timer fires late after the same stall. Only count and log it once.
+        stall_start = now - late_ms / 1000.0
+        is_new_stall = stall_start > self.__last_stall_end
+        self.__last_stall_end = now
+
+        if late_ms >= self.STALL_LOG_THRESHOLD_MS and is_new_stall:
+            self.stall_count += 1
+            self.__metric_stalls.inc()
+            logger.log_warning(f"Event loop stalled for {late_ms:.0f} ms ({late_timer} fired late, likely cause: {cause}).")
+
+    def timer_restarted(self, timer: QTimer):
+        # Call when a monitored timer is started again or its interval changes.
+        # The time since its last firing is not lateness.
+        for stats in self.__timers.values():
+            if stats.timer is timer:
+                stats.last_fire = None
+
+    def remove(self, timer: QTimer):
+        # Call when a monitored timer is no longer used (eg its session was closed)
+        self.__timers = {name: stats for name, stats in self.__timers.items() if stats.timer is not timer}
+
+    @property
+    def timer_stats(self) -> List[TimerStats]:
+        return list(self.__timers.values())
+
+    def summary(self) -> str:
+        lines = [
+            f"Longest stall: {self.longest_stall_ms:.1f} ms ({self.longest_stall_cause or 'none'})",
+            f"Stalls over {self.STALL_LOG_THRESHOLD_MS:.0f} ms: {self.stall_count}"
+        ]
+        for stats in self.__timers.values():
+            lines.append(
+                f"{stats.name} ({stats.timer.interval()} ms): fired {stats.count}, "
+                f"late avg {stats.late_avg_ms:.2f} ms / max {stats.late_max_ms:.1f} ms, "
+                f"handler avg {stats.run_avg_ms:.2f} ms / max {stats.run_max_ms:.1f} ms"
+            )
+        return "\n".join(lines)
+
+
+class LatencyHistogram:
+    """
+    Counts of latency samples in fixed buckets (ms). Bucket i holds samples <= BOUNDS[i]
+    (the last bucket holds everything larger than the last bound).
+    """
+
+    BOUNDS = [0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0, 128.0, 256.0]
+
+    def __init__(self, name: str):
+        self.name = name
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms: float):
+        i = 0
+        while i < len(self.BOUNDS) and ms > self.BOUNDS[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    @property
+    def avg_ms(self) -> float:
+        return self.total_ms / self.count if self.count > 0 else 0.0
+
+    def percentile(self, pct: float) -> float:
+        # Upper bound of the bucket holding the percentile (limited to the largest sample)
+        if self.count == 0:
+            return 0.0
+        target = self.count * pct
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self.BOUNDS[i], self.max_ms) if i < len(self.BOUNDS) else self.max_ms
+        return self.max_ms
+
+    def bucket_labels(self) -> List[str]:
+        return [f"<= {bound:g} ms" for bound in self.BOUNDS] + [f"> {self.BOUNDS[-1]:g} ms"]
+
+
+class InputLatencyMonitor:
+    """
+    Latency of controller input from the SDL event to the controller packet being sent, split into
+    event to encode (waiting for the send timer) and encode to sent (network manager and socket).
+    record may be called from the network thread.
+    """
+
+    # Width of the longest histogram bar in the summary
+    BAR_WIDTH = 40
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.event_to_encode = LatencyHistogram("Event to encode")
+        self.encode_to_sent = LatencyHistogram("Encode to sent")
+        self.event_to_sent = LatencyHistogram("Event to sent")
+
+    @property
+    def histograms(self) -> List[LatencyHistogram]:
+        return [self.event_to_encode, self.encode_to_sent, self.event_to_sent]
+
+    def reset(self):
+        with self.__lock:
+            for histogram in self.histograms:
+                histogram.reset()
+
+    def record(self, event_time: float, encode_time: float, sent_time: float):
+        # Times are time.perf_counter() values
+        with self.__lock:
+            self.event_to_encode.add(max(encode_time - event_time, 0.0) * 1000.0)
+            self.encode_to_sent.add(max(sent_time - encode_time, 0.0) * 1000.0)
+            self.event_to_sent.add(max(sent_time - event_time, 0.0) * 1000.0)
+
+    def summary(self) -> str:
+        with self.__lock:
+            lines = []
+            for histogram in self.histograms:
+                lines.append(
+                    f"{histogram.name}: {histogram.count} samples, avg {histogram.avg_ms:.2f} ms, "
+                    f"p50 {histogram.percentile(0.5):.4g} ms, p95 {histogram.percentile(0.95):.4g} ms, max {histogram.max_ms:.2f} ms")
+            total = self.event_to_sent
+            largest = max(total.counts)
+            if largest > 0:
+                for label, count in zip(total.bucket_labels(), total.counts):
+                    bar = "#" * max(round(count / largest * self.BAR_WIDTH), 1 if count > 0 else 0)
+                    lines.append(f"  {label:>12} {count:>7} {bar}")
+            return "\n".join(lines)
+
+    def export_csv(self, path: str):
+        # One row per bucket with the count for each histogram. Raises OSError.
+        with self.__lock:
+            rows: List[Tuple] = []
+            labels = self.event_to_sent.bucket_labels()
+            bounds = [f"{bound:g}" for bound in LatencyHistogram.BOUNDS] + ["inf"]
+            for i in range(len(labels)):
+                rows.append((bounds[i], *[histogram.counts[i] for histogram in self.histograms]))
+            names = [histogram.name for histogram in self.histograms]
+        with open(path, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["bucket_le_ms", *names])
+            writer.writerows(rows)
+
+
+def resident_memory_kb() -> int:
+    # Resident memory of this process (peak resident memory on macOS). 0 if not available.
+    system = platform.system()
+    try:
+        if system == "Linux":
+            with open("/proc/self/status", "r") as status_file:
+                for line in status_file:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1])
+        elif system == "Darwin":
+            import resource
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // 1024
+        elif system == "Windows":
+            import ctypes
+            import ctypes.wintypes
+
+            class ProcessMemoryCounters(ctypes.Structure):
+                _fields_ = [("cb", ctypes.wintypes.DWORD), ("PageFaultCount", ctypes.wintypes.DWORD),
+                            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+            counters = ProcessMemoryCounters()
+            counters.cb = ctypes.sizeof(counters)
+            process = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize // 1024
+    except (OSError, ValueError, AttributeError, ImportError):
+        pass
+    return 0
+
+
+def write_startup_report(path: str):
+    # Used by tools/startup_benchmark.py once the main window is shown
+    with open(path, "w") as report_file:
+        json.dump({"window_shown": time.time(), "rss_kb": resident_memory_kb()}, report_file)
+
+
+loop_monitor: LoopMonitor = LoopMonitor()
+input_latency: InputLatencyMonitor = InputLatencyMonitor()
@@ -0,0 +1,62 @@
+from PySide6.QtCore import QDir, QTimer
+from PySide6.QtWidgets import QDialog, QFileDialog
+from ui_diagnostics_dialog import Ui_DiagnosticsDialog
+from diagnostics import input_latency, loop_monitor
+from network import NetworkManager
+from util import Logger
+
+
+class DiagnosticsDialog(QDialog):
+    def __init__(self, parent, net_manager: NetworkManager, log: Logger):
+        super().__init__(parent)
+        self.net_manager = net_manager
+        self.log = log
+
+        self.ui = Ui_DiagnosticsDialog()
+        self.ui.setupUi(self)
+
+        self.ui.btn_reset.clicked.connect(self.reset_stats)
+        self.ui.btn_log.clicked.connect(self.log_stats)
+        self.ui.btn_export_latency.clicked.connect(self.export_latency)
+
+        # Stats are only gathered into text while the dialog is open
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.refresh_timer.start(500)
+        self.refresh()
+
+    def summary(self) -> str:
+        return "\n".join([
+            loop_monitor.summary(),
+            f"Net table send queue: {self.net_manager.nt_send_queue_depth} frames, "
+            f"{self.net_manager.nt_bytes_unsent} bytes unsent, "
+            f"{self.net_manager.nt_superseded} values superseded",
+            f"Disable latency (press to sent): last {self.net_manager.disable_latency_ms:.2f} ms, "
+            f"max {self.net_manager.disable_latency_max_ms:.2f} ms, "
+            f"controller port disable {'on' if self.net_manager.udp_disable_ok else 'off'}",
+            "",
+            "Controller input latency (SDL event to packet sent):",
+            input_latency.summary()
+        ])
+
+    def refresh(self):
+        self.ui.txt_stats.setPlainText(self.summary())
+
+    def reset_stats(self):
+        loop_monitor.reset()
+        input_latency.reset()
+        self.refresh()
+
+    def log_stats(self):
+        for line in self.summary().split("\n"):
+            self.log.log_info(line)
+
+    def export_latency(self):
+        path, _ = QFileDialog.getSaveFileName(self, self.tr("Export Input Latency"), QDir.homePath() + "/ds-input-latency.csv", self.tr("CSV Files (*.csv)"))
+        if path == "":
+            return
+        try:
+            input_latency.export_csv(path)
+            self.log.log_info(f"Input latency histogram saved to '{path}'")
+        except OSError as e:
+            self.log.log_error(f"Unable to save input latency histogram: {e}")
@@ -1,49 +1,30 @@
-from typing import Any, Callable, Dict, Optional
+from typing import Dict, List, Optional
 
-from PySide6.QtGui import QAction, QCloseEvent, QColor,  QFont, QSyntaxHighlighter, QTextCharFormat, QTextDocument, QColor, QPalette, QIcon
+from PySide6.QtGui import QAction, QActionGroup, QCloseEvent, QColor,  QFont, QSyntaxHighlighter, QTextCharFormat, QTextCursor, QTextDocument, QColor, QPalette, QIcon
 from PySide6.QtWidgets import QApplication
 from sdl2.gamecontroller import SDL_CONTROLLER_AXIS_LEFTY, SDL_CONTROLLER_AXIS_TRIGGERLEFT, SDL_CONTROLLER_AXIS_TRIGGERRIGHT, SDL_CONTROLLER_BUTTON_BACK, SDL_CONTROLLER_BUTTON_DPAD_DOWN, SDL_CONTROLLER_BUTTON_DPAD_RIGHT, SDL_CONTROLLER_BUTTON_DPAD_UP, SDL_CONTROLLER_BUTTON_GUIDE, SDL_CONTROLLER_BUTTON_RIGHTSHOULDER, SDL_CONTROLLER_BUTTON_START
 
-from gamepad import GamepadManager
+from gamepad import GamepadManager, InputBackend
 from settings_dialog import SettingsDialog
-from PySide6.QtWidgets import QMainWindow, QLabel, QListWidgetItem, QDialog, QInputDialog, QLineEdit, QProgressBar
-from PySide6.QtCore import QFile, QIODevice, QModelIndex, QRegularExpression, QTimer, Qt, QRect, QDir
+from PySide6.QtWidgets import QMainWindow, QLabel, QDialog, QInputDialog, QLineEdit, QMenu, QTextEdit
+from PySide6.QtCore import QEvent, QFile, QIODevice, QModelIndex, QPoint, QRegularExpression, QTimer, Qt, QRect, Signal
 
 from indicator_widget import IndicatorWidget
+from indicator_layouts import IndicatorLayoutStore, IndicatorData
+from controllers import ControllerRegistry
 from ui_drive_station import Ui_DriveStationWindow
-from util import HTMLDelegate, settings_manager, logger
+from util import HTMLDelegate, Logger, settings_manager
 from network import NetworkManager
+from network_thread import ThreadedNetworkManager
 from about_dialog import AboutDialog
+from diagnostics import loop_monitor
+from diagnostics_dialog import DiagnosticsDialog
+from refresh import RefreshScheduler
+from log_collapse import LogCollapser
 
-import json
-import sdl2
 import math
-
-
-class ControllerListItem(QListWidgetItem):
-    def __init__(self, name: str, handle: int, index_getter: Callable[['ControllerListItem'], int]):
-        super().__init__()
-        self.name = name
-        self.handle = handle
-        self.checked = False
-        self.__index_getter = index_getter
-
-    def data(self, role: int) -> Any:
-        if role == Qt.DisplayRole:
-            idx = self.__index_getter(self)
-            return f"<p>({idx}) <i>{self.name}</i></p>"
-        elif role == Qt.CheckStateRole:
-            return self.checked
-        return super().data(role)
-
-    def setData(self, role: int, value: Any):
-        if role == Qt.CheckStateRole:
-            self.checked = value
-        else:
-            super().setData(role, value)
-
-    def flags(self) -> Qt.ItemFlags:
-        return Qt.ItemIsDropEnabled | Qt.ItemIsEnabled | Qt.ItemIsEnabled | Qt.ItemIsSelectable | Qt.ItemIsUserCheckable
+import re
+import time
 
 
 class LogHighlighter(QSyntaxHighlighter):
@@ -115,12 +96,39 @@ class DriveStationWindow(QMainWindow):
     MSG_STATE_DISABLED = "Robot disabled."
     MSG_STATE_ENABLED = "Robot enabled."
 
+    # Larger fonts setting scale
+    LARGER_FONT_SCALE = 1.2
+
     ############################################################################
     # UI & Navigation
     ############################################################################
 
-    def __init__(self, parent=None) -> None:
+    # Emitted when the window is closed
+    closed = Signal()
+
+    # Emitted when the user asks for a window for another robot. Args: robot address
+    new_session_requested = Signal(str)
+
+    # Sessions created so far (numbers sessions)
+    __session_count = 0
+
+    # Application font before the font size setting was applied (the application font is replaced
+    # when the setting changes, so sizes are always computed from this one)
+    __base_font: Optional[QFont] = None
+
+    def __init__(self, gamepad_manager: Optional[InputBackend] = None, robot_address: Optional[str] = None, parent=None) -> None:
+        # A window is one robot session. Without a gamepad manager the window has its own (and sends
+        # controller data itself). Otherwise the owner of the gamepad manager calls send_controller_data.
+        # The primary session (no robot_address) uses the robot address from settings.
         super().__init__(parent)
+        self.is_primary = robot_address is None
+        self.owns_gamepad_manager = gamepad_manager is None
+        self.session_number = DriveStationWindow.__session_count
+        DriveStationWindow.__session_count += 1
+
+        # This session's log (DS messages from this window and its network manager go here)
+        self.log = Logger()
+        self.log.set_ds(self)
 
         # UI Setup
         self.ui = Ui_DriveStationWindow()
@@ -132,6 +140,8 @@ class DriveStationWindow(QMainWindow):
             ver = bytes(version_file.readLine()).decode().replace("\n", "").replace("\r", "")
             self.setWindowTitle(self.windowTitle() + " v" + ver)
         version_file.close()
+        if not self.is_primary:
+            self.setWindowTitle(self.windowTitle() + " - " + robot_address)
 
         # Configure label for permanent status bar message
         # This is not supported in QT Designer, so done in code
@@ -146,56 +156,129 @@ class DriveStationWindow(QMainWindow):
         self.ds_log_highlighter = LogHighlighter(self.ui.txt_ds_log.document())
         self.robot_log_highlighter = LogHighlighter(self.ui.txt_robot_log.document())
 
-        # Timer to periodically update the bars for the selected controller
+        # Timer to periodically update the UI (controller bars, logs, indicators, battery)
+        # Rate depends on whether the window can be seen (see RefreshScheduler)
+        # Timer names are unique per session (several sessions can use the same robot address)
         self.controller_status_timer = QTimer()
-        self.controller_status_timer.timeout.connect(self.update_controller_bars)
+        self.refresh_scheduler = RefreshScheduler(self, self.controller_status_timer, self.refresh_ui)
+        status_timer_name = "controller_status_timer" if self.is_primary else \
+            f"controller_status_timer (session {self.session_number}: {robot_address})"
+        self.controller_status_timer.timeout.connect(loop_monitor.instrument(
+            self.controller_status_timer, status_timer_name, self.refresh_scheduler.tick))
 
         # Timer to send controller data to the robot
-        self.controller_send_timer = QTimer()
-        self.controller_send_timer.timeout.connect(self.send_controller_data)
+        # (only with its own gamepad manager, otherwise the owner of the gamepad manager sends)
+        self.controller_send_timer: Optional[QTimer] = None
+        if self.owns_gamepad_manager:
+            self.controller_send_timer = QTimer()
+            self.controller_send_timer.timeout.connect(loop_monitor.instrument(
+                self.controller_send_timer, "controller_send_timer", self.send_controller_data))
 
         # Non-UI element variables
         self.voltage: float = 0.0
-        self.net_manager = NetworkManager()
-        self.gamepad_manager = GamepadManager(mappings_file=":/gamecontrollerdb.txt")
+        self.robot_address = settings_manager.robot_address if self.is_primary else robot_address
+        if settings_manager.network_thread:
+            self.net_manager = ThreadedNetworkManager(self.log, self, str(self.session_number))
+        else:
+            self.net_manager = NetworkManager(self.log, self, str(self.session_number))
+        if self.owns_gamepad_manager:
+            self.gamepad_manager: InputBackend = GamepadManager(mappings_file=":/gamecontrollerdb.txt")
+        else:
+            self.gamepad_manager = gamepad_manager
+        # Other robots have their own controller order and layout files
+        session_file_suffix = "" if self.is_primary else "-" + re.sub(r"[^A-Za-z0-9_.-]", "_", robot_address)
+        self.controllers = ControllerRegistry(session_file_suffix, self)
+        self.controllers.save_failed.connect(self.log.log_warning)
         self.indicators: Dict[str, IndicatorWidget] = {}
 
+        # Actions in the "Add from robot" menu by key
+        self.robot_menu_actions: Dict[str, QAction] = {}
+
+        # Hidden indicator widgets kept for reuse (switching layouts doesn't recreate widgets)
+        self.indicator_pool: List[IndicatorWidget] = []
+
+        # Named indicator layouts (saved as indicators change)
+        self.layout_store = IndicatorLayoutStore(self.indicator_layout_data, session_file_suffix, self)
+        self.layout_store.save_failed.connect(self.log.log_warning)
+        self.layout_actions = QActionGroup(self)
+        self.layout_actions.triggered.connect(lambda action: self.switch_layout(action.text()))
+
+        # Visual updates waiting for the next UI frame
+        # (log lines are collapsed when repeated)
+        self.ds_log_collapser = LogCollapser()
+        self.robot_log_collapser = LogCollapser()
+        self.pending_nt: Dict[str, str] = {}
+        self.pending_voltage: Optional[float] = None
+
+        self.diagnostics_dialog: Optional[DiagnosticsDialog] = None
+
         # Signal / slot setup
+        self.ui.btn_disable.pressed.connect(self.disable_pressed)
         self.ui.btn_disable.clicked.connect(self.disable_clicked)
         self.ui.btn_enable.clicked.connect(self.enable_clicked)
         self.ui.btn_settings.clicked.connect(self.open_settings)
         self.ui.act_about.triggered.connect(self.open_about)
+        self.ui.act_diagnostics.triggered.connect(self.open_diagnostics)
+        self.ui.act_new_session.triggered.connect(self.request_new_session)
         self.ui.act_add_indicator.triggered.connect(self.add_indicator)
         self.ui.act_clear_indicators.triggered.connect(self.clear_indicators)
+        self.ui.act_save_layout_as.triggered.connect(self.save_layout_as)
+        self.ui.act_delete_layout.triggered.connect(self.delete_layout)
 
         self.ui.lst_controllers.viewport().installEventFilter(self)
+        self.ui.lst_controllers.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.ui.lst_controllers.customContextMenuRequested.connect(self.controller_context_menu)
 
         self.net_manager.nt_data_changed.connect(self.nt_data_changed)
         self.net_manager.state_changed.connect(self.state_changed)
         self.net_manager.nt_sync_started.connect(lambda: self.ui.pnl_net_table.setEnabled(False))
         self.net_manager.nt_sync_finished.connect(lambda: self.ui.pnl_net_table.setEnabled(True))
 
+        # Controller list is a view of the controller registry
+        self.ui.lst_controllers.setModel(self.controllers)
+
+        # Selecting a controller or showing the controller tab starts bar updates
+        self.ui.lst_controllers.selectionModel().selectionChanged.connect(self.refresh_scheduler.request_frame)
+        self.ui.tabs.currentChanged.connect(self.refresh_scheduler.request_frame)
+
         self.gamepad_manager.connected.connect(self.gamepad_connected)
         self.gamepad_manager.disconnected.connect(self.gamepad_disconnected)
 
-        # On some systems, fusion theme will only repaint progress bar every several pixels, leading to choppy motion
-        # To fix this, force a repaint to happen every time the value changes
-        self.force_instant_pbar_updates()
+        # Apply settings as they change
+        if self.is_primary:
+            settings_manager.robot_address_changed.connect(self.set_robot_address)
+            settings_manager.larger_fonts_changed.connect(lambda larger_fonts: self.__set_font_size())
+            settings_manager.network_thread_changed.connect(
+                lambda network_thread: self.log.log_info("Network thread setting will apply after restarting the drive station."))
+        # Bound methods (not lambdas) so closed sessions are disconnected when their window is deleted
+        settings_manager.vbat_main_changed.connect(self.set_vbat_main)
+        settings_manager.binary_net_table_changed.connect(self.set_binary_net_table)
+        settings_manager.stall_timeout_changed.connect(self.set_stall_timeout)
 
         # Configure initial State
+        self.net_manager.use_binary_nt = settings_manager.binary_net_table
+        self.net_manager.stall_timeout = settings_manager.stall_timeout
         self.load_indicators()
         self.set_battery_voltage(0, settings_manager.vbat_main)
         self.set_robot_program_good(True)
 
         # Start gamepad and network managers
-        self.gamepad_manager.start()
-        QTimer.singleShot(1000, lambda: self.net_manager.set_robot_address(settings_manager.robot_address))
+        if self.owns_gamepad_manager:
+            self.gamepad_manager.start()
+        else:
+            # Controllers connected before this session was opened
+            for device_id, name in self.gamepad_manager.devices():
+                self.gamepad_connected(device_id, name)
+        QTimer.singleShot(1000, lambda: self.net_manager.set_robot_address(self.robot_address))
 
         # Start after gamepad manager
-        self.controller_status_timer.start(16) # ~ 60 updates / second
-        self.controller_send_timer.start(20)
+        self.refresh_scheduler.request_frame()
+        if self.owns_gamepad_manager:
+            self.controller_send_timer.start(20)
 
-        self.__set_font_size()
+        if self.is_primary:
+            # Font size is application wide
+            self.__set_font_size()
         self.__on_color_change()
 
     def __on_color_change(self):
@@ -292,50 +375,56 @@ class DriveStationWindow(QMainWindow):
         self.ui.btn_disable.setStyleSheet("color: {};".format(color_disable_btn))
         self.ui.btn_enable.setStyleSheet("color: {};".format(color_enable_btn))
 
-        # All indicators for network table
-        for ind in self.indicators.values():
-            ind.setStyleSheet("""
-            IndicatorWidget{{
-                
-            }}
-            IndicatorWidget:focus{{
-                border: 1px solid {text_color};
-                border-radius: 2px;
-            }}
-            """.format(
-                text_color=color_text
-            ))
+        # Indicators for network table paint their focus border from the palette (see IndicatorWidget)
 
     def __set_font_size(self):
-        size = QFont().pointSizeF()
+        # Replaces the application font (no stylesheet rule, so nothing is repolished and
+        # changing the setting repeatedly doesn't accumulate anything)
+        if DriveStationWindow.__base_font is None:
+            DriveStationWindow.__base_font = QApplication.font()
+        font = QFont(DriveStationWindow.__base_font)
         if settings_manager.larger_fonts:
-            size *= 1.2
-        app = QApplication.instance()
-        app.setStyleSheet("{0}\n{1}".format(app.styleSheet(), "*{{font-size: {0}pt}}".format(size)))
+            if font.pointSizeF() > 0:
+                font.setPointSizeF(font.pointSizeF() * self.LARGER_FONT_SCALE)
+            else:
+                font.setPixelSize(round(font.pixelSize() * self.LARGER_FONT_SCALE))
+        QApplication.setFont(font)
 
 
+    def changeEvent(self, event: QEvent):
+        super().changeEvent(event)
+        if event.type() == QEvent.FontChange and hasattr(self, "ui"):
+            # Widgets styled by a stylesheet keep the font they were polished with. Setting the
+            # (few) stylesheets again makes them use the new application font.
+            self.__on_color_change()
+
     def closeEvent(self, event: QCloseEvent):
-        self.save_indicators()
+        self.layout_store.save_now(blocking=True)
+        settings_manager.flush()
         self.net_manager.stop()
-        self.gamepad_manager.stop()
+        if self.owns_gamepad_manager:
+            self.gamepad_manager.stop()
+
+        # Closed sessions don't leave timers behind in diagnostics
+        self.controller_status_timer.stop()
+        loop_monitor.remove(self.controller_status_timer)
+        if self.controller_send_timer is not None:
+            self.controller_send_timer.stop()
+            loop_monitor.remove(self.controller_send_timer)
+        self.closed.emit()
 
     def open_settings(self):
-        dialog = SettingsDialog(self)
+        dialog = SettingsDialog(self.robot_address, self)
         res = dialog.exec()
         if res == QDialog.Accepted:
-            old_address = settings_manager.robot_address
-
+            # Changed settings are applied by the settings_manager signal handlers
             dialog.save_settings()
 
-            # Disconnect if robot address changed
-            if settings_manager.robot_address != old_address:
-                self.net_manager.set_robot_address(settings_manager.robot_address)
-
-            # Update main battery voltage (but don't change current voltage)
-            self.set_battery_voltage(self.voltage, settings_manager.vbat_main)
-
-            # Support larger fonts
-            self.__set_font_size()
+            # Robot address is per session (the primary session's is saved in settings)
+            if self.is_primary:
+                settings_manager.robot_address = dialog.robot_address
+            elif dialog.robot_address != self.robot_address:
+                self.set_robot_address(dialog.robot_address)
 
             # Theme has changed. Re-apply syntax highlighting to logs
             self.ds_log_highlighter.construct_format_from_theme()
@@ -344,132 +433,156 @@ class DriveStationWindow(QMainWindow):
             self.robot_log_highlighter.rehighlight()
 
 
+    def set_robot_address(self, robot_address: str):
+        self.robot_address = robot_address
+        self.net_manager.set_robot_address(robot_address)
+
+    def request_new_session(self):
+        robot_address, ok = QInputDialog.getText(self, self.tr("New Robot Session"), self.tr("Robot address:"), QLineEdit.Normal)
+        robot_address = robot_address.strip()
+        if ok and robot_address != "":
+            self.new_session_requested.emit(robot_address)
+
+    def set_vbat_main(self, vbat_main: float):
+        self.set_battery_voltage(self.voltage, vbat_main)
+
+    def set_stall_timeout(self, stall_timeout: float):
+        self.net_manager.stall_timeout = stall_timeout
+
+    def set_binary_net_table(self, enabled: bool):
+        self.net_manager.use_binary_nt = enabled
+        self.log.log_info("Net table protocol change will apply next time the robot connects.")
+
     def open_about(self):
         dialog = AboutDialog(self)
         dialog.exec()
-    
-    def force_instant_pbar_updates(self):
-        self.ui.pbar_lx.valueChanged.connect(self.ui.pbar_lx.update)
-        self.ui.pbar_ly.valueChanged.connect(self.ui.pbar_ly.update)
-        self.ui.pbar_rx.valueChanged.connect(self.ui.pbar_rx.update)
-        self.ui.pbar_ry.valueChanged.connect(self.ui.pbar_ry.update)
-        self.ui.pbar_l2.valueChanged.connect(self.ui.pbar_l2.update)
-        self.ui.pbar_r2.valueChanged.connect(self.ui.pbar_r2.update)
-        self.ui.pbar_a.valueChanged.connect(self.ui.pbar_a.update)
-        self.ui.pbar_b.valueChanged.connect(self.ui.pbar_b.update)
-        self.ui.pbar_x.valueChanged.connect(self.ui.pbar_x.update)
-        self.ui.pbar_y.valueChanged.connect(self.ui.pbar_y.update)
-        self.ui.pbar_back.valueChanged.connect(self.ui.pbar_back.update)
-        self.ui.pbar_guide.valueChanged.connect(self.ui.pbar_guide.update)
-        self.ui.pbar_start.valueChanged.connect(self.ui.pbar_start.update)
-        self.ui.pbar_l3.valueChanged.connect(self.ui.pbar_l3.update)
-        self.ui.pbar_r3.valueChanged.connect(self.ui.pbar_r3.update)
-        self.ui.pbar_l1.valueChanged.connect(self.ui.pbar_l1.update)
-        self.ui.pbar_r1.valueChanged.connect(self.ui.pbar_r1.update)
-        self.ui.pbar_dpad_0.valueChanged.connect(self.ui.pbar_dpad_0.update)
-        self.ui.pbar_dpad_up.valueChanged.connect(self.ui.pbar_dpad_up.update)
-        self.ui.pbar_dpad_down.valueChanged.connect(self.ui.pbar_dpad_down.update)
-        self.ui.pbar_dpad_left.valueChanged.connect(self.ui.pbar_dpad_left.update)
-        self.ui.pbar_dpad_right.valueChanged.connect(self.ui.pbar_dpad_right.update)
 
+    def open_diagnostics(self):
+        # Not modal so stats can be watched while driving
+        if self.diagnostics_dialog is None:
+            self.diagnostics_dialog = DiagnosticsDialog(self, self.net_manager, self.log)
+        self.diagnostics_dialog.show()
+        self.diagnostics_dialog.raise_()
+    
     def log_debug(self, msg: str):
-        self.ui.txt_ds_log.append(f"[DEBUG]: {msg}")
+        self.ds_log_collapser.add(f"[DEBUG]: {msg}")
+        self.refresh_scheduler.request_frame()
 
     def log_info(self, msg: str):
-        self.ui.txt_ds_log.append(f"[INFO]: {msg}")
+        self.ds_log_collapser.add(f"[INFO]: {msg}")
+        self.refresh_scheduler.request_frame()
 
     def log_warning(self, msg: str):
-        self.ui.txt_ds_log.append(f"[WARNING]: {msg}")
+        self.ds_log_collapser.add(f"[WARNING]: {msg}")
+        self.refresh_scheduler.request_frame()
 
     def log_error(self, msg: str):
-        self.ui.txt_ds_log.append(f"[ERROR]: {msg}")
+        self.ds_log_collapser.add(f"[ERROR]: {msg}")
+        self.refresh_scheduler.request_frame()
     
     def log_from_robot(self, msg: str):
-        self.ui.txt_robot_log.append(msg)
+        self.robot_log_collapser.add(msg)
+        self.refresh_scheduler.request_frame()
+
+    def append_log_lines(self, txt: QTextEdit, collapser: LogCollapser):
+        # Update repeat counts and append all new lines in one edit (one layout pass instead of one per line)
+        updates, lines = collapser.take()
+        scrollbar = txt.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum()
+        document = txt.document()
+        cursor = QTextCursor(document)
+        cursor.beginEditBlock()
+        for blocks_from_end, text in updates:
+            block = document.findBlockByNumber(document.blockCount() - 1 - blocks_from_end)
+            if blocks_from_end < 0 or not block.isValid():
+                continue
+            cursor.setPosition(block.position())
+            cursor.movePosition(QTextCursor.EndOfBlock, QTextCursor.KeepAnchor)
+            cursor.insertText(text)
+        if len(lines) > 0:
+            cursor.movePosition(QTextCursor.End)
+            if not document.isEmpty():
+                cursor.insertBlock()
+            cursor.insertText("\n".join(lines))
+        cursor.endEditBlock()
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+
+    def refresh_ui(self) -> bool:
+        # One pass applying every visual update since the last frame
+        # Returns True if the controller bars need to keep being polled
+        if self.ds_log_collapser.has_changes:
+            self.append_log_lines(self.ui.txt_ds_log, self.ds_log_collapser)
+        if self.robot_log_collapser.has_changes:
+            self.append_log_lines(self.ui.txt_robot_log, self.robot_log_collapser)
+        if len(self.pending_nt) > 0:
+            pending_nt = self.pending_nt
+            self.pending_nt = {}
+            for key, value in pending_nt.items():
+                self.apply_nt_data(key, value)
+        if self.pending_voltage is not None:
+            self.set_battery_voltage(self.pending_voltage, settings_manager.vbat_main)
+            self.pending_voltage = None
+        return self.update_controller_bars()
 
     ############################################################################
     # Gamepads
     ############################################################################
 
     def gamepad_connected(self, device_id: int, device_name: str):
-        self.ui.lst_controllers.addItem(ControllerListItem(device_name, device_id, self.ui.lst_controllers.row))
+        slot = self.controllers.add(device_id, device_name, self.gamepad_manager.device_key(device_id))
+        if slot.active:
+            self.log.log_info(f"Controller {slot.index} ({slot.name}) reconnected.")
 
     def gamepad_disconnected(self, device_id: int):
-        for i in range(self.ui.lst_controllers.count()):
-            item: ControllerListItem = self.ui.lst_controllers.item(i)
-            if item.handle == device_id:
-                self.ui.lst_controllers.takeItem(i)
-                break
-        # If a gamepad is disconnected disable the robot
-        # Gamepad numbers may have changed
-        if self.net_manager.current_state == NetworkManager.State.Enabled:
-            logger.log_warning("Gamepad disconnected. Disabling robot as controller numbers may have changed.")
-            self.net_manager.send_disable_command()
+        # Controller numbers don't change. The robot stays enabled and the controller's slot
+        # sends neutral input until it is plugged back in.
+        slot = self.controllers.remove(device_id)
+        if slot is not None and slot.active:
+            self.log.log_warning(f"Controller {slot.index} ({slot.name}) disconnected. Sending neutral input until it reconnects.")
+
+    def controller_context_menu(self, pos: QPoint):
+        index = self.ui.lst_controllers.indexAt(pos)
+        slot = self.controllers.slot_at(index.row()) if index.isValid() else None
+        if slot is None:
+            return
+        menu = QMenu(self)
+        act_forget = menu.addAction(self.tr("Forget Controller"))
+        act_forget.setEnabled(not slot.connected)
+        if menu.exec(self.ui.lst_controllers.viewport().mapToGlobal(pos)) == act_forget:
+            self.controllers.forget(index.row())
     
-    def update_controller_bars(self):
+    def update_controller_bars(self) -> bool:
+        # Returns True if a controller is shown (and must keep being polled)
+        visualizer = self.ui.controller_visualizer
+        if not visualizer.is_showing():
+            # Nothing can be seen. Don't read controller state.
+            return False
+
         selected_rows = [x.row() for x in self.ui.lst_controllers.selectedIndexes()]
-        idx = -1
+        device_id = None
         if len(selected_rows) != 0:
-            idx = selected_rows[0]
-        if idx == -1:
-            self.ui.pbar_lx.setValue(0)
-            self.ui.pbar_ly.setValue(0)
-            self.ui.pbar_rx.setValue(0)
-            self.ui.pbar_ry.setValue(0)
-            self.ui.pbar_l2.setValue(0)
-            self.ui.pbar_r2.setValue(0)
-            self.ui.pbar_a.setValue(0)
-            self.ui.pbar_b.setValue(0)
-            self.ui.pbar_x.setValue(0)
-            self.ui.pbar_y.setValue(0)
-            self.ui.pbar_back.setValue(0)
-            self.ui.pbar_guide.setValue(0)
-            self.ui.pbar_start.setValue(0)
-            self.ui.pbar_l3.setValue(0)
-            self.ui.pbar_r3.setValue(0)
-            self.ui.pbar_l1.setValue(0)
-            self.ui.pbar_r1.setValue(0)
-            self.ui.pbar_dpad_0.setValue(1)
-            self.ui.pbar_dpad_left.setValue(0)
-            self.ui.pbar_dpad_right.setValue(0)
-            self.ui.pbar_dpad_up.setValue(0)
-            self.ui.pbar_dpad_down.setValue(0)
+            device_id = self.controllers.device_at(selected_rows[0])
+        if device_id is None:
+            visualizer.clear_state()
+            return False
         else:
-            device_id = self.ui.lst_controllers.item(idx).handle
-            self.ui.pbar_lx.setValue(self.gamepad_manager.get_axis(device_id, sdl2.SDL_CONTROLLER_AXIS_LEFTX))
-            self.ui.pbar_ly.setValue(self.gamepad_manager.get_axis(device_id, sdl2.SDL_CONTROLLER_AXIS_LEFTY))
-            self.ui.pbar_rx.setValue(self.gamepad_manager.get_axis(device_id, sdl2.SDL_CONTROLLER_AXIS_RIGHTX))
-            self.ui.pbar_ry.setValue(self.gamepad_manager.get_axis(device_id, sdl2.SDL_CONTROLLER_AXIS_RIGHTY))
-            self.ui.pbar_l2.setValue(self.gamepad_manager.get_axis(device_id, sdl2.SDL_CONTROLLER_AXIS_TRIGGERLEFT))
-            self.ui.pbar_r2.setValue(self.gamepad_manager.get_axis(device_id, sdl2.SDL_CONTROLLER_AXIS_TRIGGERRIGHT))
-            self.ui.pbar_a.setValue(1 if self.gamepad_manager.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_A) else 0)
-            self.ui.pbar_b.setValue(1 if self.gamepad_manager.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_B) else 0)
-            self.ui.pbar_x.setValue(1 if self.gamepad_manager.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_X) else 0)
-            self.ui.pbar_y.setValue(1 if self.gamepad_manager.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_Y) else 0)
-            self.ui.pbar_back.setValue(1 if self.gamepad_manager.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_BACK) else 0)
-            self.ui.pbar_guide.setValue(1 if self.gamepad_manager.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_GUIDE) else 0)
-            self.ui.pbar_start.setValue(1 if self.gamepad_manager.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_START) else 0)
-            self.ui.pbar_l3.setValue(1 if self.gamepad_manager.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_LEFTSTICK) else 0)
-            self.ui.pbar_r3.setValue(1 if self.gamepad_manager.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_RIGHTSTICK) else 0)
-            self.ui.pbar_l1.setValue(1 if self.gamepad_manager.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_LEFTSHOULDER) else 0)
-            self.ui.pbar_r1.setValue(1 if self.gamepad_manager.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_RIGHTSHOULDER) else 0)
-            self.ui.pbar_dpad_left.setValue(1 if self.gamepad_manager.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_DPAD_LEFT) else 0)
-            self.ui.pbar_dpad_right.setValue(1 if self.gamepad_manager.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_DPAD_RIGHT) else 0)
-            self.ui.pbar_dpad_up.setValue(1 if self.gamepad_manager.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_DPAD_UP) else 0)
-            self.ui.pbar_dpad_down.setValue(1 if self.gamepad_manager.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_DPAD_DOWN) else 0)
-            self.ui.pbar_dpad_0.setValue(0 if (
-                self.gamepad_manager.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_DPAD_LEFT) or
-                self.gamepad_manager.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_DPAD_RIGHT) or
-                self.gamepad_manager.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_DPAD_UP) or
-                self.gamepad_manager.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_DPAD_DOWN)
-            ) else 1)
+            # Visualizer compares with the last frame and only repaints what changed
+            visualizer.set_state(
+                [self.gamepad_manager.get_axis(device_id, i) for i in range(len(visualizer.AXIS_NAMES))],
+                [self.gamepad_manager.get_button(device_id, i) for i in range(len(visualizer.BUTTON_NAMES))],
+                self.gamepad_manager.get_dpad_pos_num(device_id)
+            )
+            return True
 
     def send_controller_data(self):
-        for i in range(self.ui.lst_controllers.count()):
-            item = self.ui.lst_controllers.item(i)
-            if item.checkState() == Qt.Checked:
-                device_id = item.handle
-                self.net_manager.send_controller_data(self.get_controller_data(i, device_id))
+        for controller_num, device_id in self.controllers.active:
+            input_time = self.gamepad_manager.take_input_time(device_id)
+            data = self.get_controller_data(controller_num, device_id)
+            self.net_manager.send_controller_data(data, input_time, time.perf_counter())
+        self.net_manager.feed_watchdog()
+        if self.owns_gamepad_manager:
+            self.gamepad_manager.clear_input_times()
 
     def get_controller_data(self, controller_num: int, device_id: int) -> bytes:
         # Constants since these are known for SDL gamepads.
@@ -546,28 +659,33 @@ class DriveStationWindow(QMainWindow):
             return
 
         # Remove the key from the "Add from robot" menu if needed
-        for action in self.ui.act_add_from_robot.actions():
-            if action.text() == key:
-                self.ui.act_add_from_robot.removeAction(action)
+        self.remove_from_robot_menu(key)
 
         # Add the indicator
         self.add_indicator_at(key, geometry)
+        self.layout_store.save_later()
 
     def clear_indicators(self):
-        for key in self.indicators.keys():
-            self.indicators[key].hide()
-            self.indicators[key].deleteLater()
-        self.indicators.clear()
-
-    def add_indicator_at(self, key: str, geometry: Optional[QRect]):
-        ind = IndicatorWidget(self.ui.pnl_net_table)
-        ind.deleted.connect(self.indicator_deleted)
-        ind.value_changed.connect(self.indicator_value_changed)
+        for key in list(self.indicators.keys()):
+            self.release_indicator(key)
+        self.layout_store.save_later()
+
+    def add_indicator_at(self, key: str, geometry: Optional[QRect], editable: bool = False):
+        if len(self.indicator_pool) > 0:
+            ind = self.indicator_pool.pop()
+        else:
+            ind = IndicatorWidget(self.ui.pnl_net_table)
+            ind.deleted.connect(self.indicator_deleted)
+            ind.value_changed.connect(self.indicator_value_changed)
+            ind.layout_changed.connect(lambda key: self.layout_store.save_later())
         ind.key = key
         if self.net_manager.has_net_table(key):
             ind.value = self.net_manager.get_net_table(key)
         else:
             ind.value = ""
+        ind.blockSignals(True)
+        ind.editable = editable
+        ind.blockSignals(False)
         if geometry is None:
             # Place indicator in center of panel
             panel_geom = self.ui.pnl_net_table.geometry()
@@ -579,89 +697,135 @@ class DriveStationWindow(QMainWindow):
             geometry.setHeight(ind_geom.height())
         ind.setGeometry(geometry)
 
-        # Apply correct stylesheet
-        color_text = QApplication.palette().color(QPalette.Text).name()
-        ind.setStyleSheet("""
-        IndicatorWidget{{
-            
-        }}
-        IndicatorWidget:focus{{
-            border: 1px solid {text_color};
-            border-radius: 2px;
-        }}
-        """.format(
-            text_color=color_text
-        ))
-
         ind.show()
         self.indicators[key] = ind
 
-    def save_indicators(self):
-        try:
-            data: Dict[str, Dict] = {}
-            for key, ind in self.indicators.items():
-                data[ind.key] = {
-                    "x": ind.geometry().x(),
-                    "y": ind.geometry().y(),
-                    "width": ind.geometry().width(),
-                    "height": ind.geometry().height(),
-                    "editable": not ind.ui.txt_value.isReadOnly()
-                }
-            with open(QDir.homePath() + "/.arpirobot/dsindicators.json", "w") as data_file:
-                json.dump(data, data_file)
-        except:
-            pass
+    def release_indicator(self, key: str):
+        # Hide the indicator and keep its widget for reuse
+        ind = self.indicators.pop(key)
+        ind.hide()
+        ind.clearFocus()
+        self.indicator_pool.append(ind)
+
+    def indicator_layout_data(self) -> IndicatorData:
+        data: IndicatorData = {}
+        for key, ind in self.indicators.items():
+            data[key] = {
+                "x": ind.geometry().x(),
+                "y": ind.geometry().y(),
+                "width": ind.geometry().width(),
+                "height": ind.geometry().height(),
+                "editable": ind.editable
+            }
+        return data
+
+    def apply_indicator_layout(self, data: IndicatorData):
+        # Only indicators not in both layouts are hidden / shown. Existing widgets are reused.
+        self.ui.pnl_net_table.setUpdatesEnabled(False)
+        for key in list(self.indicators.keys()):
+            if key not in data:
+                self.release_indicator(key)
+                if self.net_manager.has_net_table(key):
+                    self.add_to_robot_menu(key)
+        for key, subdata in data.items():
+            geometry = QRect(subdata["x"], subdata["y"], subdata["width"], subdata["height"])
+            ind = self.indicators.get(key, None)
+            if ind is None:
+                self.remove_from_robot_menu(key)
+                self.add_indicator_at(key, geometry, subdata["editable"])
+            else:
+                ind.setGeometry(geometry)
+                ind.blockSignals(True)
+                ind.editable = subdata["editable"]
+                ind.blockSignals(False)
+        self.ui.pnl_net_table.setUpdatesEnabled(True)
 
     def load_indicators(self):
-        try:
-            with open(QDir.homePath() + "/.arpirobot/dsindicators.json", "r") as data_file:
-                data: Dict[str, Dict] = json.load(data_file)
-                for key, subdata in data.items():
-                    x = subdata["x"]
-                    y = subdata["y"]
-                    width = subdata["width"]
-                    height = subdata["height"]
-                    self.add_indicator(key, QRect(x, y, width, height))
-                    if "editable" in subdata:
-                        self.indicators[key].ui.txt_value.setReadOnly(not subdata["editable"])
-        except:
-            pass
+        for error in self.layout_store.load():
+            self.log.log_warning(error)
+        self.apply_indicator_layout(self.layout_store.layout(self.layout_store.current))
+        self.update_layouts_menu()
+
+    def update_layouts_menu(self):
+        for action in self.layout_actions.actions():
+            self.layout_actions.removeAction(action)
+            self.ui.menu_layouts.removeAction(action)
+            action.deleteLater()
+        for name in self.layout_store.layout_names:
+            action = self.ui.menu_layouts.addAction(name)
+            action.setCheckable(True)
+            action.setChecked(name == self.layout_store.current)
+            self.layout_actions.addAction(action)
+        self.ui.act_delete_layout.setEnabled(len(self.layout_store.layout_names) > 1)
+
+    def switch_layout(self, name: str):
+        if name != self.layout_store.current:
+            self.apply_indicator_layout(self.layout_store.switch_to(name))
+        self.update_layouts_menu()
+
+    def save_layout_as(self):
+        name, ok = QInputDialog.getText(self, self.tr("Save Layout As"), self.tr("Layout name:"), QLineEdit.Normal)
+        name = name.strip()
+        if ok and name != "":
+            self.layout_store.save_as(name)
+            self.update_layouts_menu()
+
+    def delete_layout(self):
+        names = [name for name in self.layout_store.layout_names if name != self.layout_store.current]
+        if len(names) == 0:
+            return
+        name, ok = QInputDialog.getItem(self, self.tr("Delete Layout"), self.tr("Layout:"), names, 0, False)
+        if ok:
+            self.layout_store.delete(name)
+            self.update_layouts_menu()
+
+    def add_to_robot_menu(self, key: str):
+        # Add to "Add from robot" menu if not already in that menu
+        if key in self.robot_menu_actions:
+            return
+        action = self.ui.act_add_from_robot.addAction(key)
+        action.triggered.connect(lambda checked: self.add_indicator(key))
+        self.robot_menu_actions[key] = action
+
+    def remove_from_robot_menu(self, key: str):
+        action = self.robot_menu_actions.pop(key, None)
+        if action is not None:
+            self.ui.act_add_from_robot.removeAction(action)
+            action.deleteLater()
 
     def indicator_deleted(self, key: str):
         if key in self.indicators:
-            self.indicators[key].hide()
-            self.indicators[key].deleteLater()
-            del self.indicators[key]
+            self.release_indicator(key)
+            self.layout_store.save_later()
 
             # This indicator will have been added to the robot
             # Or it will be next time a robot is connected to (due to NT sync)
-            action = self.ui.act_add_from_robot.addAction(key)
-            action.triggered.connect(lambda checked: self.add_indicator(key))
+            self.add_to_robot_menu(key)
 
     def indicator_value_changed(self, key: str, value: str):
         self.net_manager.set_net_table(key, value)
 
     # Slot for NetworkManager signal
     def nt_data_changed(self, key: str, value: str):
+        # Applied in the next UI frame. Only the latest value of each key is kept.
         if key == "vbat0":
-            self.set_battery_voltage(float(value), settings_manager.vbat_main)
+            voltage = self.net_manager.get_net_table_number(key)
+            if voltage is not None:
+                self.pending_voltage = voltage
         else:
-            # If the key is already in the indicator panel, don't add it to the menu
-            if key not in self.indicators:
-                # Add to "Add from robot" menu if not already in that menu
-                action_found = False
-                for action in self.ui.act_add_from_robot.actions():
-                    if action.text() == key:
-                        action_found = True
-                        break
-                if not action_found:
-                    action = self.ui.act_add_from_robot.addAction(key)
-                    action.triggered.connect(lambda checked: self.add_indicator(key))
-            else:
-                # Inidicator is shown. Update it's value.
-                self.indicators[key].value = value
+            self.pending_nt[key] = value
+        self.refresh_scheduler.request_frame()
+
+    def apply_nt_data(self, key: str, value: str):
+        # If the key is already in the indicator panel, don't add it to the menu
+        if key not in self.indicators:
+            self.add_to_robot_menu(key)
+        else:
+            # Inidicator is shown. Update it's value.
+            self.indicators[key].value = value
 
     def set_battery_voltage(self, voltage: float, nominal_bat_voltage: float):
+        self.voltage = voltage
         if voltage >= nominal_bat_voltage:
             self.ui.pnl_bat_bg.setObjectName("pnl_bat_bg_green")
         elif voltage >= nominal_bat_voltage * 0.85:
@@ -680,13 +844,15 @@ class DriveStationWindow(QMainWindow):
     # State Changes
     ############################################################################
 
+    def disable_pressed(self):
+        # Disable is sent when the button goes down (not when it is released) so it happens as soon as possible
+        self.net_manager.send_disable_command(time.perf_counter())
+
     def disable_clicked(self):
         # Don't toggle the checked state of these buttons on click.
         # The checked state will be changed when network manager emits signal for state changed
         self.ui.btn_disable.setChecked(not self.ui.btn_disable.isChecked())
 
-        self.net_manager.send_disable_command()
-
     def enable_clicked(self):
         # Don't toggle the checked state of these buttons on click.
         # The checked state will be changed when network manager emits signal for state changed
@@ -696,6 +862,11 @@ class DriveStationWindow(QMainWindow):
 
     # Slot for NetworkManager signal
     def state_changed(self, state):
+        if self.ui.btn_enable.isChecked() and state != NetworkManager.State.Enabled:
+            # Leaving enabled state (end of a match / test run). Record timing stats for the run
+            # so "the robot felt laggy" can be checked afterwards.
+            for line in loop_monitor.summary().split("\n"):
+                self.log.log_info(line)
         if state == NetworkManager.State.Disabled:
             self.set_state_disabled()
         elif state == NetworkManager.State.Enabled:
@@ -709,7 +880,7 @@ class DriveStationWindow(QMainWindow):
         self.ui.btn_disable.setChecked(True)
         self.ui.btn_enable.setChecked(False)
 
-        self.lbl_status_msg.setText(self.tr(self.MSG_STATE_NO_NETWORK).format(settings_manager.robot_address))
+        self.lbl_status_msg.setText(self.tr(self.MSG_STATE_NO_NETWORK).format(self.robot_address))
         self.set_network_good(False)
         self.set_robot_program_good(False)
 
@@ -1,15 +1,88 @@
 import ctypes
-from PySide6.QtCore import QObject, QTimer, Signal, QFile, QTemporaryFile, QDir
+from typing import Dict, List, Optional, Tuple
+from PySide6.QtCore import QObject, QTimer, Signal, QFile, QIODevice
 from threading import Thread
+from diagnostics import loop_monitor
 import sdl2
 import time
 
 
-class GamepadManager(QObject):
+class InputBackend(QObject):
+    """
+    Source of controller input for the drive station. Devices are identified by an id that is
+    unique while the device is connected (a reconnected device gets a new id) and a key that
+    identifies the physical device across reconnects. Axes, buttons and dpad use SDL game
+    controller numbering. Unknown (eg disconnected) devices read as neutral input.
+    """
 
     connected = Signal(int, str)               # device_id, device_name
     disconnected = Signal(int)                 # device_id
 
+    def __init__(self):
+        super().__init__()
+
+        # Time (time.perf_counter()) of the oldest input event not yet sent for each device
+        self.input_times: Dict[int, float] = {}
+
+    # Backends override these. The defaults are a backend without devices.
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def device_key(self, device_id: int) -> str:
+        return ""
+
+    def devices(self) -> List[Tuple[int, str]]:
+        # (device_id, device_name) of each connected controller
+        return []
+
+    def get_axis(self, device_id: int, axis: int) -> int:
+        return 0
+
+    def get_button(self, device_id: int, button: int) -> bool:
+        return False
+
+    def take_input_time(self, device_id: int) -> Optional[float]:
+        # Time of the oldest input event since the last call for this device (None if no input)
+        return self.input_times.pop(device_id, None)
+
+    def clear_input_times(self):
+        # Input from devices that no session sent data for
+        self.input_times.clear()
+
+    def get_dpad_pos_num(self, device_id: int) -> int:
+        up = self.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_DPAD_UP)
+        down = self.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_DPAD_DOWN)
+        left = self.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_DPAD_LEFT)
+        right = self.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_DPAD_RIGHT)
+
+        if up:
+            if right:
+                return 2
+            if left:
+                return 8
+            return 1
+        elif down:
+            if left:
+                return 6
+            if right:
+                return 4
+            return 5
+        if left:
+            return 7
+        if right:
+            return 3
+        return 0
+
+
+class GamepadManager(InputBackend):
+    """
+    Input from game controllers using SDL
+    """
+
     def __init__(self, mappings_file: str = ""):
         super().__init__()
         self.mappings_file = mappings_file
@@ -17,8 +90,11 @@ class GamepadManager(QObject):
         self.event_thread = None
         self.dev_map = {}
 
+        # Stable key for each connected device (see device_key)
+        self.dev_keys: Dict[int, str] = {}
+
         self.event_poll_timer = QTimer(self)
-        self.event_poll_timer.timeout.connect(self.handle_events)
+        self.event_poll_timer.timeout.connect(loop_monitor.instrument(self.event_poll_timer, "event_poll_timer", self.handle_events))
 
         # Initialize SDL (on main thread for best cross platform compatibility)
         sdl2.SDL_SetHint(sdl2.SDL_HINT_ACCELEROMETER_AS_JOYSTICK, b"0")
@@ -28,14 +104,12 @@ class GamepadManager(QObject):
 
         # Load mappings from file after sdl init
         if self.mappings_file.startswith(":"):
-            # This is a Qt resource, make a temp copy on filesystem
-            temp_path = QDir.tempPath() + "/gamecontrollerdb.txt"
-            if QFile.exists(temp_path):
-                QFile.remove(temp_path)
-            QFile.copy(self.mappings_file, temp_path)
-            time.sleep(0.1)  # Not ideal, but waiting for copy to finish
-            sdl2.SDL_GameControllerAddMappingsFromFile(temp_path.encode())
-            QFile.remove(temp_path)
+            # This is a Qt resource, give SDL the data from memory
+            mappings = QFile(self.mappings_file)
+            if mappings.open(QIODevice.ReadOnly):
+                data = bytes(mappings.readAll())
+                mappings.close()
+                sdl2.SDL_GameControllerAddMappingsFromRW(sdl2.SDL_RWFromConstMem(data, len(data)), 1)
         elif self.mappings_file != "" and self.mappings_file is not None:
             sdl2.SDL_GameControllerAddMappingsFromFile(self.mappings_file.encode())
 
@@ -50,6 +124,15 @@ class GamepadManager(QObject):
     def stop(self):
         self.event_poll_timer.stop()
 
+    def device_key(self, device_id: int) -> str:
+        # Identifies the physical controller across reconnects and restarts. This is the device's
+        # GUID plus its serial number (if it reports one). Identical controllers without serial
+        # numbers are numbered in the order they connect (eg "<guid>#2").
+        return self.dev_keys.get(device_id, "")
+
+    def devices(self) -> List[Tuple[int, str]]:
+        return [(device_id, sdl2.SDL_GameControllerName(dev).decode()) for device_id, dev in self.dev_map.items()]
+
     def get_axis(self, device_id: int, axis: int) -> int:
         if device_id in self.dev_map:
             return sdl2.SDL_GameControllerGetAxis(self.dev_map[device_id], axis)
@@ -60,30 +143,6 @@ class GamepadManager(QObject):
             value = sdl2.SDL_GameControllerGetButton(self.dev_map[device_id], button)
             return value == 1
         return False
-    
-    def get_dpad_pos_num(self, device_id: int) -> int:
-        up = self.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_DPAD_UP)
-        down = self.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_DPAD_DOWN)
-        left = self.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_DPAD_LEFT)
-        right = self.get_button(device_id, sdl2.SDL_CONTROLLER_BUTTON_DPAD_RIGHT)
-
-        if up:
-            if right:
-                return 2
-            if left:
-                return 8
-            return 1
-        elif down:
-            if left:
-                return 6
-            if right:
-                return 4
-            return 5
-        if left:
-            return 7
-        if right:
-            return 3
-        return 0
 
     def handle_events(self):
         # Poll events calls pump events, which must be called from thread that ran SDL_Init
@@ -91,15 +150,46 @@ class GamepadManager(QObject):
         # But on other systems, it is not possible to init video from non main thread
         # Easiest and best supported method is to poll for events on main thread
         event = sdl2.SDL_Event()
+
+        # SDL event timestamps are SDL_GetTicks() values (ms). Converted to time.perf_counter().
+        now = time.perf_counter()
+        now_ticks = sdl2.SDL_GetTicks()
+
         while sdl2.SDL_PollEvent(event) == 1:
-            if event.type == sdl2.SDL_CONTROLLERDEVICEADDED:
+            if event.type == sdl2.SDL_CONTROLLERAXISMOTION or event.type == sdl2.SDL_CONTROLLERBUTTONDOWN or \
+                    event.type == sdl2.SDL_CONTROLLERBUTTONUP:
+                device_id = event.cbutton.which if event.type != sdl2.SDL_CONTROLLERAXISMOTION else event.caxis.which
+                if device_id not in self.input_times:
+                    age = ((now_ticks - event.common.timestamp) & 0xFFFFFFFF) / 1000.0
+                    self.input_times[device_id] = now - age
+            elif event.type == sdl2.SDL_CONTROLLERDEVICEADDED:
                 dev = sdl2.SDL_GameControllerOpen(event.cdevice.which)
                 if dev is not None:
                     instance_id = sdl2.SDL_JoystickInstanceID(sdl2.SDL_GameControllerGetJoystick(dev))
                     self.dev_map[instance_id] = dev
+                    self.dev_keys[instance_id] = self.__make_device_key(dev)
                     name = sdl2.SDL_GameControllerName(dev)
                     self.connected.emit(instance_id, name.decode())
             elif event.type == sdl2.SDL_CONTROLLERDEVICEREMOVED:
-                sdl2.SDL_GameControllerClose(self.dev_map[event.cdevice.which])
-                del self.dev_map[event.cdevice.which]
-                self.disconnected.emit(event.cdevice.which)
\ No newline at end of file
+                dev = self.dev_map.pop(event.cdevice.which, None)
+                if dev is None:
+                    continue
+                sdl2.SDL_GameControllerClose(dev)
+                self.dev_keys.pop(event.cdevice.which, None)
+                self.input_times.pop(event.cdevice.which, None)
+                self.disconnected.emit(event.cdevice.which)
+
+    def __make_device_key(self, dev) -> str:
+        guid = sdl2.SDL_JoystickGetGUID(sdl2.SDL_GameControllerGetJoystick(dev))
+        guid_str = ctypes.create_string_buffer(33)
+        sdl2.SDL_JoystickGetGUIDString(guid, guid_str, len(guid_str))
+        key = guid_str.value.decode()
+        serial = sdl2.SDL_GameControllerGetSerial(dev)
+        if serial:
+            key += "/" + serial.decode(errors="replace")
+        if key not in self.dev_keys.values():
+            return key
+        num = 2
+        while f"{key}#{num}" in self.dev_keys.values():
+            num += 1
+        return f"{key}#{num}"
\ No newline at end of file
@@ -0,0 +1,177 @@
+from typing import Callable, Dict, List, Optional
+
+from PySide6.QtCore import QDir, QObject, QSaveFile, QIODevice, QThreadPool, QTimer, Signal
+
+import json
+import threading
+
+
+# Saved data for one indicator: {"x": int, "y": int, "width": int, "height": int, "editable": bool}
+IndicatorData = Dict[str, Dict]
+
+
+def write_file_atomic(path: str, data: bytes):
+    # The file is either fully replaced or left as it was (data is written to a
+    # temporary file which is renamed over the original once complete)
+    f = QSaveFile(path)
+    if not f.open(QIODevice.WriteOnly):
+        raise OSError(f.errorString())
+    if f.write(data) != len(data):
+        f.cancelWriting()
+        raise OSError(f.errorString())
+    if not f.commit():
+        raise OSError(f.errorString())
+
+
+class IndicatorLayoutStore(QObject):
+    """
+    Named indicator layouts saved to disk. Changes are saved a short time after they are made
+    (so dragging an indicator is one write, not hundreds) on a background thread.
+    The active layout is also kept in dsindicators.json (the original format) so older
+    drive station versions still load it.
+    """
+
+    # Emitted (in the GUI thread) if a save fails. Args: error message
+    save_failed = Signal(str)
+
+    # Time (ms) changes are held before saving
+    SAVE_DELAY = 1000
+
+    DEFAULT_LAYOUT = "Default"
+
+    def __init__(self, snapshot: Callable[[], IndicatorData], file_suffix: str = "", parent: Optional[QObject] = None):
+        # snapshot returns the data for the indicators currently shown
+        # file_suffix is added to file names (separate layouts for each robot session)
+        super().__init__(parent)
+        self.__INDICATORS_FILE = QDir.homePath() + f"/.arpirobot/dsindicators{file_suffix}.json"
+        self.__LAYOUTS_FILE = QDir.homePath() + f"/.arpirobot/dslayouts{file_suffix}.json"
+
+        self.__snapshot = snapshot
+        self.__layouts: Dict[str, IndicatorData] = {}
+        self.__current = self.DEFAULT_LAYOUT
+
+        self.__save_timer = QTimer(self)
+        self.__save_timer.setSingleShot(True)
+        self.__save_timer.timeout.connect(self.save_now)
+
+        # Background writes must happen in the order they were started
+        self.__write_lock = threading.Lock()
+        self.__generation = 0
+        self.__written_generation = 0
+
+    ############################################################################
+    # Layouts
+    ############################################################################
+
+    @property
+    def current(self) -> str:
+        return self.__current
+
+    @property
+    def layout_names(self) -> List[str]:
+        return sorted(self.__layouts.keys(), key=str.lower)
+
+    def layout(self, name: str) -> IndicatorData:
+        return self.__layouts.get(name, {})
+
+    def load(self) -> List[str]:
+        # Returns a list of problems found (missing files are not a problem)
+        errors: List[str] = []
+        self.__layouts = {}
+        self.__current = self.DEFAULT_LAYOUT
+
+        try:
+            with open(self.__LAYOUTS_FILE, "r") as data_file:
+                data = json.load(data_file)
+            self.__layouts = {str(name): self.__validated(layout) for name, layout in data["layouts"].items()}
+            self.__current = str(data["current"])
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            errors.append(f"Unable to load indicator layouts: {e}")
+
+        # dsindicators.json is the most recently saved version of the active layout
+        # (and the only file if upgrading from a version without named layouts)
+        try:
+            with open(self.__INDICATORS_FILE, "r") as data_file:
+                self.__layouts[self.__current] = self.__validated(json.load(data_file))
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            errors.append(f"Unable to load indicators: {e}")
+
+        if self.__current not in self.__layouts:
+            self.__layouts[self.__current] = {}
+        return errors
+
+    def switch_to(self, name: str) -> IndicatorData:
+        # Record the layout being left, then return the data for the new one
+        self.__layouts[self.__current] = self.__snapshot()
+        self.__current = name
+        if name not in self.__layouts:
+            self.__layouts[name] = {}
+        self.save_later()
+        return self.__layouts[name]
+
+    def save_as(self, name: str):
+        # Copy of the shown indicators becomes the new (active) layout
+        self.__layouts[name] = self.__snapshot()
+        self.__current = name
+        self.save_later()
+
+    def delete(self, name: str):
+        # The active layout can't be deleted
+        if name != self.__current and name in self.__layouts:
+            del self.__layouts[name]
+            self.save_later()
+
+    ############################################################################
+    # Saving
+    ############################################################################
+
+    def save_later(self):
+        # Indicators changed. Restarting the timer merges quick successive changes.
+        self.__save_timer.start(self.SAVE_DELAY)
+
+    def save_now(self, blocking: bool = False):
+        self.__save_timer.stop()
+        self.__layouts[self.__current] = self.__snapshot()
+
+        # Serialize in the GUI thread (data can't change under the writer)
+        self.__generation += 1
+        generation = self.__generation
+        indicators_json = json.dumps(self.__layouts[self.__current]).encode()
+        layouts_json = json.dumps({"current": self.__current, "layouts": self.__layouts}).encode()
+
+        if blocking:
+            self.__write(generation, indicators_json, layouts_json)
+        else:
+            QThreadPool.globalInstance().start(lambda: self.__write(generation, indicators_json, layouts_json))
+
+    def __write(self, generation: int, indicators_json: bytes, layouts_json: bytes):
+        with self.__write_lock:
+            if generation <= self.__written_generation:
+                # A newer save finished first
+                return
+            try:
+                QDir().mkpath(QDir.homePath() + "/.arpirobot")
+                write_file_atomic(self.__LAYOUTS_FILE, layouts_json)
+                write_file_atomic(self.__INDICATORS_FILE, indicators_json)
+                self.__written_generation = generation
+            except OSError as e:
+                # Queued to the GUI thread
+                self.save_failed.emit(f"Unable to save indicators: {e}")
+
+    @staticmethod
+    def __validated(layout: Dict) -> IndicatorData:
+        # Raises if the layout is not in the expected format
+        result: IndicatorData = {}
+        for key, subdata in layout.items():
+            result[str(key)] = {
+                "x": int(subdata["x"]),
+                "y": int(subdata["y"]),
+                "width": int(subdata["width"]),
+                "height": int(subdata["height"]),
+                "editable": bool(subdata.get("editable", False))
+            }
+        return result
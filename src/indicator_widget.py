@@ -1,5 +1,5 @@
-from PySide6.QtCore import Signal, Qt, QPoint
-from PySide6.QtGui import QContextMenuEvent, QAction, QPaintEvent, QPainter, QMouseEvent, QCursor
+from PySide6.QtCore import Signal, Qt, QPoint, QRectF
+from PySide6.QtGui import QContextMenuEvent, QAction, QPaintEvent, QPainter, QMouseEvent, QCursor, QPalette, QPen
 from PySide6.QtWidgets import QWidget, QMenu, QStyleOption, QStyle
 from ui_indicator_widget import Ui_InidicatorWidget
 from enum import Enum, auto
@@ -19,6 +19,7 @@ class IndicatorWidget(QWidget):
 
     deleted = Signal(str)               # Args: key
     value_changed = Signal(str, str)    # Args: key, value
+    layout_changed = Signal(str)        # Args: key (moved, resized or editable changed)
 
     def __init__(self, parent):
         super().__init__(parent)
@@ -39,6 +40,7 @@ class IndicatorWidget(QWidget):
 
         # Track mouse event positions
         self.position = QPoint()
+        self.press_geometry = self.geometry()
         self.mode = IndicatorWidget.Mode.NoMode
 
     def line_edit_changed(self):
@@ -53,7 +55,7 @@ class IndicatorWidget(QWidget):
         menu.addActions([writable_action, delete_action])
         action = menu.exec(self.mapToGlobal(event.pos()))
         if action == writable_action:
-            self.ui.txt_value.setReadOnly(not writable_action.isChecked())
+            self.editable = writable_action.isChecked()
         if action == delete_action:
             self.deleted.emit(self.key)
 
@@ -66,6 +68,14 @@ class IndicatorWidget(QWidget):
         s = self.style()
         s.drawPrimitive(QStyle.PE_Widget, opt, p, self)
 
+        # Focus border is painted in the palette's text color instead of using a stylesheet on each
+        # indicator (each stylesheet is parsed and polished separately). Follows theme changes.
+        if self.hasFocus():
+            p.setRenderHint(QPainter.Antialiasing)
+            p.setPen(QPen(self.palette().color(QPalette.Text), 1))
+            p.setBrush(Qt.NoBrush)
+            p.drawRoundedRect(QRectF(self.rect()).adjusted(0.5, 0.5, -0.5, -0.5), 2, 2)
+
     @property
     def key(self) -> str:
         return self.ui.lbl_key.text()
@@ -74,6 +84,16 @@ class IndicatorWidget(QWidget):
     def key(self, value: str):
         self.ui.lbl_key.setText(value)
 
+    @property
+    def editable(self) -> bool:
+        return not self.ui.txt_value.isReadOnly()
+
+    @editable.setter
+    def editable(self, value: bool):
+        if value != self.editable:
+            self.ui.txt_value.setReadOnly(not value)
+            self.layout_changed.emit(self.key)
+
     @property
     def value(self) -> str:
         return self.ui.txt_value.text()
@@ -85,6 +105,7 @@ class IndicatorWidget(QWidget):
     def mousePressEvent(self, event: QMouseEvent):
         self.position = QPoint(event.globalX() - self.geometry().x(),
                                event.globalY() - self.geometry().y())
+        self.press_geometry = self.geometry()
         if not self.hasFocus():
             return
         if not event.buttons() and Qt.LeftButton:
@@ -164,3 +185,9 @@ class IndicatorWidget(QWidget):
                     return
                 self.resize(event.x(), self.height())
             self.parentWidget().repaint()
+
+    def mouseReleaseEvent(self, event: QMouseEvent):
+        super().mouseReleaseEvent(event)
+        if self.geometry() != self.press_geometry:
+            self.press_geometry = self.geometry()
+            self.layout_changed.emit(self.key)
@@ -0,0 +1,81 @@
+from collections import OrderedDict
+from typing import List, Tuple
+
+import time
+
+
+class LogEntry:
+    __slots__ = ["line", "count", "last_seen", "block", "dirty"]
+
+    def __init__(self, line: str):
+        self.line = line
+        self.count = 1
+        self.last_seen = 0.0
+        # Number of the entry's last block in the log (-1 until shown)
+        self.block = -1
+        self.dirty = False
+
+
+class LogCollapser:
+    """
+    Collapses repeated log lines before they reach a log pane. A line matching one of the
+    WINDOW most recently seen distinct lines is not shown again. Instead, the line already
+    shown (or waiting to be shown) gets a repeat count and the time it was last seen.
+    Only what is shown is collapsed. Callers still see every line passed to add.
+    """
+
+    # Distinct lines remembered (lines repeating in a cycle up to this long are collapsed)
+    WINDOW = 8
+
+    def __init__(self):
+        self.__recent: "OrderedDict[str, LogEntry]" = OrderedDict()
+        self.__pending: List[LogEntry] = []
+        self.__dirty: List[LogEntry] = []
+
+        # Blocks appended to the log so far
+        self.__blocks = 0
+
+    @property
+    def has_changes(self) -> bool:
+        return len(self.__pending) > 0 or len(self.__dirty) > 0
+
+    def add(self, line: str):
+        entry = self.__recent.get(line, None)
+        if entry is not None:
+            entry.count += 1
+            entry.last_seen = time.time()
+            self.__recent.move_to_end(line)
+            if entry.block >= 0 and not entry.dirty:
+                entry.dirty = True
+                self.__dirty.append(entry)
+            return
+        entry = LogEntry(line)
+        self.__recent[line] = entry
+        if len(self.__recent) > self.WINDOW:
+            self.__recent.popitem(last=False)
+        self.__pending.append(entry)
+
+    def take(self) -> Tuple[List[Tuple[int, str]], List[str]]:
+        # Returns (updates, new lines) since the last call.
+        # Updates replace the text of lines already shown: (blocks from the end of the log, text).
+        # These must be applied before the new lines are appended.
+        updates = []
+        for entry in self.__dirty:
+            entry.dirty = False
+            updates.append((self.__blocks - 1 - entry.block, self.__text(entry).rsplit("\n", 1)[-1]))
+        self.__dirty = []
+
+        lines = []
+        for entry in self.__pending:
+            text = self.__text(entry)
+            self.__blocks += text.count("\n") + 1
+            entry.block = self.__blocks - 1
+            lines.append(text)
+        self.__pending = []
+        return updates, lines
+
+    @staticmethod
+    def __text(entry: LogEntry) -> str:
+        if entry.count == 1:
+            return entry.line
+        return f"{entry.line}  (x{entry.count}, last {time.strftime('%H:%M:%S', time.localtime(entry.last_seen))})"
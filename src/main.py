@@ -6,11 +6,12 @@ import multiprocessing
 import subprocess
 
 from PySide6.QtWidgets import QApplication, QStyleFactory
-from PySide6.QtCore import Qt, QFile, QIODevice
+from PySide6.QtCore import Qt, QFile, QIODevice, QTimer
 from PySide6.QtGui import QPalette, QColor, QGuiApplication
 
-from drive_station import DriveStationWindow
-from util import logger
+from diagnostics import write_startup_report
+from sessions import SessionManager
+from virtual_gamepad import VirtualGamepadManager
 
 
 QApplication.setAttribute(Qt.AA_DontUseNativeMenuBar)
@@ -26,7 +27,9 @@ except AttributeError:
 app = None
 
 # Fix gnome wayland things
-if platform.system() == "Linux":
+# Finding the platform takes a separate process, so only check when the result would be used
+if platform.system() == "Linux" and os.environ.get("XDG_CURRENT_DESKTOP", "").find("GNOME") != -1 and \
+        'QT_FONT_DPI' not in os.environ:
     # QGuiApplication.platformName() is empty until app instantiated
     # So need to create app first, but need to change things before app create
     # Logical solution is to create app, read platform, then destroy app
@@ -43,11 +46,10 @@ if platform.system() == "Linux":
     p.start()
     p.join()
     plat_name = return_dict['plat_name']
-    if plat_name == "wayland" and os.environ['XDG_CURRENT_DESKTOP'].find("GNOME") != -1:
+    if plat_name == "wayland":
         # Running with wayland platform plugin in a gnome session
         text_scale_factor = float(subprocess.check_output(["gsettings", "get", "org.gnome.desktop.interface", "text-scaling-factor"]))
-        if 'QT_FONT_DPI' not in os.environ:
-            os.environ['QT_FONT_DPI'] = str(int(text_scale_factor * 96))
+        os.environ['QT_FONT_DPI'] = str(int(text_scale_factor * 96))
 
 app = QApplication(sys.argv)
 app.setStyle("Fusion")
@@ -63,9 +65,21 @@ if app.styleHints().colorScheme() == Qt.ColorScheme.Dark:
             p.setColor(cg, QPalette.ColorRole.Base, p.color(cg, QPalette.ColorRole.Base))
         app.setPalette(p)
 
-ds = DriveStationWindow()
+# Scripted virtual controllers instead of real ones (see virtual_gamepad.py for the script format)
+virtual_gamepad_script = os.environ.get("ARPIROBOT_VIRTUAL_GAMEPADS", "")
+if virtual_gamepad_script != "":
+    session_manager = SessionManager(VirtualGamepadManager(VirtualGamepadManager.load_script(virtual_gamepad_script)))
+else:
+    session_manager = SessionManager()
+ds = session_manager.start()
+ds.show()
 
-logger.set_ds(ds)
+# Startup benchmark (tools/startup_benchmark.py). Report once the window is shown, then exit.
+startup_report = os.environ.get("ARPIROBOT_STARTUP_REPORT", "")
+if startup_report != "":
+    def report_startup():
+        write_startup_report(startup_report)
+        ds.close()
+    QTimer.singleShot(0, report_startup)
 
-ds.show()
 app.exec()
@@ -0,0 +1,243 @@
+from typing import Dict, List, Optional, Tuple, Union
+
+from PySide6.QtCore import QDateTime, QDir, QObject, QTimer
+from PySide6.QtNetwork import QHostAddress, QTcpServer, QTcpSocket
+
+from util import logger
+
+import json
+import os
+import threading
+import time
+
+# Metrics are named and labeled like Prometheus metrics (name{label="value",...}) so the HTTP
+# endpoint can be scraped directly. Counters only increase. Gauges hold the latest value.
+# Each metric should only be changed from one thread (reading from any thread is fine).
+
+
+class Counter:
+    __slots__ = ["key", "value"]
+
+    def __init__(self, key: str):
+        self.key = key
+        self.value = 0
+
+    def inc(self, amount: Union[int, float] = 1):
+        self.value += amount
+
+
+class Gauge:
+    __slots__ = ["key", "value"]
+
+    def __init__(self, key: str):
+        self.key = key
+        self.value = 0.0
+
+    def set(self, value: Union[int, float]):
+        self.value = value
+
+
+class MetricsRegistry:
+    """
+    Drive station health metrics. Metrics are created on first use and kept until exit.
+    """
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__metrics: Dict[str, Union[Counter, Gauge]] = {}
+        self.__types: Dict[str, str] = {}
+        self.__descriptions: Dict[str, str] = {}
+
+    def counter(self, name: str, description: str, **labels: str) -> Counter:
+        return self.__get(Counter, "counter", name, description, labels)
+
+    def gauge(self, name: str, description: str, **labels: str) -> Gauge:
+        return self.__get(Gauge, "gauge", name, description, labels)
+
+    def __get(self, cls, type_name: str, name: str, description: str, labels: Dict[str, str]):
+        key = name
+        if len(labels) > 0:
+            key += "{" + ",".join(f'{label}="{self.__escape(value)}"' for label, value in sorted(labels.items())) + "}"
+        with self.__lock:
+            metric = self.__metrics.get(key, None)
+            if metric is None:
+                metric = cls(key)
+                self.__metrics[key] = metric
+                self.__types[name] = type_name
+                self.__descriptions[name] = description
+            return metric
+
+    def values(self) -> Dict[str, Union[int, float]]:
+        with self.__lock:
+            return {key: metric.value for key, metric in self.__metrics.items()}
+
+    def counters(self) -> Dict[str, Union[int, float]]:
+        with self.__lock:
+            return {key: metric.value for key, metric in self.__metrics.items() if isinstance(metric, Counter)}
+
+    def text(self) -> str:
+        # Prometheus text exposition format
+        with self.__lock:
+            metrics = sorted(self.__metrics.items())
+            types = dict(self.__types)
+            descriptions = dict(self.__descriptions)
+        lines: List[str] = []
+        last_name = ""
+        for key, metric in metrics:
+            name = key.split("{", 1)[0]
+            if name != last_name:
+                lines.append(f"# HELP {name} {descriptions[name]}")
+                lines.append(f"# TYPE {name} {types[name]}")
+                last_name = name
+            lines.append(f"{key} {metric.value}")
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def __escape(value: str) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsFileWriter(QObject):
+    """
+    Appends a snapshot of all metrics to a file once per interval (one JSON object per line,
+    one file per day). Each line has the time, the metric values and the per second rate of each
+    counter since the previous line.
+    """
+
+    # Time (ms) between lines
+    INTERVAL = 5000
+
+    # Files older than this are deleted at startup
+    KEEP_DAYS = 30
+
+    def __init__(self, registry: MetricsRegistry, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.__registry = registry
+        self.__dir = QDir.homePath() + "/.arpirobot/metrics"
+        self.__last_counters: Dict[str, Union[int, float]] = {}
+        self.__last_time = 0.0
+        self.__error_logged = False
+
+        self.__timer = QTimer(self)
+        self.__timer.timeout.connect(self.write)
+
+    @property
+    def directory(self) -> str:
+        return self.__dir
+
+    def start(self):
+        QDir().mkpath(self.__dir)
+        self.__remove_old_files()
+        self.__last_counters = self.__registry.counters()
+        self.__last_time = time.monotonic()
+        self.__timer.start(self.INTERVAL)
+
+    def stop(self):
+        if self.__timer.isActive():
+            self.__timer.stop()
+            self.write()
+
+    def write(self):
+        now = time.monotonic()
+        elapsed = now - self.__last_time
+        values = self.__registry.values()
+        counters = self.__registry.counters()
+        rates = {}
+        if elapsed > 0:
+            for key, value in counters.items():
+                rates[key] = round((value - self.__last_counters.get(key, 0)) / elapsed, 3)
+        self.__last_counters = counters
+        self.__last_time = now
+
+        date_time = QDateTime.currentDateTime()
+        line = json.dumps({
+            "time": date_time.toString("yyyy-MM-ddTHH:mm:ss.zzz"),
+            "metrics": values,
+            "rates": rates
+        })
+        path = f"{self.__dir}/ds-metrics-{date_time.toString('yyyy-MM-dd')}.jsonl"
+        try:
+            with open(path, "a") as metrics_file:
+                metrics_file.write(line + "\n")
+            self.__error_logged = False
+        except OSError as e:
+            if not self.__error_logged:
+                logger.log_warning(f"Unable to write metrics: {e}")
+                self.__error_logged = True
+
+    def __remove_old_files(self):
+        cutoff = time.time() - self.KEEP_DAYS * 24 * 60 * 60
+        for file_name in QDir(self.__dir).entryList(["ds-metrics-*.jsonl"], QDir.Files):
+            path = f"{self.__dir}/{file_name}"
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+class MetricsHttpServer(QObject):
+    """
+    Serves the metrics as text (Prometheus format) on localhost. Any GET request gets the metrics.
+    """
+
+    # Requests larger than this are not valid
+    MAX_REQUEST = 8192
+
+    def __init__(self, registry: MetricsRegistry, parent: Optional[QObject] = None):
+        super().__init__(parent)
+        self.__registry = registry
+        self.__server = QTcpServer(self)
+        self.__server.newConnection.connect(self.__new_connection)
+        self.__requests: Dict[QTcpSocket, bytearray] = {}
+
+    @property
+    def port(self) -> int:
+        return self.__server.serverPort() if self.__server.isListening() else 0
+
+    def listen(self, port: int) -> Tuple[bool, str]:
+        # Returns (success, error message)
+        self.close()
+        if self.__server.listen(QHostAddress(QHostAddress.LocalHost), port):
+            return True, ""
+        return False, self.__server.errorString()
+
+    def close(self):
+        if self.__server.isListening():
+            self.__server.close()
+
+    def __new_connection(self):
+        while self.__server.hasPendingConnections():
+            socket = self.__server.nextPendingConnection()
+            self.__requests[socket] = bytearray()
+            socket.readyRead.connect(lambda socket=socket: self.__ready_read(socket))
+            socket.disconnected.connect(lambda socket=socket: self.__disconnected(socket))
+
+    def __ready_read(self, socket: QTcpSocket):
+        request = self.__requests.get(socket, None)
+        if request is None:
+            return
+        request.extend(bytes(socket.readAll()))
+        if len(request) > self.MAX_REQUEST:
+            self.__respond(socket, "413 Payload Too Large", "")
+        elif b"\r\n\r\n" in request or b"\n\n" in request:
+            if request.startswith(b"GET "):
+                self.__respond(socket, "200 OK", self.__registry.text())
+            else:
+                self.__respond(socket, "405 Method Not Allowed", "")
+
+    def __respond(self, socket: QTcpSocket, status: str, body: str):
+        del self.__requests[socket]
+        data = body.encode()
+        socket.write(
+            f"HTTP/1.0 {status}\r\n"
+            f"Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + data)
+        socket.disconnectFromHost()
+
+    def __disconnected(self, socket: QTcpSocket):
+        self.__requests.pop(socket, None)
+        socket.deleteLater()
+
+
+metrics: MetricsRegistry = MetricsRegistry()
@@ -0,0 +1,89 @@
+from typing import Dict, Iterator, Optional
+
+
+class NetTableEntry:
+    """
+    One net table value. Values are text. Number and bool views are parsed the first time
+    they are read and kept until the value changes.
+    """
+
+    # Marks a view that has not been parsed yet
+    __UNPARSED = object()
+
+    __slots__ = ["value", "__number", "__boolean"]
+
+    def __init__(self, value: str):
+        self.value = value
+        self.__number = NetTableEntry.__UNPARSED
+        self.__boolean = NetTableEntry.__UNPARSED
+
+    @property
+    def number(self) -> Optional[float]:
+        # None if the value is not a number
+        if self.__number is NetTableEntry.__UNPARSED:
+            try:
+                self.__number = float(self.value)
+            except ValueError:
+                self.__number = None
+        return self.__number
+
+    @property
+    def boolean(self) -> Optional[bool]:
+        # None if the value is not a bool ("true" / "false" / "1" / "0", any case)
+        if self.__boolean is NetTableEntry.__UNPARSED:
+            text = self.value.strip().lower()
+            if text == "true" or text == "1":
+                self.__boolean = True
+            elif text == "false" or text == "0":
+                self.__boolean = False
+            else:
+                self.__boolean = None
+        return self.__boolean
+
+
+class NetTable:
+    """
+    Net table key / value store. set reports if the value actually changed so unchanged
+    updates can be dropped before anything else sees them.
+    """
+    def __init__(self):
+        self.__entries: Dict[str, NetTableEntry] = {}
+
+    def set(self, key: str, value: str) -> bool:
+        # Returns False if key already had this value
+        entry = self.__entries.get(key, None)
+        if entry is None:
+            self.__entries[key] = NetTableEntry(value)
+            return True
+        if entry.value == value:
+            return False
+        # Value changed. Parsed views are no longer valid.
+        self.__entries[key] = NetTableEntry(value)
+        return True
+
+    def get(self, key: str, default: str = "") -> str:
+        entry = self.__entries.get(key, None)
+        return default if entry is None else entry.value
+
+    def number(self, key: str) -> Optional[float]:
+        entry = self.__entries.get(key, None)
+        return None if entry is None else entry.number
+
+    def boolean(self, key: str) -> Optional[bool]:
+        entry = self.__entries.get(key, None)
+        return None if entry is None else entry.boolean
+
+    def __getitem__(self, key: str) -> str:
+        return self.__entries[key].value
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__entries
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__entries)
+
+    def keys(self):
+        return self.__entries.keys()
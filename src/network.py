@@ -1,14 +1,21 @@
 
 from enum import Enum
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Union
 
-from util import logger
+from util import logger, Logger
+from diagnostics import input_latency
+from metrics import metrics, MetricsRegistry
+from watchdog import StallWatchdog
+from net_table import NetTable
+from nt_protocol import NtBinaryDecoder, NtBinaryEncoder, NT_BINARY_ACK, FRAME_SYNC_START, FRAME_SYNC_STOP, FRAME_UDP_DISABLE_ACK
 
-from PySide6.QtCore import QObject, QProcess, QTime, QTimer, Signal
+from PySide6.QtCore import QObject, QProcess, QTime, QTimer, Qt, Signal
 from PySide6.QtNetwork import QAbstractSocket, QHostAddress, QTcpSocket, QUdpSocket
 
+import os
 import platform
+import time
 
 # Networking protocol
 # The drive station uses four ports to communicate with the robot.
@@ -36,6 +43,12 @@ import platform
 #     "ENABLE" = Enable the robot
 #     "DISABLE" = Disable the robot
 #     "NT_SYNC" = Start network table sync (always triggered by drive station)
+#     "NT_BINARY" = Request the binary net table protocol (see nt_protocol.py). Robots that don't support it ignore it.
+#     "UDP_DISABLE [token]" = Offer a disable path on the controller port. token is 16 hex digits (8 random bytes,
+#           new for each connection). Robots that support it acknowledge on the net table port (text frame 255,253,\n
+#           or a binary UDP_DISABLE_ACK frame). After that the DS may also disable the robot by sending the controller
+#           port datagram [255,token (8 bytes),\n] (usually more than once). Robots that don't support it ignore it
+#           and are never sent this datagram.
 # Net Table port (TCP 8092):
 #     Data is sent and received on the net table port.
 #     New keys are sent to the drive station in the format shown below
@@ -51,6 +64,8 @@ import platform
 # Log port  (TCP 8093):
 #     Log messages are sent as strings from the robot to the drive station on this port. No data is sent to the robot
 #     from the drive station on this port.
+# A robot address may be given as "host:port" to use port, port+1, ... instead of 8090-8093
+# (eg for several robot programs on one machine).
             
 
 
@@ -71,6 +86,12 @@ class NetworkManager(QObject):
 
     has_log_data = Signal(str)
 
+    # Emitted from the watchdog thread. Args: ms since controller data was last produced
+    __watchdog_tripped = Signal(float)
+
+    # Managers created so far (default session labels)
+    __instance_count = 0
+
 
     # Constants
     CONTROLLER_PORT = 8090
@@ -81,26 +102,64 @@ class NetworkManager(QObject):
     SHORT_RECONNECT = 1500
     LONG_RECONNECT = 5000
 
+    # Robot is disabled if no controller data is produced for this long while enabled (ms)
+    DEFAULT_STALL_TIMEOUT = 500
+
     CMD_ENABLE = b'ENABLE\n'
     CMD_DISABLE = b'DISABLE\n'
     CMD_NT_SYNC = b'NT_SYNC\n'
+    CMD_NT_BINARY = b'NT_BINARY\n'
+    CMD_UDP_DISABLE = b'UDP_DISABLE'
+
+    # Controller port datagram that disables the robot (followed by the token and \n)
+    UDP_DISABLE_MARKER = b'\xff'
+    UDP_DISABLE_ACK = b'\xff\xfd\n'
+    UDP_DISABLE_REPEAT = 3
 
     NT_SYNC_START_DATA = b'\xff\xff\n'
     NT_SYNC_STOP_DATA = b'\xff\xff\xff\n'
 
+    # Outgoing net table data is held (and repeated writes of a key merged) while more
+    # than this many bytes are waiting to be sent by the socket
+    NT_MAX_UNSENT = 64 * 1024
+
     ############################################################################
     # External facing functions
     ############################################################################
 
-    def __init__(self):
-        super().__init__()
+    def __init__(self, log: Optional[Logger] = None, parent: Optional[QObject] = None, session: Optional[str] = None):
+        # log receives this manager's messages and the robot's log (defaults to the global logger)
+        # session labels this manager's metrics (defaults to a number unique to this manager), so
+        # sessions using the same robot address never share metrics
+        super().__init__(parent)
+        self.__log = logger if log is None else log
+        if session is None:
+            session = str(NetworkManager.__instance_count)
+        NetworkManager.__instance_count += 1
+        self.__session = session
         self.__state = NetworkManager.State.Init
         self.__robot_address = ""
-        self.__net_table: Dict[str, str] = {}
+        self.__robot_host = ""
+        self.__robot_host_address = QHostAddress()
+        self.__port_base = self.CONTROLLER_PORT
+        self.__net_table = NetTable()
         self.__nt_modifiable = True
         self.__sync_keys: List[str] = []
         self.__sync_values: List[str] = []
         self.__net_table_read_buf = bytearray()
+
+        # Binary net table protocol (requested on connect if enabled, used if the robot agrees)
+        self.__nt_binary_requested = False
+        self.__nt_binary_sent = False # Requested on the current connection
+        self.__nt_binary = False
+        self.__nt_encoder = NtBinaryEncoder()
+        self.__nt_decoder = NtBinaryDecoder()
+
+        # Outgoing net table queue. Key names (value read when sent) or raw frames, in order.
+        # Keys queued since the last raw frame are merged (only latest value is sent).
+        self.__nt_send_queue: List[Union[str, bytes]] = []
+        self.__nt_send_queued_keys: Dict[str, None] = {}
+        self.__nt_superseded = 0
         self.__log_read_buf = bytearray()
         
         # Socket objects
@@ -116,13 +175,34 @@ class NetworkManager(QObject):
         self.__connect_retry_timer = QTimer(self)
         self.__connect_retry_timer.setSingleShot(True)
 
+        # Sends queued net table data once per event loop iteration
+        self.__nt_flush_timer = QTimer(self)
+        self.__nt_flush_timer.setSingleShot(True)
+        self.__nt_flush_timer.setInterval(0)
+
         # Used to ping robot to determine if it exists
         self.__ping_process = QProcess(self)
 
+        # Controller port disable path (token is negotiated on each connection)
+        self.__udp_disable_token = b''
+        self.__udp_disable_ok = False
+        self.__disable_latency_ms = 0.0
+        self.__disable_latency_max_ms = 0.0
+
+        # Disables the robot (without the event loop) if controller data stops while enabled
+        self.__watchdog = StallWatchdog(self.CMD_DISABLE, self.__watchdog_tripped.emit)
+        self.__watchdog.timeout_ms = self.DEFAULT_STALL_TIMEOUT
+        self.__watchdog_tripped.connect(self.__on_watchdog_tripped, Qt.QueuedConnection)
+
+        # Health metrics (labeled with the robot address, so created again when it changes)
+        self.__sync_start_time = 0.0
+        self.__create_metrics()
+
         # Signal / Slot setup
         self.__connect_timeout_timer.timeout.connect(self.__tcp_cancel_connect)
         self.__connect_retry_timer.timeout.connect(self.__attempt_connect)
         self.__ping_process.finished.connect(self.__ping_finished)
+        self.__nt_flush_timer.timeout.connect(self.__nt_flush)
 
         self.__cmd_socket.connected.connect(lambda: self.__tcp_connected(self.__cmd_socket))
         self.__net_table_socket.connected.connect(lambda: self.__tcp_connected(self.__net_table_socket))
@@ -133,17 +213,76 @@ class NetworkManager(QObject):
         self.__log_socket.errorOccurred.connect(lambda se: self.__tcp_error_occurred(self.__log_socket, se))
 
         self.__net_table_socket.readyRead.connect(self.__net_table_ready_read)
+        self.__net_table_socket.bytesWritten.connect(self.__nt_bytes_written)
         self.__log_socket.readyRead.connect(self.__log_ready_read)
 
     @property
     def current_state(self) -> State:
         return self.__state
 
+    @property
+    def robot_address(self) -> str:
+        return self.__robot_address
+
+    @property
+    def use_binary_nt(self) -> bool:
+        # True if the binary net table protocol will be requested (takes effect next connection)
+        return self.__nt_binary_requested
+
+    @use_binary_nt.setter
+    def use_binary_nt(self, value: bool):
+        self.__nt_binary_requested = value
+
+    @property
+    def nt_is_binary(self) -> bool:
+        # True if the current connection uses the binary net table protocol
+        return self.__nt_binary
+
+    @property
+    def nt_send_queue_depth(self) -> int:
+        # Net table frames waiting to be given to the socket
+        return len(self.__nt_send_queue)
+
+    @property
+    def nt_bytes_unsent(self) -> int:
+        # Bytes given to the socket that have not been sent yet
+        return self.__net_table_socket.bytesToWrite()
+
+    @property
+    def nt_superseded(self) -> int:
+        # Number of queued net table values replaced by a newer value before being sent
+        return self.__nt_superseded
+
+    @property
+    def udp_disable_ok(self) -> bool:
+        # True if the robot accepted the controller port disable path
+        return self.__udp_disable_ok
+
+    @property
+    def disable_latency_ms(self) -> float:
+        # Time from the most recent user disable request until it was given to the OS (ms)
+        return self.__disable_latency_ms
+
+    @property
+    def disable_latency_max_ms(self) -> float:
+        return self.__disable_latency_max_ms
+
+    @property
+    def stall_timeout(self) -> int:
+        # Stall watchdog deadline (ms). 0 = off.
+        return self.__watchdog.timeout_ms
+
+    @stall_timeout.setter
+    def stall_timeout(self, value: int):
+        self.__watchdog.timeout_ms = value
+
     def stop(self):
         # Intended to be called before closing DS application
+        self.__watchdog.stop()
         self.__cmd_socket.abort()
         self.__net_table_socket.abort()
         self.__log_socket.abort()
+        self.__udp_disable_ok = False
 
     def set_robot_address(self, robot_address: str):
         # Cancel any pending reconnect attempt
@@ -172,23 +311,57 @@ class NetworkManager(QObject):
 
         # Change robot address
         self.__robot_address = robot_address
+        self.__robot_host, self.__port_base = self.__split_address(robot_address)
+        self.__robot_host_address = QHostAddress(self.__robot_host)
+        self.__udp_disable_ok = False
+        self.__create_metrics()
 
-        logger.log_info(f"Looking for robot at '{self.__robot_address}'")
+        self.__log.log_info(f"Looking for robot at '{self.__robot_address}'")
 
         # Attempt a connect now
         self.__connect_retry_timer.start(0)
 
     def send_enable_command(self):
         if self.__is_connected():
-            self.__cmd_socket.write(self.CMD_ENABLE)
-
-    def send_disable_command(self):
-        if self.__is_connected():
-            self.__cmd_socket.write(self.CMD_DISABLE)
-
-    def send_controller_data(self, controller_data: bytes):
+            self.__tcp_write(self.__cmd_socket, self.CMD_ENABLE)
+
+    def send_disable_command(self, requested_at: Optional[float] = None):
+        # Highest priority command. Sent on every channel that is up (not only when fully connected)
+        # and given to the OS immediately instead of when the event loop next runs.
+        # requested_at is time.perf_counter() when the user asked to disable (to measure latency).
+        sent = False
+        if self.__cmd_socket.state() == QAbstractSocket.SocketState.ConnectedState:
+            self.__tcp_write(self.__cmd_socket, self.CMD_DISABLE)
+            self.__cmd_socket.flush()
+            sent = True
+        if self.__udp_disable_ok:
+            # Datagrams can be lost. Send a few.
+            datagram = self.UDP_DISABLE_MARKER + self.__udp_disable_token + b'\n'
+            for _ in range(self.UDP_DISABLE_REPEAT):
+                self.__controller_socket.writeDatagram(datagram, self.__robot_host_address, self.__port_base)
+            self.__metric_udp_disables.inc()
+            sent = True
+        if sent and requested_at is not None:
+            self.__disable_latency_ms = (time.perf_counter() - requested_at) * 1000.0
+            self.__disable_latency_max_ms = max(self.__disable_latency_max_ms, self.__disable_latency_ms)
+            self.__metric_disable_latency.set(self.__disable_latency_ms)
+            self.__metric_disable_latency_max.set(self.__disable_latency_max_ms)
+
+    def send_controller_data(self, controller_data: bytes, input_time: Optional[float] = None, encode_time: Optional[float] = None):
+        # input_time is when the oldest input included in the data happened and encode_time is when
+        # the data was made (time.perf_counter()). Given for data with new input to measure latency.
         if self.__is_connected():
-            self.__controller_socket.writeDatagram(controller_data, QHostAddress(self.__robot_address), 8090)
+            self.__controller_socket.writeDatagram(controller_data, self.__robot_host_address, self.__port_base)
+            if input_time is not None:
+                input_latency.record(input_time, encode_time, time.perf_counter())
+            self.__metric_controller_packets.inc()
+            self.__metric_controller_bytes.inc(len(controller_data))
+
+    def feed_watchdog(self):
+        # Call each time controller data is produced (even if there are no controllers to send)
+        stall_ms = self.__watchdog.feed()
+        if stall_ms is not None:
+            self.__log.log_warning(f"Controller data resumed after a {stall_ms:.0f} ms stall.")
 
     def set_net_table(self, key: str, value: str) -> bool:
         # THIS IS A SET FROM THE UI IN THE DRIVE STATION
@@ -200,8 +373,8 @@ class NetworkManager(QObject):
             return
 
         if self.__nt_modifiable:
-            self.__net_table[key] = value
-            self.__send_nt_key(key)
+            if self.__net_table.set(key, value):
+                self.__send_nt_key(key)
             return True
         return False
     
@@ -214,13 +387,21 @@ class NetworkManager(QObject):
                 self.__change_state(NetworkManager.State.Enabled)
             return
 
-        self.__net_table[key] = value
-        self.nt_data_changed.emit(key, value)
+        # Unchanged values are not passed on
+        if self.__net_table.set(key, value):
+            self.__metric_nt_updates.inc()
+            self.nt_data_changed.emit(key, value)
     
     def get_net_table(self, key: str) -> str:
-        if key not in self.__net_table:
-            return ""
-        return self.__net_table[key]
+        return self.__net_table.get(key)
+
+    def get_net_table_number(self, key: str) -> Optional[float]:
+        # None if key is missing or not a number. Parsed once per value.
+        return self.__net_table.number(key)
+
+    def get_net_table_bool(self, key: str) -> Optional[bool]:
+        # None if key is missing or not a bool. Parsed once per value.
+        return self.__net_table.boolean(key)
     
     def has_net_table(self, key: str) -> bool:
         return key in self.__net_table
@@ -232,8 +413,9 @@ class NetworkManager(QObject):
     def __nt_start_sync(self):
         if not self.__nt_modifiable:
             return # Already syncing
+        self.__sync_start_time = time.perf_counter()
         self.nt_sync_started.emit()
-        logger.log_info("Starting network table sync.")
+        self.__log.log_info("Starting network table sync.")
         self.__nt_modifiable = False
     
     def __nt_finish_sync(self, keys: List[str], values: List[str]):
@@ -245,27 +427,33 @@ class NetworkManager(QObject):
             value = values[i]
             self.__nt_set_from_robot(key, value)
 
-        logger.log_debug(f"Got {len(keys)} entries from robot.")
-        logger.log_debug("Done syncing keys from robot to DS. Syncing from DS to robot.")
+        self.__log.log_debug(f"Got {len(keys)} entries from robot.")
+        self.__log.log_debug("Done syncing keys from robot to DS. Syncing from DS to robot.")
 
         # Next, send anything the robot was missing (that the DS has) to the robot.
         # Only send the robot keys it did not have
+        robot_keys = set(keys)
         for key in self.__net_table.keys():
-            if key not in keys:
+            if key not in robot_keys:
                 self.__send_nt_key(key)
         
-        logger.log_debug("Done syncing data from DS to robot.")
+        self.__log.log_debug("Done syncing data from DS to robot.")
 
         # Send sync stop data to finish sync
-        self.__send_nt_raw(self.NT_SYNC_STOP_DATA)
+        self.__send_nt_raw(self.__nt_encoder.sync_stop() if self.__nt_binary else self.NT_SYNC_STOP_DATA)
 
         # Make sure network table is modifiable again
         self.__nt_modifiable = True
 
+        sync_ms = (time.perf_counter() - self.__sync_start_time) * 1000.0
+        self.__metric_syncs.inc()
+        self.__metric_sync_ms.inc(sync_ms)
+        self.__metric_sync_last_ms.set(sync_ms)
+
         self.nt_sync_finished.emit()
 
         # Emit signal after everything complete
-        logger.log_info("Network table sync complete.")
+        self.__log.log_info("Network table sync complete.")
 
     def __nt_abort_sync(self):
         if self.__nt_modifiable:
@@ -274,12 +462,12 @@ class NetworkManager(QObject):
         if self.__is_connected():
             # If sync failed for any reason other than a disconnect send the 
             # sync end data to unlock the robot's net table
-            self.__send_nt_raw(self.NT_SYNC_STOP_DATA)
+            self.__send_nt_raw(self.__nt_encoder.sync_stop() if self.__nt_binary else self.NT_SYNC_STOP_DATA)
         
         self.nt_sync_finished.emit()
 
         # Inform DS (so it can log and unlock indicator panel)
-        logger.log_warning("Network table sync aborted.")
+        self.__log.log_warning("Network table sync aborted.")
 
         # Allow modifications again
         self.__nt_modifiable = True
@@ -287,16 +475,110 @@ class NetworkManager(QObject):
 
     def __send_nt_key(self, key: str):
         if self.__is_connected():
-            data = bytearray()
-            data.extend(key.encode())
-            data.extend(b'\xff')
-            data.extend(self.__net_table[key].encode())
-            data.extend(b'\n')
-            self.__net_table_socket.write(bytes(data))
+            if key in self.__nt_send_queued_keys:
+                # Not sent yet. The newer value will be sent instead.
+                self.__nt_superseded += 1
+                return
+            self.__nt_send_queued_keys[key] = None
+            self.__nt_send_queue.append(key)
+            self.__nt_schedule_flush()
 
     def __send_nt_raw(self, data: bytes):
         if self.__is_connected():
-            self.__net_table_socket.write(data)
+            # Keys queued after this frame must be sent after it (not merged with earlier ones)
+            self.__nt_send_queued_keys.clear()
+            self.__nt_send_queue.append(data)
+            self.__nt_schedule_flush()
+
+    def __nt_schedule_flush(self):
+        if not self.__nt_flush_timer.isActive():
+            self.__nt_flush_timer.start()
+
+    def __nt_flush(self, force: bool = False):
+        if not self.__is_connected():
+            self.__nt_clear_send_queue()
+            return
+        if self.__net_table_socket.bytesToWrite() > self.NT_MAX_UNSENT and not force:
+            # Link is behind. Wait for bytesWritten (values keep merging meanwhile).
+            return
+        if len(self.__nt_send_queue) == 0:
+            return
+
+        # One write for everything queued
+        data = bytearray()
+        for item in self.__nt_send_queue:
+            if isinstance(item, str) and self.__nt_binary:
+                try:
+                    data.extend(self.__nt_encoder.set(item, self.__net_table[item]))
+                except ValueError:
+                    # Out of key ids. The robot only accepts binary frames now, so the key can't be sent.
+                    self.__log.log_warning(f"Net table key {item} not sent to robot (too many keys for binary protocol).")
+            elif isinstance(item, str):
+                data.extend(item.encode())
+                data.extend(b'\xff')
+                data.extend(self.__net_table[item].encode())
+                data.extend(b'\n')
+            else:
+                data.extend(item)
+        self.__nt_clear_send_queue()
+        self.__tcp_write(self.__net_table_socket, bytes(data))
+
+    def __nt_switch_to_binary(self):
+        # Robot agreed to use binary protocol. Anything queued was meant to be sent as text.
+        self.__nt_flush(force=True)
+        self.__tcp_write(self.__net_table_socket, NT_BINARY_ACK)
+        self.__nt_binary = True
+        self.__log.log_debug("Using binary net table protocol.")
+
+    def __nt_bytes_written(self, count: int):
+        if len(self.__nt_send_queue) > 0:
+            self.__nt_schedule_flush()
+
+    def __nt_clear_send_queue(self):
+        self.__nt_send_queue.clear()
+        self.__nt_send_queued_keys.clear()
+
+    ############################################################################
+    # Metrics
+    ############################################################################
+
+    def __create_metrics(self):
+        robot = self.__robot_address
+        session = self.__session
+
+        # Nothing is exported until there is a robot address
+        registry = metrics if robot != "" else MetricsRegistry()
+
+        def sent(port: str):
+            return (registry.counter("ds_packets_sent_total", "Datagrams or TCP writes sent to the robot", robot=robot, session=session, port=port),
+                    registry.counter("ds_bytes_sent_total", "Bytes sent to the robot", robot=robot, session=session, port=port))
+
+        def received(port: str):
+            return registry.counter("ds_bytes_received_total", "Bytes received from the robot", robot=robot, session=session, port=port)
+
+        self.__metric_controller_packets, self.__metric_controller_bytes = sent("controller")
+        self.__metrics_tcp_sent = {
+            self.__cmd_socket: sent("command"),
+            self.__net_table_socket: sent("net_table")
+        }
+        self.__metric_nt_bytes_received = received("net_table")
+        self.__metric_log_bytes_received = received("log")
+        self.__metric_nt_updates = registry.counter("ds_nt_updates_total", "Net table values changed by the robot", robot=robot, session=session)
+        self.__metric_log_lines = registry.counter("ds_robot_log_lines_total", "Robot log lines received", robot=robot, session=session)
+        self.__metric_connects = registry.counter("ds_robot_connects_total", "Connections to the robot program", robot=robot, session=session)
+        self.__metric_syncs = registry.counter("ds_nt_syncs_total", "Completed net table syncs", robot=robot, session=session)
+        self.__metric_sync_ms = registry.counter("ds_nt_sync_ms_total", "Total time (ms) spent in completed net table syncs", robot=robot, session=session)
+        self.__metric_udp_disables = registry.counter("ds_udp_disables_total", "Disable commands also sent on the controller port", robot=robot, session=session)
+        self.__metric_disable_latency = registry.gauge("ds_disable_latency_ms", "Time (ms) from the most recent disable request until it was sent", robot=robot, session=session)
+        self.__metric_disable_latency_max = registry.gauge("ds_disable_latency_max_ms", "Longest time (ms) from a disable request until it was sent", robot=robot, session=session)
+        self.__metric_watchdog_trips = registry.counter("ds_watchdog_trips_total", "Times the stall watchdog disabled the robot", robot=robot, session=session)
+        self.__metric_sync_last_ms = registry.gauge("ds_nt_sync_last_ms", "Duration (ms) of the most recent net table sync", robot=robot, session=session)
+
+    def __tcp_write(self, socket: QTcpSocket, data: bytes):
+        socket.write(data)
+        packets, sent_bytes = self.__metrics_tcp_sent[socket]
+        packets.inc()
+        sent_bytes.inc(len(data))
 
     ############################################################################
     # Internal connection / state functions
@@ -306,8 +588,27 @@ class NetworkManager(QObject):
         did_change = self.__state != state
         self.__state = state
         if did_change:
+            if state == NetworkManager.State.Enabled:
+                self.__watchdog.arm(int(self.__cmd_socket.socketDescriptor()))
+            else:
+                self.__watchdog.disarm()
             self.state_changed.emit(self.__state)
 
+    def __on_watchdog_tripped(self, stalled_ms: float):
+        # The watchdog already sent the disable command. It is sent again through the socket in case
+        # an enable command was waiting in the socket's buffer.
+        self.__metric_watchdog_trips.inc()
+        self.__log.log_error(f"No controller data for {stalled_ms:.0f} ms while enabled. Robot disabled by stall watchdog.")
+        self.send_disable_command()
+
+    def __split_address(self, robot_address: str):
+        # "host:port" -> (host, port). Anything else (including IPv6 addresses) is just a host.
+        if robot_address.count(":") == 1:
+            host, port = robot_address.split(":")
+            if port.isdigit() and 0 < int(port) <= 65532:
+                return host, int(port)
+        return robot_address, self.CONTROLLER_PORT
+
     def __attempt_connect(self):
         # Attempt to ping IP (or resolve DNS name then ping IP) to determine if robot exists
         os_name = platform.system()
@@ -321,7 +622,7 @@ class NetworkManager(QObject):
             # Unix ping command uses "-W [milliseconds]"" for response timeout
             ping_args = ["-c", "1", "-W", "1000"]
         
-        ping_args.append(self.__robot_address)
+        ping_args.append(self.__robot_host)
 
         # When ping finishes, self.__ping_finished will be called
         self.__ping_process.kill()
@@ -332,8 +633,8 @@ class NetworkManager(QObject):
 
             # If the state was previously NoNetwork this is the first time ping succeeded. Log.
             if self.__state == NetworkManager.State.NoNetwork:
-                logger.log_info(f"Found robot at '{self.__robot_address}'")
-                logger.log_info("Attempting to connect to robot program.")
+                self.__log.log_info(f"Found robot at '{self.__robot_address}'")
+                self.__log.log_info("Attempting to connect to robot program.")
 
             # Something found at the robot address. Attempt to connect.
             self.__change_state(NetworkManager.State.NoRobotProgram)
@@ -342,17 +643,18 @@ class NetworkManager(QObject):
             self.__connect_timeout_timer.start(5000)
 
             # Attempt connection (see TCP slots below for event handling)
-            addr = QHostAddress(self.__robot_address)
-            self.__cmd_socket.connectToHost(addr, self.COMMAND_PORT)
-            self.__net_table_socket.connectToHost(addr, self.NET_TABLE_PORT)
-            self.__log_socket.connectToHost(addr, self.LOG_PORT)
+            addr = self.__robot_host_address
+            offset = self.__port_base - self.CONTROLLER_PORT
+            self.__cmd_socket.connectToHost(addr, self.COMMAND_PORT + offset)
+            self.__net_table_socket.connectToHost(addr, self.NET_TABLE_PORT + offset)
+            self.__log_socket.connectToHost(addr, self.LOG_PORT + offset)
         else:
 
             # If the state was previously NoRobotProgram, this indicates that a 
             # network error has occurred and caused communication between PC and robot to fail.
             # Log
             if self.__state == NetworkManager.State.NoRobotProgram:
-                logger.log_error(f"No longer able to find robot at '{self.__robot_address}'")
+                self.__log.log_error(f"No longer able to find robot at '{self.__robot_address}'")
 
             # Cannot ping the robot address. No robot found at this address.
             self.__change_state(NetworkManager.State.NoNetwork)
@@ -368,6 +670,7 @@ class NetworkManager(QObject):
         self.__cmd_socket.abort()
         self.__net_table_socket.abort()
         self.__log_socket.abort()
+        self.__udp_disable_ok = False
 
         # Assume the robot can still be pinged.
         self.__change_state(NetworkManager.State.NoRobotProgram)
@@ -398,16 +701,37 @@ class NetworkManager(QObject):
     ############################################################################
 
     def __tcp_connected(self, socket: QTcpSocket):
+        # Commands (disable especially) must not wait for more data to be written
+        socket.setSocketOption(QAbstractSocket.LowDelayOption, 1)
+
         if self.__is_connected():
             # Cancel the connect timeout timer
             self.__connect_timeout_timer.stop()
 
-            logger.log_info("Connected to robot.")
+            self.__log.log_info("Connected to robot.")
+
+            # Anything queued belonged to a previous connection
+            self.__nt_clear_send_queue()
+
+            # Net table protocol starts as text for every connection
+            self.__net_table_read_buf = bytearray()
+            self.__nt_binary = False
+            self.__nt_encoder = NtBinaryEncoder()
+            self.__nt_decoder = NtBinaryDecoder()
+            self.__nt_binary_sent = self.__nt_binary_requested
+            if self.__nt_binary_sent:
+                self.__tcp_write(self.__cmd_socket, self.CMD_NT_BINARY)
+
+            # Offer the controller port disable path (used once the robot acknowledges)
+            self.__udp_disable_ok = False
+            self.__udp_disable_token = os.urandom(8)
+            self.__tcp_write(self.__cmd_socket, self.CMD_UDP_DISABLE + b' ' + self.__udp_disable_token.hex().encode() + b'\n')
 
             # Request the robot begin a net table sync
-            self.__cmd_socket.write(self.CMD_NT_SYNC)
+            self.__tcp_write(self.__cmd_socket, self.CMD_NT_SYNC)
 
             # Connected to the robot. The robot is disabled until an enable command is sent.
+            self.__metric_connects.inc()
             self.__change_state(NetworkManager.State.Disabled)
 
     def __tcp_error_occurred(self, socket: QTcpSocket, sock_error: QAbstractSocket.SocketError):
@@ -418,7 +742,7 @@ class NetworkManager(QObject):
             # This will likely occur at the same time for all TCP sockets. Only handle for the first one
             if self.__is_connected():
 
-                logger.log_warning("Lost connection to robot")
+                self.__log.log_warning("Lost connection to robot")
 
                 # If any socket is disconnected disconnect all sockets
                 self.__cmd_socket.disconnectFromHost()
@@ -428,6 +752,9 @@ class NetworkManager(QObject):
                 # Connection could have been lost during sync
                 self.__nt_abort_sync()
 
+                # The controller port disable path was agreed with the program that disconnected
+                self.__udp_disable_ok = False
+
                 # For now, assume the robot can still be pingged
                 # All that is known is the connection to running program was lost
                 self.__change_state(NetworkManager.State.NoRobotProgram)
@@ -449,6 +776,10 @@ class NetworkManager(QObject):
 
     def __net_table_ready_read(self):
         new_data = bytes(self.__net_table_socket.readAll())
+        self.__metric_nt_bytes_received.inc(len(new_data))
+        if self.__nt_binary:
+            self.__nt_binary_received(new_data)
+            return
         self.__net_table_read_buf.extend(new_data)
 
         # Data is encoded as
@@ -473,6 +804,17 @@ class NetworkManager(QObject):
                 self.__nt_start_sync()
             elif subset == self.NT_SYNC_STOP_DATA:
                 self.__nt_finish_sync(self.__sync_keys, self.__sync_values)
+            elif subset == self.UDP_DISABLE_ACK:
+                self.__udp_disable_acknowledged()
+            elif subset == NT_BINARY_ACK:
+                if self.__nt_binary_sent:
+                    # Everything after this is binary
+                    remaining = bytes(self.__net_table_read_buf[end_pos+1:len(self.__net_table_read_buf)])
+                    self.__net_table_read_buf = bytearray()
+                    self.__nt_switch_to_binary()
+                    self.__nt_binary_received(remaining)
+                    return
+                # Binary was not requested on this connection. Ignored like any unknown frame.
             else:
                 # Make sure the message has a key/value delimiter
                 delim_pos = subset.find(b'\xff')
@@ -481,22 +823,43 @@ class NetworkManager(QObject):
                     key = subset[0:delim_pos].decode()
                     value = subset[delim_pos + 1 : len(subset) - 1].decode()
 
-                    if self.__nt_modifiable:
-                        # Not in sync. Set now
-                        self.__nt_set_from_robot(key, value)
-                    else:
-                        # In sync. Store for when sync is done.
-                        self.__sync_keys.append(key)
-                        self.__sync_values.append(value)
+                    self.__nt_received_value(key, value)
 
             # Remove the subset that has already been handled from the buffer
             self.__net_table_read_buf = self.__net_table_read_buf[end_pos+1:len(self.__net_table_read_buf)]
 
+    def __nt_binary_received(self, data: bytes):
+        for frame_type, key, value in self.__nt_decoder.feed(data):
+            if frame_type == FRAME_SYNC_START:
+                self.__sync_keys = []
+                self.__sync_values = []
+                self.__nt_start_sync()
+            elif frame_type == FRAME_SYNC_STOP:
+                self.__nt_finish_sync(self.__sync_keys, self.__sync_values)
+            elif frame_type == FRAME_UDP_DISABLE_ACK:
+                self.__udp_disable_acknowledged()
+            else:
+                self.__nt_received_value(key, value)
+
+    def __nt_received_value(self, key: str, value: str):
+        if self.__nt_modifiable:
+            # Not in sync. Set now
+            self.__nt_set_from_robot(key, value)
+        else:
+            # In sync. Store for when sync is done.
+            self.__sync_keys.append(key)
+            self.__sync_values.append(value)
+
+    def __udp_disable_acknowledged(self):
+        self.__udp_disable_ok = True
+        self.__log.log_debug("Robot accepted controller port disable.")
+
 
 
     def __log_ready_read(self):
         # Append data until there is a complete line
         new_data = bytes(self.__log_socket.readAll())
+        self.__metric_log_bytes_received.inc(len(new_data))
         self.__log_read_buf.extend(new_data)
 
         if(self.__log_read_buf.find(b'\n') != -1):
@@ -516,5 +879,6 @@ class NetworkManager(QObject):
                 self.__log_read_buf = self.__log_read_buf[last_newline+1:len(self.__log_read_buf)]
                 print(self.__log_read_buf)
 
+            self.__metric_log_lines.inc(len(lines))
             for line in lines:
-                logger.log_from_robot(line.decode())
+                self.__log.log_from_robot(line.decode())
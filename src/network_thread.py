@@ -0,0 +1,376 @@
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from PySide6.QtCore import QObject, QThread, QTimer, Qt, Signal, Slot
+
+from net_table import NetTable
+from network import NetworkManager
+from util import logger, Logger
+
+import threading
+
+
+class NetworkEventQueue:
+    """
+    Bounded queue of events from the network thread to the GUI thread.
+    Net table values for a key that is still waiting in the queue replace the waiting value
+    (so a burst of updates to one key is one event). "nt" values are from the robot and "nt_set"
+    values are DS sets the network manager accepted. A merged event that includes a value from the
+    robot stays an "nt" event. Robot log lines beyond the limit are dropped and counted. State and
+    sync events are never dropped.
+    notify is called (from the network thread) when the queue stops being empty.
+    """
+
+    MAX_EVENTS = 10000
+
+    def __init__(self, notify):
+        self.__notify = notify
+        self.__lock = threading.Lock()
+        self.__events: Deque[List[Any]] = deque()
+        self.__nt_events: Dict[str, List[Any]] = {}
+        self.__dropped = 0
+
+    def put(self, kind: str, *args):
+        with self.__lock:
+            was_empty = len(self.__events) == 0
+            if kind == "nt" or kind == "nt_set":
+                key, value = args
+                event = self.__nt_events.get(key, None)
+                if event is not None:
+                    event[2] = value
+                    if kind == "nt":
+                        event[0] = kind
+                    return
+                event = [kind, key, value]
+                self.__nt_events[key] = event
+            elif kind == "robot_log" and len(self.__events) >= self.MAX_EVENTS:
+                self.__dropped += 1
+                return
+            else:
+                event = [kind, *args]
+            self.__events.append(event)
+        if was_empty:
+            self.__notify()
+
+    def take_all(self) -> Tuple[List[List[Any]], int]:
+        # Returns (events, number of robot log lines dropped since the last call)
+        with self.__lock:
+            events = list(self.__events)
+            dropped = self.__dropped
+            self.__events.clear()
+            self.__nt_events.clear()
+            self.__dropped = 0
+        return events, dropped
+
+
+class QueuedLog(Logger):
+    """
+    Logger for a network manager running on another thread. Messages are queued for the GUI.
+    """
+    def __init__(self, queue: NetworkEventQueue):
+        super().__init__()
+        self.__queue = queue
+
+    def log_debug(self, msg: str):
+        self.__queue.put("log", "debug", msg)
+
+    def log_info(self, msg: str):
+        self.__queue.put("log", "info", msg)
+
+    def log_warning(self, msg: str):
+        self.__queue.put("log", "warning", msg)
+
+    def log_error(self, msg: str):
+        self.__queue.put("log", "error", msg)
+
+    def log_from_robot(self, msg: str):
+        self.__queue.put("robot_log", msg)
+
+
+class NetworkWorker(QObject):
+    """
+    Lives on the network thread. Creates the network manager there and runs calls made
+    through ThreadedNetworkManager.
+    """
+    def __init__(self, queue: NetworkEventQueue, session: Optional[str]):
+        super().__init__()
+        self.__queue = queue
+        self.__session = session
+        self.__manager: Optional[NetworkManager] = None
+        self.__stats_timer: Optional[QTimer] = None
+        self.stats: Dict[str, Any] = {
+            "nt_is_binary": False, "nt_send_queue_depth": 0, "nt_bytes_unsent": 0, "nt_superseded": 0,
+            "udp_disable_ok": False, "disable_latency_ms": 0.0, "disable_latency_max_ms": 0.0
+        }
+
+    @Slot()
+    def start(self):
+        self.__manager = NetworkManager(QueuedLog(self.__queue), self, self.__session)
+        self.__manager.state_changed.connect(lambda state: self.__queue.put("state", state))
+        self.__manager.nt_data_changed.connect(lambda key, value: self.__queue.put("nt", key, value))
+        self.__manager.nt_sync_started.connect(lambda: self.__queue.put("sync_started"))
+        self.__manager.nt_sync_finished.connect(lambda: self.__queue.put("sync_finished"))
+        self.__stats_timer = QTimer(self)
+        self.__stats_timer.timeout.connect(self.copy_stats)
+        self.__stats_timer.start(ThreadedNetworkManager.STATS_INTERVAL)
+
+    @Slot()
+    def stop(self):
+        self.__stats_timer.stop()
+        self.__manager.stop()
+
+    @Slot(str)
+    def set_robot_address(self, robot_address: str):
+        self.__manager.set_robot_address(robot_address)
+
+    @Slot(bool)
+    def set_use_binary_nt(self, value: bool):
+        self.__manager.use_binary_nt = value
+
+    @Slot()
+    def send_enable_command(self):
+        self.__manager.send_enable_command()
+
+    @Slot(float)
+    def send_disable_command(self, requested_at: float):
+        self.__manager.send_disable_command(requested_at if requested_at > 0 else None)
+        self.copy_stats()
+
+    @Slot(bytes, float, float)
+    def send_controller_data(self, controller_data: bytes, input_time: float, encode_time: float):
+        if input_time > 0:
+            self.__manager.send_controller_data(controller_data, input_time, encode_time)
+        else:
+            self.__manager.send_controller_data(controller_data)
+
+    @Slot()
+    def feed_watchdog(self):
+        self.__manager.feed_watchdog()
+
+    @Slot(int)
+    def set_stall_timeout(self, value: int):
+        self.__manager.stall_timeout = value
+
+    @Slot(str, str)
+    def set_net_table(self, key: str, value: str):
+        # Rejected while syncing. The GUI thread's copy is only updated if accepted.
+        if self.__manager.set_net_table(key, value):
+            self.__queue.put("nt_set", key, value)
+
+    @Slot()
+    def copy_stats(self):
+        # Replaced as a whole (never modified in place) so GUI thread reads are consistent
+        self.stats = {
+            "nt_is_binary": self.__manager.nt_is_binary,
+            "nt_send_queue_depth": self.__manager.nt_send_queue_depth,
+            "nt_bytes_unsent": self.__manager.nt_bytes_unsent,
+            "nt_superseded": self.__manager.nt_superseded,
+            "udp_disable_ok": self.__manager.udp_disable_ok,
+            "disable_latency_ms": self.__manager.disable_latency_ms,
+            "disable_latency_max_ms": self.__manager.disable_latency_max_ms
+        }
+
+
+class ThreadedNetworkManager(QObject):
+    """
+    Same interface as NetworkManager, but the network manager (sockets, parsing, sync) runs on its
+    own thread. Calls are forwarded to that thread. Events come back through a NetworkEventQueue
+    and are handled in batches on the GUI thread. Net table reads use a copy kept on the GUI thread.
+    """
+
+    State = NetworkManager.State
+
+    # Signals (same as NetworkManager)
+    state_changed = Signal(object)
+    nt_data_changed = Signal(str, str)
+    nt_sync_started = Signal()
+    nt_sync_finished = Signal()
+
+    # Forwarded to the network thread
+    __events_available = Signal()
+    __set_robot_address = Signal(str)
+    __send_enable_command = Signal()
+    __send_disable_command = Signal(float)
+    __send_controller_data = Signal(bytes, float, float)
+    __feed_watchdog = Signal()
+    __set_stall_timeout = Signal(int)
+    __set_net_table = Signal(str, str)
+    __set_use_binary_nt = Signal(bool)
+    __stop = Signal()
+
+    # How often network manager stats are copied for the GUI thread (ms)
+    STATS_INTERVAL = 250
+
+    def __init__(self, log: Optional[Logger] = None, parent: Optional[QObject] = None, session: Optional[str] = None):
+        # session labels the network manager's metrics (see NetworkManager)
+        super().__init__(parent)
+        self.__log = logger if log is None else log
+        self.__state = NetworkManager.State.Init
+        self.__net_table = NetTable()
+        self.__nt_modifiable = True
+        self.__robot_address = ""
+        self.__use_binary_nt = False
+        self.__stall_timeout = NetworkManager.DEFAULT_STALL_TIMEOUT
+
+        self.__queue = NetworkEventQueue(self.__events_available.emit)
+        self.__events_available.connect(self.__handle_events, Qt.QueuedConnection)
+
+        # The worker creates the network manager once the thread is running (so everything
+        # the network manager owns belongs to the thread). Calls made before then are queued.
+        self.__thread = QThread()
+        self.__thread.setObjectName("NetworkThread")
+        self.__worker = NetworkWorker(self.__queue, session)
+        self.__worker.moveToThread(self.__thread)
+        self.__thread.started.connect(self.__worker.start, Qt.DirectConnection)
+        self.__thread.finished.connect(self.__worker.deleteLater, Qt.DirectConnection)
+
+        self.__set_robot_address.connect(self.__worker.set_robot_address, Qt.QueuedConnection)
+        self.__send_enable_command.connect(self.__worker.send_enable_command, Qt.QueuedConnection)
+        self.__send_disable_command.connect(self.__worker.send_disable_command, Qt.QueuedConnection)
+        self.__send_controller_data.connect(self.__worker.send_controller_data, Qt.QueuedConnection)
+        self.__set_net_table.connect(self.__worker.set_net_table, Qt.QueuedConnection)
+        self.__feed_watchdog.connect(self.__worker.feed_watchdog, Qt.QueuedConnection)
+        self.__set_stall_timeout.connect(self.__worker.set_stall_timeout, Qt.QueuedConnection)
+        self.__set_use_binary_nt.connect(self.__worker.set_use_binary_nt, Qt.QueuedConnection)
+        self.__stop.connect(self.__worker.stop, Qt.BlockingQueuedConnection)
+
+        self.__thread.start()
+
+    ############################################################################
+    # NetworkManager interface
+    ############################################################################
+
+    @property
+    def current_state(self) -> NetworkManager.State:
+        return self.__state
+
+    @property
+    def robot_address(self) -> str:
+        return self.__robot_address
+
+    @property
+    def use_binary_nt(self) -> bool:
+        return self.__use_binary_nt
+
+    @use_binary_nt.setter
+    def use_binary_nt(self, value: bool):
+        self.__use_binary_nt = value
+        self.__set_use_binary_nt.emit(value)
+
+    @property
+    def stall_timeout(self) -> int:
+        return self.__stall_timeout
+
+    @stall_timeout.setter
+    def stall_timeout(self, value: int):
+        self.__stall_timeout = value
+        self.__set_stall_timeout.emit(value)
+
+    @property
+    def nt_is_binary(self) -> bool:
+        return self.__worker.stats["nt_is_binary"]
+
+    @property
+    def nt_send_queue_depth(self) -> int:
+        return self.__worker.stats["nt_send_queue_depth"]
+
+    @property
+    def nt_bytes_unsent(self) -> int:
+        return self.__worker.stats["nt_bytes_unsent"]
+
+    @property
+    def nt_superseded(self) -> int:
+        return self.__worker.stats["nt_superseded"]
+
+    @property
+    def udp_disable_ok(self) -> bool:
+        return self.__worker.stats["udp_disable_ok"]
+
+    @property
+    def disable_latency_ms(self) -> float:
+        return self.__worker.stats["disable_latency_ms"]
+
+    @property
+    def disable_latency_max_ms(self) -> float:
+        return self.__worker.stats["disable_latency_max_ms"]
+
+    def stop(self):
+        # Intended to be called before closing DS application. Waits for the thread to finish.
+        if self.__thread.isRunning():
+            self.__stop.emit()
+            self.__thread.quit()
+            self.__thread.wait()
+
+    def set_robot_address(self, robot_address: str):
+        self.__robot_address = robot_address
+        self.__set_robot_address.emit(robot_address)
+
+    def send_enable_command(self):
+        self.__send_enable_command.emit()
+
+    def send_disable_command(self, requested_at: Optional[float] = None):
+        self.__send_disable_command.emit(0.0 if requested_at is None else requested_at)
+
+    def send_controller_data(self, controller_data: bytes, input_time: Optional[float] = None, encode_time: Optional[float] = None):
+        # Latency includes the hand off to the network thread
+        if input_time is None:
+            self.__send_controller_data.emit(controller_data, 0.0, 0.0)
+        else:
+            self.__send_controller_data.emit(controller_data, input_time, encode_time)
+
+    def feed_watchdog(self):
+        # Fed on the network thread, so a stall of either thread trips the watchdog
+        self.__feed_watchdog.emit()
+
+    def set_net_table(self, key: str, value: str) -> bool:
+        # Same rules as NetworkManager.set_net_table. The network thread may have started a sync
+        # that this thread doesn't know about yet, so the set is applied there first. The copy
+        # here is updated when it is accepted (get_net_table returns the old value until then).
+        if key == "robotstate" or key == "vbat0":
+            return
+        if self.__nt_modifiable:
+            self.__set_net_table.emit(key, value)
+            return True
+        return False
+
+    def get_net_table(self, key: str) -> str:
+        return self.__net_table.get(key)
+
+    def get_net_table_number(self, key: str) -> Optional[float]:
+        return self.__net_table.number(key)
+
+    def get_net_table_bool(self, key: str) -> Optional[bool]:
+        return self.__net_table.boolean(key)
+
+    def has_net_table(self, key: str) -> bool:
+        return key in self.__net_table
+
+    ############################################################################
+    # GUI thread
+    ############################################################################
+
+    def __handle_events(self):
+        events, dropped = self.__queue.take_all()
+        for event in events:
+            kind = event[0]
+            if kind == "nt":
+                if self.__net_table.set(event[1], event[2]):
+                    self.nt_data_changed.emit(event[1], event[2])
+            elif kind == "nt_set":
+                # Set from this DS (no data changed event, same as NetworkManager)
+                self.__net_table.set(event[1], event[2])
+            elif kind == "robot_log":
+                self.__log.log_from_robot(event[1])
+            elif kind == "log":
+                getattr(self.__log, "log_" + event[1])(event[2])
+            elif kind == "state":
+                self.__state = event[1]
+                self.state_changed.emit(event[1])
+            elif kind == "sync_started":
+                self.__nt_modifiable = False
+                self.nt_sync_started.emit()
+            elif kind == "sync_finished":
+                self.__nt_modifiable = True
+                self.nt_sync_finished.emit()
+        if dropped > 0:
+            self.__log.log_warning(f"Robot log is arriving faster than it can be shown. {dropped} lines dropped.")
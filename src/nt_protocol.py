@@ -0,0 +1,175 @@
+from typing import Dict, List, Optional, Tuple
+
+import struct
+
+# Binary net table protocol
+# Optional replacement for the text net table framing (see network.py). It is negotiated per
+# connection, so robots that don't support it keep using the text protocol:
+#     1. The DS sends the "NT_BINARY" command on the command port.
+#     2. A robot that supports it sends the text frame 255,254,\n on the net table port
+#        and uses binary frames for everything it sends after that.
+#     3. On receiving that frame, the DS sends the same frame back (after any text frames it
+#        had queued) and uses binary frames for everything it sends after that.
+#
+# Each binary frame is
+#     [type (u8)][payload length (unsigned LEB128 varint)][payload]
+# Frame types (all integers big endian):
+#     DEFINE (1):      [id (u16)][key (utf8)]      Assign id to key. Sent before the first value of the key.
+#     SET_STRING (2):  [id (u16)][value (utf8)]
+#     SET_INT (3):     [id (u16)][value (i32)]
+#     SET_DOUBLE (4):  [id (u16)][value (f64)]
+#     SYNC_START (5):  (no payload)
+#     SYNC_STOP (6):   (no payload)
+#     UDP_DISABLE_ACK (7): (no payload) Robot accepted the UDP disable token (see network.py)
+# Ids are assigned by the sender and are separate for each direction and each connection.
+# Values are text in the net table. Numeric types are only used when converting the number back
+# to text gives exactly the original text (str(int) for SET_INT, repr(float) for SET_DOUBLE).
+# Frames of unknown type are skipped (their length is known).
+
+NT_BINARY_ACK = b'\xff\xfe\n'
+
+FRAME_DEFINE = 1
+FRAME_SET_STRING = 2
+FRAME_SET_INT = 3
+FRAME_SET_DOUBLE = 4
+FRAME_SYNC_START = 5
+FRAME_SYNC_STOP = 6
+FRAME_UDP_DISABLE_ACK = 7
+
+MAX_KEY_ID = 0xFFFF
+
+
+def encode_frame(frame_type: int, payload: bytes = b'') -> bytes:
+    header = bytearray([frame_type])
+    length = len(payload)
+    while True:
+        byte = length & 0x7F
+        length >>= 7
+        if length:
+            header.append(byte | 0x80)
+        else:
+            header.append(byte)
+            break
+    return bytes(header) + payload
+
+
+class NtBinaryEncoder:
+    """
+    Builds binary net table frames. Keys are interned the first time they are sent.
+    """
+    def __init__(self):
+        self.__ids: Dict[str, int] = {}
+
+    def sync_start(self) -> bytes:
+        return encode_frame(FRAME_SYNC_START)
+
+    def sync_stop(self) -> bytes:
+        return encode_frame(FRAME_SYNC_STOP)
+
+    def udp_disable_ack(self) -> bytes:
+        return encode_frame(FRAME_UDP_DISABLE_ACK)
+
+    def set(self, key: str, value: str) -> bytes:
+        key_id = self.__ids.get(key, None)
+        data = b''
+        if key_id is None:
+            key_id = len(self.__ids)
+            if key_id > MAX_KEY_ID:
+                raise ValueError("Too many net table keys for binary protocol")
+            self.__ids[key] = key_id
+            data = encode_frame(FRAME_DEFINE, struct.pack(">H", key_id) + key.encode())
+        return data + self.__encode_value(key_id, value)
+
+    @staticmethod
+    def __encode_value(key_id: int, value: str) -> bytes:
+        # Smallest encoding that gives back exactly the same text
+        if 0 < len(value) <= 11 and (value[0].isdigit() or value[0] == "-"):
+            try:
+                number = int(value)
+                if str(number) == value and -2**31 <= number < 2**31:
+                    return encode_frame(FRAME_SET_INT, struct.pack(">Hi", key_id, number))
+            except ValueError:
+                pass
+        if len(value) > 8:
+            try:
+                number = float(value)
+                if repr(number) == value:
+                    return encode_frame(FRAME_SET_DOUBLE, struct.pack(">Hd", key_id, number))
+            except ValueError:
+                pass
+        return encode_frame(FRAME_SET_STRING, struct.pack(">H", key_id) + value.encode())
+
+
+class NtBinaryDecoder:
+    """
+    Parses binary net table frames from a stream of received data.
+    feed returns a list of (frame type, key, value) for complete frames. Key and value are
+    empty for sync start / stop and UDP disable ack. Values of every type are returned as FRAME_SET_STRING with
+    the value as text. DEFINE frames are handled internally.
+    """
+    def __init__(self):
+        self.__keys: Dict[int, str] = {}
+        self.__buf = bytearray()
+
+    def feed(self, data: bytes) -> List[Tuple[int, str, str]]:
+        self.__buf.extend(data)
+        events: List[Tuple[int, str, str]] = []
+        pos = 0
+        buf = self.__buf
+        while True:
+            frame = self.__next_frame(buf, pos)
+            if frame is None:
+                break
+            frame_type, start, end = frame
+            pos = end
+            event = self.__handle(frame_type, bytes(buf[start:end]))
+            if event is not None:
+                events.append(event)
+        del buf[0:pos]
+        return events
+
+    @staticmethod
+    def __next_frame(buf: bytearray, pos: int) -> Optional[Tuple[int, int, int]]:
+        # (type, payload start, payload end) or None if the frame is not complete yet
+        if pos >= len(buf):
+            return None
+        frame_type = buf[pos]
+        length = 0
+        shift = 0
+        i = pos + 1
+        while True:
+            if i >= len(buf):
+                return None
+            byte = buf[i]
+            length |= (byte & 0x7F) << shift
+            shift += 7
+            i += 1
+            if not byte & 0x80:
+                break
+        if i + length > len(buf):
+            return None
+        return frame_type, i, i + length
+
+    def __handle(self, frame_type: int, payload: bytes) -> Optional[Tuple[int, str, str]]:
+        if frame_type == FRAME_SYNC_START or frame_type == FRAME_SYNC_STOP or frame_type == FRAME_UDP_DISABLE_ACK:
+            return (frame_type, "", "")
+        if frame_type not in [FRAME_DEFINE, FRAME_SET_STRING, FRAME_SET_INT, FRAME_SET_DOUBLE] or len(payload) < 2:
+            return None
+        key_id = struct.unpack_from(">H", payload)[0]
+        if frame_type == FRAME_DEFINE:
+            self.__keys[key_id] = payload[2:].decode(errors="replace")
+            return None
+
+        key = self.__keys.get(key_id, None)
+        if key is None:
+            # Value for a key that was never defined
+            return None
+        if frame_type == FRAME_SET_STRING:
+            value = payload[2:].decode(errors="replace")
+        elif frame_type == FRAME_SET_INT and len(payload) == 6:
+            value = str(struct.unpack_from(">i", payload, 2)[0])
+        elif frame_type == FRAME_SET_DOUBLE and len(payload) == 10:
+            value = repr(struct.unpack_from(">d", payload, 2)[0])
+        else:
+            return None
+        return (FRAME_SET_STRING, key, value)
@@ -0,0 +1,66 @@
+from typing import Callable
+
+from PySide6.QtCore import QEvent, QObject, QTimer
+from PySide6.QtWidgets import QWidget
+
+from diagnostics import loop_monitor
+
+
+class RefreshScheduler(QObject):
+    """
+    Runs the UI's per-frame update pass at a rate based on what can be seen.
+    Full rate while the window is active, a low rate while it is visible but not focused and
+    not at all while it is hidden or minimized. The frame timer also stops when the last frame
+    reported there was nothing to animate; request_frame() restarts it when new work arrives.
+    Only visual updates go through the scheduler (network and controller sending do not).
+    """
+
+    ACTIVE_INTERVAL = 16        # ~60 updates / second
+    BACKGROUND_INTERVAL = 100   # Visible, but another window has focus
+
+    def __init__(self, window: QWidget, timer: QTimer, frame: Callable[[], bool]):
+        # frame performs one update pass and returns True if it needs to keep running
+        # (eg it is polling controller state) even when no new work is requested
+        super().__init__(window)
+        self.__window = window
+        self.__timer = timer
+        self.__frame = frame
+        self.__pending = True
+        self.__polling = True
+        window.installEventFilter(self)
+
+    @property
+    def can_be_seen(self) -> bool:
+        return self.__window.isVisible() and not self.__window.isMinimized()
+
+    def request_frame(self):
+        # New visual work is waiting. It is handled in the next frame (or once the window can be seen)
+        self.__pending = True
+        if not self.__timer.isActive():
+            self.__reschedule()
+
+    def tick(self):
+        # Connected to the timer's timeout signal
+        self.__pending = False
+        self.__polling = self.__frame()
+        if not self.__polling and not self.__pending:
+            # Nothing left to animate. Sleep until more work is requested.
+            self.__timer.stop()
+
+    def eventFilter(self, watched: QObject, event: QEvent) -> bool:
+        if event.type() in [QEvent.WindowStateChange, QEvent.ActivationChange, QEvent.Show, QEvent.Hide]:
+            # Assume polling may be needed again. The next frame will report if not.
+            self.__polling = True
+            self.__reschedule()
+        return False
+
+    def __reschedule(self):
+        if not self.can_be_seen or not (self.__pending or self.__polling):
+            self.__timer.stop()
+            return
+
+        interval = self.ACTIVE_INTERVAL if self.__window.isActiveWindow() else self.BACKGROUND_INTERVAL
+        if not self.__timer.isActive() or self.__timer.interval() != interval:
+            # Time between the old and new firing isn't lateness
+            loop_monitor.timer_restarted(self.__timer)
+            self.__timer.start(interval)
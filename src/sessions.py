@@ -0,0 +1,92 @@
+from typing import List, Optional
+
+from PySide6.QtCore import QObject, QTimer, Qt
+
+from diagnostics import loop_monitor
+from drive_station import DriveStationWindow
+from gamepad import GamepadManager, InputBackend
+from metrics import metrics, MetricsFileWriter, MetricsHttpServer
+from util import logger, settings_manager
+
+
+class SessionManager(QObject):
+    """
+    Runs one drive station window (session) per robot. All sessions share one gamepad manager
+    and one controller send timer, so each extra robot only adds its window and network manager.
+    Each session has its own controller assignment, net table, indicators and logs.
+    Closing the primary session (the one using the robot address from settings) closes all.
+    """
+
+    def __init__(self, input_backend: Optional[InputBackend] = None, parent: Optional[QObject] = None):
+        # input_backend replaces the SDL game controllers (eg with virtual controllers for testing)
+        super().__init__(parent)
+        if input_backend is None:
+            self.gamepad_manager: InputBackend = GamepadManager(mappings_file=":/gamecontrollerdb.txt")
+        else:
+            self.gamepad_manager = input_backend
+        self.sessions: List[DriveStationWindow] = []
+
+        # Timer to send controller data to every robot
+        self.controller_send_timer = QTimer(self)
+        self.controller_send_timer.timeout.connect(loop_monitor.instrument(
+            self.controller_send_timer, "controller_send_timer", self.send_controller_data))
+
+        # Metrics for all sessions (file and localhost HTTP endpoint, both set in settings)
+        self.metrics_file_writer = MetricsFileWriter(metrics, self)
+        self.metrics_http_server = MetricsHttpServer(metrics, self)
+        settings_manager.metrics_file_changed.connect(self.set_metrics_file)
+        settings_manager.metrics_port_changed.connect(self.set_metrics_port)
+
+    def start(self) -> DriveStationWindow:
+        # Creates (but doesn't show) the primary session
+        primary = self.new_session(None)
+        logger.set_ds(primary)
+        self.gamepad_manager.start()
+        self.controller_send_timer.start(20)
+        self.set_metrics_file(settings_manager.metrics_file)
+        self.set_metrics_port(settings_manager.metrics_port)
+        return primary
+
+    def new_session(self, robot_address: Optional[str]) -> DriveStationWindow:
+        session = DriveStationWindow(self.gamepad_manager, robot_address)
+        session.setAttribute(Qt.WA_DeleteOnClose, robot_address is not None)
+        session.new_session_requested.connect(self.open_session)
+        session.closed.connect(lambda: self.session_closed(session))
+        self.sessions.append(session)
+        return session
+
+    def open_session(self, robot_address: str):
+        session = self.new_session(robot_address)
+        session.show()
+
+    def session_closed(self, session: DriveStationWindow):
+        if session in self.sessions:
+            self.sessions.remove(session)
+        if session.is_primary:
+            for other in list(self.sessions):
+                other.close()
+            self.gamepad_manager.stop()
+            self.controller_send_timer.stop()
+            self.metrics_file_writer.stop()
+            self.metrics_http_server.close()
+
+    def send_controller_data(self):
+        for session in self.sessions:
+            session.send_controller_data()
+        self.gamepad_manager.clear_input_times()
+
+    def set_metrics_file(self, enabled: bool):
+        if enabled:
+            self.metrics_file_writer.start()
+        else:
+            self.metrics_file_writer.stop()
+
+    def set_metrics_port(self, port: int):
+        if port == 0:
+            self.metrics_http_server.close()
+            return
+        ok, error = self.metrics_http_server.listen(port)
+        if ok:
+            logger.log_info(f"Serving metrics at http://localhost:{port}/metrics")
+        else:
+            logger.log_warning(f"Unable to serve metrics on port {port}: {error}")
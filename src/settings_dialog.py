@@ -5,19 +5,33 @@ from util import settings_manager
 
 
 class SettingsDialog(QDialog):
-    def __init__(self, parent = None) -> None:
+    def __init__(self, robot_address: str, parent = None) -> None:
         super().__init__(parent=parent)
 
         self.ui = Ui_SettingsDialog()
         self.ui.setupUi(self)
 
-        self.ui.txt_robot_address.setText(settings_manager.robot_address)
+        self.ui.txt_robot_address.setText(robot_address)
         self.ui.txt_bat_voltage.setText(str(settings_manager.vbat_main))
         self.ui.txt_robot_address.setFocus()
 
         self.ui.chbox_larger_font.setChecked(settings_manager.larger_fonts)
+        self.ui.chbox_binary_nt.setChecked(settings_manager.binary_net_table)
+        self.ui.chbox_network_thread.setChecked(settings_manager.network_thread)
+        self.ui.chbox_metrics_file.setChecked(settings_manager.metrics_file)
+        self.ui.spin_metrics_port.setValue(settings_manager.metrics_port)
+        self.ui.spin_stall_timeout.setValue(settings_manager.stall_timeout)
+
+    @property
+    def robot_address(self) -> str:
+        # Robot address is per session. Applied by the window that opened the dialog.
+        return self.ui.txt_robot_address.text()
 
     def save_settings(self):
-        settings_manager.robot_address = self.ui.txt_robot_address.text()
         settings_manager.vbat_main = float(self.ui.txt_bat_voltage.text())
         settings_manager.larger_fonts = self.ui.chbox_larger_font.isChecked()
+        settings_manager.binary_net_table = self.ui.chbox_binary_nt.isChecked()
+        settings_manager.network_thread = self.ui.chbox_network_thread.isChecked()
+        settings_manager.metrics_file = self.ui.chbox_metrics_file.isChecked()
+        settings_manager.metrics_port = self.ui.spin_metrics_port.value()
+        settings_manager.stall_timeout = self.ui.spin_stall_timeout.value()
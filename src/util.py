@@ -1,60 +1,211 @@
-from typing import Dict, List
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 
-from PySide6.QtCore import QSize, QFile, QIODevice, QDirIterator, QFileInfo, QDir, QSettings
+from PySide6.QtCore import QSize, QFile, QIODevice, QDirIterator, QFileInfo, QDir, QSettings, QObject, Signal, QTimer, QCoreApplication
 from PySide6.QtGui import QTextDocument, QAbstractTextDocumentLayout, QFont
 from PySide6.QtWidgets import QStyledItemDelegate, QStyleOptionViewItem, QApplication, QStyle, QStyleFactory
 
 
-class SettingsManager:
+class SettingsManager(QObject):
     """
-    Thin wrapper over QSettings object to manage drive station settings
+    Drive station settings. Values are read from QSettings once and kept in memory as their
+    proper types. Changes emit a signal and are written to the settings file shortly after
+    (several changes together are one write). QSettings replaces the file atomically.
     """
+
+    # Emitted with the new value when a setting changes
+    robot_address_changed = Signal(str)
+    vbat_main_changed = Signal(float)
+    larger_fonts_changed = Signal(bool)
+    binary_net_table_changed = Signal(bool)
+    network_thread_changed = Signal(bool)
+    metrics_file_changed = Signal(bool)
+    metrics_port_changed = Signal(int)
+    stall_timeout_changed = Signal(int)
+
+    # Time (ms) changes are held before writing to disk
+    SAVE_DELAY = 500
+
     def __init__(self):
+        super().__init__()
+
         # Constants
         self.__SETTING_FILE = QDir.homePath() + "/.arpirobot/drivestation.ini"
 
         self.__ROBOT_IP_KEY = "robot-address"
         self.__VBAT_MAIN_KEY = "vbat-main"
         self.__LARGE_FONTS_KEY = "larger-fonts"
+        self.__BINARY_NT_KEY = "binary-net-table"
+        self.__NETWORK_THREAD_KEY = "network-thread"
+        self.__METRICS_FILE_KEY = "metrics-file"
+        self.__METRICS_PORT_KEY = "metrics-port"
+        self.__STALL_TIMEOUT_KEY = "stall-timeout"
 
         self.__DEFAULT_ROBOT_IP = "192.168.10.1"
         self.__DEFAULT_VBAT_MAIN = 7.5
         self.__DEFAULT_LARGE_FONTS = False
+        self.__DEFAULT_BINARY_NT = False
+        self.__DEFAULT_NETWORK_THREAD = False
+        self.__DEFAULT_METRICS_FILE = True
+        self.__DEFAULT_METRICS_PORT = 0
+        self.__DEFAULT_STALL_TIMEOUT = 500
 
         # Setup
         self.__settings = QSettings(self.__SETTING_FILE, QSettings.IniFormat)
 
+        # Created on first change (settings are loaded before the application exists)
+        self.__save_timer: Optional[QTimer] = None
+
+        # Load values (invalid or missing values use defaults)
+        self.__robot_address: str = str(self.__settings.value(self.__ROBOT_IP_KEY, self.__DEFAULT_ROBOT_IP))
+        try:
+            self.__vbat_main: float = float(self.__settings.value(self.__VBAT_MAIN_KEY, self.__DEFAULT_VBAT_MAIN))
+        except (TypeError, ValueError):
+            self.__vbat_main = self.__DEFAULT_VBAT_MAIN
+        self.__larger_fonts: bool = str(self.__settings.value(self.__LARGE_FONTS_KEY, self.__DEFAULT_LARGE_FONTS)).lower() == "true"
+        self.__binary_net_table: bool = str(self.__settings.value(self.__BINARY_NT_KEY, self.__DEFAULT_BINARY_NT)).lower() == "true"
+        self.__network_thread: bool = str(self.__settings.value(self.__NETWORK_THREAD_KEY, self.__DEFAULT_NETWORK_THREAD)).lower() == "true"
+        self.__metrics_file: bool = str(self.__settings.value(self.__METRICS_FILE_KEY, self.__DEFAULT_METRICS_FILE)).lower() == "true"
+        try:
+            self.__metrics_port: int = int(self.__settings.value(self.__METRICS_PORT_KEY, self.__DEFAULT_METRICS_PORT))
+        except (TypeError, ValueError):
+            self.__metrics_port = self.__DEFAULT_METRICS_PORT
+        try:
+            self.__stall_timeout: int = int(self.__settings.value(self.__STALL_TIMEOUT_KEY, self.__DEFAULT_STALL_TIMEOUT))
+        except (TypeError, ValueError):
+            self.__stall_timeout = self.__DEFAULT_STALL_TIMEOUT
+
         # Setup defaults if settings are missing
         if self.__settings.value(self.__ROBOT_IP_KEY, None) is None:
-            self.__settings.setValue(self.__ROBOT_IP_KEY, self.__DEFAULT_ROBOT_IP)
+            self.__settings.setValue(self.__ROBOT_IP_KEY, self.__robot_address)
         if self.__settings.value(self.__VBAT_MAIN_KEY, None) is None:
-            self.__settings.setValue(self.__VBAT_MAIN_KEY, self.__DEFAULT_VBAT_MAIN)
+            self.__settings.setValue(self.__VBAT_MAIN_KEY, self.__vbat_main)
         if self.__settings.value(self.__LARGE_FONTS_KEY, None) is None:
-            self.__settings.setValue(self.__LARGE_FONTS_KEY, self.__DEFAULT_LARGE_FONTS)
+            self.__settings.setValue(self.__LARGE_FONTS_KEY, self.__larger_fonts)
+        if self.__settings.value(self.__BINARY_NT_KEY, None) is None:
+            self.__settings.setValue(self.__BINARY_NT_KEY, self.__binary_net_table)
+        if self.__settings.value(self.__NETWORK_THREAD_KEY, None) is None:
+            self.__settings.setValue(self.__NETWORK_THREAD_KEY, self.__network_thread)
+        if self.__settings.value(self.__METRICS_FILE_KEY, None) is None:
+            self.__settings.setValue(self.__METRICS_FILE_KEY, self.__metrics_file)
+        if self.__settings.value(self.__METRICS_PORT_KEY, None) is None:
+            self.__settings.setValue(self.__METRICS_PORT_KEY, self.__metrics_port)
+        if self.__settings.value(self.__STALL_TIMEOUT_KEY, None) is None:
+            self.__settings.setValue(self.__STALL_TIMEOUT_KEY, self.__stall_timeout)
 
     @property
     def robot_address(self) -> str:
-        return self.__settings.value(self.__ROBOT_IP_KEY, self.__DEFAULT_ROBOT_IP)
+        return self.__robot_address
 
     @robot_address.setter
     def robot_address(self, value: str):
-        self.__settings.setValue(self.__ROBOT_IP_KEY, value)
+        if value != self.__robot_address:
+            self.__robot_address = value
+            self.__store(self.__ROBOT_IP_KEY, value)
+            self.robot_address_changed.emit(value)
 
     @property
     def vbat_main(self) -> float:
-        return float(self.__settings.value(self.__VBAT_MAIN_KEY, self.__DEFAULT_VBAT_MAIN))
+        return self.__vbat_main
 
     @vbat_main.setter
     def vbat_main(self, value: float):
-        self.__settings.setValue(self.__VBAT_MAIN_KEY, value)
+        value = float(value)
+        if value != self.__vbat_main:
+            self.__vbat_main = value
+            self.__store(self.__VBAT_MAIN_KEY, value)
+            self.vbat_main_changed.emit(value)
 
     @property
     def larger_fonts(self) -> bool:
-        return str(self.__settings.value(self.__LARGE_FONTS_KEY, self.__DEFAULT_LARGE_FONTS)).lower() == "true"
+        return self.__larger_fonts
 
     @larger_fonts.setter
     def larger_fonts(self, value: bool):
-        self.__settings.setValue(self.__LARGE_FONTS_KEY, value)
+        value = bool(value)
+        if value != self.__larger_fonts:
+            self.__larger_fonts = value
+            self.__store(self.__LARGE_FONTS_KEY, value)
+            self.larger_fonts_changed.emit(value)
+
+    @property
+    def binary_net_table(self) -> bool:
+        return self.__binary_net_table
+
+    @binary_net_table.setter
+    def binary_net_table(self, value: bool):
+        value = bool(value)
+        if value != self.__binary_net_table:
+            self.__binary_net_table = value
+            self.__store(self.__BINARY_NT_KEY, value)
+            self.binary_net_table_changed.emit(value)
+
+    @property
+    def network_thread(self) -> bool:
+        return self.__network_thread
+
+    @network_thread.setter
+    def network_thread(self, value: bool):
+        value = bool(value)
+        if value != self.__network_thread:
+            self.__network_thread = value
+            self.__store(self.__NETWORK_THREAD_KEY, value)
+            self.network_thread_changed.emit(value)
+
+    @property
+    def metrics_file(self) -> bool:
+        return self.__metrics_file
+
+    @metrics_file.setter
+    def metrics_file(self, value: bool):
+        value = bool(value)
+        if value != self.__metrics_file:
+            self.__metrics_file = value
+            self.__store(self.__METRICS_FILE_KEY, value)
+            self.metrics_file_changed.emit(value)
+
+    @property
+    def metrics_port(self) -> int:
+        # 0 = HTTP metrics endpoint disabled
+        return self.__metrics_port
+
+    @metrics_port.setter
+    def metrics_port(self, value: int):
+        value = int(value)
+        if value != self.__metrics_port:
+            self.__metrics_port = value
+            self.__store(self.__METRICS_PORT_KEY, value)
+            self.metrics_port_changed.emit(value)
+
+    @property
+    def stall_timeout(self) -> int:
+        # ms without controller data (while enabled) before the robot is disabled. 0 = off
+        return self.__stall_timeout
+
+    @stall_timeout.setter
+    def stall_timeout(self, value: int):
+        value = int(value)
+        if value != self.__stall_timeout:
+            self.__stall_timeout = value
+            self.__store(self.__STALL_TIMEOUT_KEY, value)
+            self.stall_timeout_changed.emit(value)
+
+    def flush(self):
+        # Write any changes now (call before exit)
+        if self.__save_timer is not None:
+            self.__save_timer.stop()
+        self.__settings.sync()
+
+    def __store(self, key: str, value: Any):
+        self.__settings.setValue(key, value)
+        if self.__save_timer is None:
+            self.__save_timer = QTimer(self)
+            self.__save_timer.setSingleShot(True)
+            self.__save_timer.timeout.connect(self.flush)
+        if QCoreApplication.instance() is not None:
+            self.__save_timer.start(self.SAVE_DELAY)
+        else:
+            self.flush()
 
 
 class Logger:
@@ -87,17 +238,43 @@ logger: Logger = Logger()
 class HTMLDelegate(QStyledItemDelegate):
     """
     Item delegate for ListWidget, ListView, etc that renders rich text from HTML strings
+    Laid out documents are cached by content and font so repaints don't re-parse HTML.
     """
+
+    # Maximum number of laid out documents kept
+    CACHE_SIZE = 64
+
     def __init__(self, parent=None):
         super(HTMLDelegate, self).__init__(parent)
-        self.doc = QTextDocument(self)
+        self.__docs: OrderedDict[Tuple[str, str], QTextDocument] = OrderedDict()
+
+    def clear_cache(self):
+        for doc in self.__docs.values():
+            doc.deleteLater()
+        self.__docs.clear()
+
+    def __get_doc(self, options: QStyleOptionViewItem) -> QTextDocument:
+        # Content and font determine layout. Changing either gives a new key (old one ages out)
+        key = (options.text, options.font.key())
+        doc = self.__docs.get(key, None)
+        if doc is None:
+            doc = QTextDocument(self)
+            doc.setDefaultFont(options.font)
+            doc.setHtml(options.text)
+            self.__docs[key] = doc
+            if len(self.__docs) > self.CACHE_SIZE:
+                _, old_doc = self.__docs.popitem(last=False)
+                old_doc.deleteLater()
+        else:
+            self.__docs.move_to_end(key)
+        return doc
 
     def paint(self, painter, option, index):
         painter.save()
         options = QStyleOptionViewItem(option)
         self.initStyleOption(options, index)
 
-        self.doc.setHtml(options.text)
+        doc = self.__get_doc(options)
         options.text = ""
         style = QApplication.style() if options.widget is None \
             else options.widget.style()
@@ -123,8 +300,12 @@ class HTMLDelegate(QStyledItemDelegate):
 
         painter.translate(text_rect.topLeft())
         painter.setClipRect(text_rect.translated(-text_rect.topLeft()))
-        self.doc.documentLayout().draw(painter, ctx)
+        doc.documentLayout().draw(painter, ctx)
         painter.restore()
 
     def sizeHint(self, option, index):
-        return QSize(self.doc.idealWidth(), self.doc.size().height())
\ No newline at end of file
+        # Size of this item's document (not whichever document was painted last)
+        options = QStyleOptionViewItem(option)
+        self.initStyleOption(options, index)
+        doc = self.__get_doc(options)
+        return QSize(doc.idealWidth(), doc.size().height())
@@ -0,0 +1,213 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from PySide6.QtCore import QTimer, Qt
+
+from gamepad import InputBackend
+
+import json
+import time
+
+
+# Script format (JSON):
+# {
+#     "devices": 2,           Virtual controllers connected at start
+#     "length": 1000,         Script length (ms). Defaults to the time of the last event.
+#     "loop": true,           Repeat the script (needs a length greater than 0)
+#     "events": [
+#         {"t": 0, "device": 0, "axis": 1, "value": -32768},
+#         {"t": 5, "device": 0, "button": 0, "pressed": true},
+#         {"t": 500, "device": 1, "unplug": true},
+#         {"t": 800, "device": 1, "plug": true}
+#     ]
+# }
+# Times ("t") are ms from the start of the script. Axes and buttons use SDL game controller numbers.
+# Events are applied by a 1 ms timer, so input changes at most 1000 times a second. Events closer
+# together than that are applied at the same time (in order).
+
+class VirtualGamepadManager(InputBackend):
+    """
+    Scripted virtual controllers. Used instead of GamepadManager to drive the whole input to
+    packet path without controller hardware (benchmarks, soak tests, build machines).
+    Each virtual controller behaves like a real one: it gets a new device id each time it is
+    plugged in and keeps the same key ("virtual-<device number>").
+    """
+
+    # Event kinds
+    AXIS = 0
+    BUTTON = 1
+    PLUG = 2
+    UNPLUG = 3
+
+    AXIS_COUNT = 6
+    BUTTON_COUNT = 15
+
+    # Timer interval (ms). Limits the input rate to 1 kHz.
+    INTERVAL = 1
+
+    def __init__(self, script: Optional[Dict[str, Any]] = None):
+        super().__init__()
+        self.__device_count = 0
+        self.__length = 0.0
+        self.__loop = False
+        self.__events: List[Tuple[float, int, int, int, int]] = []
+
+        # device number -> device id (connected devices only)
+        self.__ids: Dict[int, int] = {}
+        self.__next_id = 0
+
+        # device id -> (axes, buttons)
+        self.__states: Dict[int, Tuple[List[int], List[bool]]] = {}
+
+        self.__next_event = 0
+        self.__start_time = 0.0
+        self.__base_ms = 0.0
+
+        # Number of input events applied since start
+        self.events_applied = 0
+
+        self.__timer = QTimer(self)
+        self.__timer.setTimerType(Qt.PreciseTimer)
+        self.__timer.timeout.connect(self.__tick)
+
+        self.set_script(script if script is not None else {"devices": 1, "events": []})
+
+    @staticmethod
+    def load_script(path: str) -> Dict[str, Any]:
+        with open(path, "r") as script_file:
+            return json.load(script_file)
+
+    @staticmethod
+    def sweep_script(devices: int, rate: float, length: float = 1000.0) -> Dict[str, Any]:
+        # Looping script moving every axis of every device through its range and toggling the
+        # buttons. Each device gets rate (Hz, at most 1000) input events per second.
+        interval = 1000.0 / min(max(rate, 1.0), 1000.0)
+        events = []
+        t = 0.0
+        step = 0
+        while t < length:
+            for device in range(devices):
+                axis = step % VirtualGamepadManager.AXIS_COUNT
+                value = int(-32768 + ((step * 2731) % 65536))
+                events.append({"t": t, "device": device, "axis": axis, "value": value})
+                if step % 10 == 0:
+                    button = (step // 10) % 11
+                    events.append({"t": t, "device": device, "button": button, "pressed": (step // 10) % 2 == 0})
+            t += interval
+            step += 1
+        return {"devices": devices, "length": length, "loop": True, "events": events}
+
+    def set_script(self, script: Dict[str, Any]):
+        # Raises ValueError if the script is not valid. Takes effect at the next start.
+        events = []
+        for event in script.get("events", []):
+            try:
+                t = float(event["t"])
+                device = int(event["device"])
+                if "axis" in event:
+                    events.append((t, device, self.AXIS, int(event["axis"]), int(event["value"])))
+                elif "button" in event:
+                    events.append((t, device, self.BUTTON, int(event["button"]), 1 if event.get("pressed", True) else 0))
+                elif event.get("plug", False):
+                    events.append((t, device, self.PLUG, 0, 0))
+                elif event.get("unplug", False):
+                    events.append((t, device, self.UNPLUG, 0, 0))
+                else:
+                    raise ValueError(f"Unknown script event {event}")
+            except (KeyError, TypeError) as e:
+                raise ValueError(f"Invalid script event {event}: {e}")
+        events.sort(key=lambda event: event[0])
+
+        self.__device_count = int(script.get("devices", 1))
+        self.__events = events
+        self.__length = float(script.get("length", events[-1][0] if len(events) > 0 else 0.0))
+        self.__loop = bool(script.get("loop", False)) and self.__length > 0 and len(events) > 0
+
+    def start(self):
+        for device in range(self.__device_count):
+            self.__plug(device)
+        self.events_applied = 0
+        self.__next_event = 0
+        self.__base_ms = 0.0
+        self.__start_time = time.perf_counter()
+        self.__timer.start(self.INTERVAL)
+
+    def stop(self):
+        self.__timer.stop()
+
+    def device_key(self, device_id: int) -> str:
+        for device, current_id in self.__ids.items():
+            if current_id == device_id:
+                return f"virtual-{device}"
+        return ""
+
+    def devices(self) -> List[Tuple[int, str]]:
+        return [(device_id, f"Virtual Controller {device}") for device, device_id in self.__ids.items()]
+
+    def get_axis(self, device_id: int, axis: int) -> int:
+        state = self.__states.get(device_id, None)
+        if state is None or axis < 0 or axis >= self.AXIS_COUNT:
+            return 0
+        return state[0][axis]
+
+    def get_button(self, device_id: int, button: int) -> bool:
+        state = self.__states.get(device_id, None)
+        if state is None or button < 0 or button >= self.BUTTON_COUNT:
+            return False
+        return state[1][button]
+
+    def __tick(self):
+        elapsed_ms = (time.perf_counter() - self.__start_time) * 1000.0
+        while True:
+            if self.__next_event >= len(self.__events):
+                if not self.__loop:
+                    self.__timer.stop()
+                    return
+                self.__next_event = 0
+                self.__base_ms += self.__length
+            t, device, kind, index, value = self.__events[self.__next_event]
+            due_ms = self.__base_ms + t
+            if due_ms > elapsed_ms:
+                return
+            self.__next_event += 1
+            self.__apply(device, kind, index, value, self.__start_time + due_ms / 1000.0)
+
+    def __apply(self, device: int, kind: int, index: int, value: int, event_time: float):
+        # event_time is when the event was scheduled (time.perf_counter()), so measured input
+        # latency includes any delay in applying it
+        if kind == self.PLUG:
+            self.__plug(device)
+            return
+        if kind == self.UNPLUG:
+            self.__unplug(device)
+            return
+
+        device_id = self.__ids.get(device, None)
+        if device_id is None:
+            return
+        axes, buttons = self.__states[device_id]
+        if kind == self.AXIS and 0 <= index < self.AXIS_COUNT:
+            axes[index] = min(max(value, -32768), 32767)
+        elif kind == self.BUTTON and 0 <= index < self.BUTTON_COUNT:
+            buttons[index] = value != 0
+        else:
+            return
+        self.events_applied += 1
+        if device_id not in self.input_times:
+            self.input_times[device_id] = event_time
+
+    def __plug(self, device: int):
+        if device in self.__ids:
+            return
+        device_id = self.__next_id
+        self.__next_id += 1
+        self.__ids[device] = device_id
+        self.__states[device_id] = ([0] * self.AXIS_COUNT, [False] * self.BUTTON_COUNT)
+        self.connected.emit(device_id, f"Virtual Controller {device}")
+
+    def __unplug(self, device: int):
+        device_id = self.__ids.pop(device, None)
+        if device_id is None:
+            return
+        del self.__states[device_id]
+        self.input_times.pop(device_id, None)
+        self.disconnected.emit(device_id)
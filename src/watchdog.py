@@ -0,0 +1,143 @@
+from typing import Callable, Optional
+
+import socket
+import threading
+import time
+
+
+class StallWatchdog:
+    """
+    Disables the robot if controller data stops being produced while it is enabled (for example
+    because the GUI thread is stalled). Runs on its own thread and sends the disable command
+    directly on (a duplicate of) the command socket's descriptor, so it works while the event loop
+    is blocked.
+    feed must be called each time controller data is produced.
+    """
+
+    # Limits on how often the deadline is checked (ms)
+    MIN_CHECK_INTERVAL = 5
+    MAX_CHECK_INTERVAL = 50
+
+    def __init__(self, disable_command: bytes, on_trip: Callable[[float], None]):
+        # on_trip is called from the watchdog thread with the time (ms) since the last feed
+        self.__disable_command = disable_command
+        self.__on_trip = on_trip
+        self.__lock = threading.Lock()
+        self.__wake = threading.Event()
+        self.__stopped = False
+        self.__timeout = 0.0
+        self.__armed = False
+        self.__socket: Optional[socket.socket] = None
+        self.__last_feed = 0.0
+        self.__tripped_at: Optional[float] = None
+        self.__thread: Optional[threading.Thread] = None
+
+    @property
+    def timeout_ms(self) -> int:
+        return int(self.__timeout * 1000)
+
+    @timeout_ms.setter
+    def timeout_ms(self, value: int):
+        # 0 = watchdog off
+        with self.__lock:
+            self.__timeout = max(value, 0) / 1000.0
+        self.__wake.set()
+
+    def arm(self, descriptor: int):
+        # Robot enabled. descriptor is the connected command socket's native descriptor.
+        # The watchdog sends on its own duplicate (closed when disarmed), so the original descriptor
+        # being closed and its number reused by another socket can't redirect the disable command.
+        sock = self.__duplicate(descriptor)
+        with self.__lock:
+            self.__close_socket()
+            self.__armed = True
+            self.__socket = sock
+            self.__last_feed = time.monotonic()
+            self.__tripped_at = None
+            if self.__thread is None:
+                self.__thread = threading.Thread(target=self.__run, name="StallWatchdog", daemon=True)
+                self.__thread.start()
+        self.__wake.set()
+
+    def disarm(self):
+        with self.__lock:
+            self.__armed = False
+            self.__close_socket()
+
+    def feed(self) -> Optional[float]:
+        # Returns the length (ms) of the stall if this is the first feed after the watchdog tripped
+        now = time.monotonic()
+        with self.__lock:
+            stall_ms = None
+            if self.__tripped_at is not None:
+                stall_ms = (now - self.__last_feed) * 1000.0
+                self.__tripped_at = None
+            self.__last_feed = now
+        return stall_ms
+
+    def stop(self):
+        with self.__lock:
+            self.__stopped = True
+            self.__armed = False
+            self.__close_socket()
+        self.__wake.set()
+
+    def __run(self):
+        while True:
+            with self.__lock:
+                if self.__stopped:
+                    return
+                timeout = self.__timeout
+                active = self.__armed and timeout > 0 and self.__tripped_at is None
+            if not active:
+                self.__wake.wait()
+                self.__wake.clear()
+                continue
+
+            interval = min(max(timeout / 5, self.MIN_CHECK_INTERVAL / 1000.0), self.MAX_CHECK_INTERVAL / 1000.0)
+            self.__wake.wait(interval)
+            self.__wake.clear()
+
+            now = time.monotonic()
+            with self.__lock:
+                if not self.__armed or self.__timeout <= 0 or self.__tripped_at is not None:
+                    continue
+                if now - self.__last_feed < self.__timeout:
+                    continue
+                self.__tripped_at = now
+                self.__armed = False
+                stalled_ms = (now - self.__last_feed) * 1000.0
+
+                # Sent while holding the lock so disarm can't close the socket meanwhile
+                # (non-blocking, so this never waits)
+                if self.__socket is not None:
+                    try:
+                        self.__socket.send(self.__disable_command)
+                    except OSError:
+                        pass
+                self.__close_socket()
+            self.__on_trip(stalled_ms)
+
+    def __close_socket(self):
+        # Lock must be held
+        if self.__socket is not None:
+            self.__socket.close()
+            self.__socket = None
+
+    @staticmethod
+    def __duplicate(descriptor: int) -> Optional[socket.socket]:
+        if descriptor < 0:
+            return None
+        # Wraps the descriptor without taking ownership (detach instead of close)
+        try:
+            sock = socket.socket(fileno=descriptor)
+        except OSError:
+            return None
+        try:
+            duplicate = sock.dup()
+            duplicate.setblocking(False)
+            return duplicate
+        except OSError:
+            return None
+        finally:
+            sock.detach()
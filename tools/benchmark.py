@@ -0,0 +1,312 @@
+"""
+Microbenchmarks for the drive station's hot paths.
+
+Runs headless (offscreen Qt platform, SDL dummy drivers) against the real DriveStationWindow and
+NetworkManager. Each benchmark's median time per call is compared to a stored baseline and the
+script exits with a non-zero status if any benchmark is slower than the baseline by more than the
+allowed tolerance.
+
+UI and resource files must be compiled first (python compile.py).
+
+Usage:
+    python tools/benchmark.py                   # Compare against tools/benchmark_baseline.json
+    python tools/benchmark.py --save-baseline   # Record new baseline
+    python tools/benchmark.py --tolerance 0.5 --filter nt_
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.join(script_dir, "..", "src"))
+
+# Must be set before Qt / SDL are initialized
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+# Don't touch the real user's settings or indicator layout
+os.environ["HOME"] = tempfile.mkdtemp(prefix="ds-bench-")
+os.environ["USERPROFILE"] = os.environ["HOME"]
+
+from PySide6.QtCore import QEvent, QRect
+from PySide6.QtNetwork import QAbstractSocket
+from PySide6.QtWidgets import QApplication
+
+import sdl2
+
+
+DEFAULT_BASELINE = os.path.join(script_dir, "benchmark_baseline.json")
+
+
+class FeedSocket:
+    """
+    Stands in for a QTcpSocket so incoming data handlers can be fed from memory
+    """
+    def __init__(self):
+        self.data = b''
+
+    def readAll(self) -> bytes:
+        data = self.data
+        self.data = b''
+        return data
+
+    def state(self) -> QAbstractSocket.SocketState:
+        return QAbstractSocket.SocketState.UnconnectedState
+
+
+class BenchLogSink:
+    """
+    Discards drive station log messages. Robot log lines go to the window so log ingestion
+    includes the cost of appending to the log pane.
+    """
+    def __init__(self, ds):
+        self.ds = ds
+
+    def log_debug(self, msg: str):
+        pass
+
+    def log_info(self, msg: str):
+        pass
+
+    def log_warning(self, msg: str):
+        pass
+
+    def log_error(self, msg: str):
+        pass
+
+    def log_from_robot(self, msg: str):
+        self.ds.log_from_robot(msg)
+
+
+class Benchmark:
+    def __init__(self, name: str, fn: Callable[[], None], setup: Optional[Callable[[], None]] = None, number: int = 1):
+        self.name = name
+        self.fn = fn
+        self.setup = setup
+        self.number = number        # Calls per sample. Reported time is per call.
+
+    def run(self, samples: int) -> float:
+        # Warm up
+        if self.setup is not None:
+            self.setup()
+        self.fn()
+
+        times: List[float] = []
+        for _ in range(samples):
+            if self.setup is not None:
+                self.setup()
+            start = time.perf_counter()
+            for _ in range(self.number):
+                self.fn()
+            times.append((time.perf_counter() - start) / self.number)
+        return statistics.median(times) * 1e6
+
+
+def attach_virtual_controller() -> bool:
+    # SDL virtual joysticks behave like real game controllers without hardware
+    if not hasattr(sdl2, "SDL_JoystickAttachVirtual"):
+        return False
+    idx = sdl2.SDL_JoystickAttachVirtual(sdl2.SDL_JOYSTICK_TYPE_GAMECONTROLLER, 6, 15, 0)
+    return idx >= 0
+
+
+def build_benchmarks(app: QApplication) -> List[Benchmark]:
+    from drive_station import DriveStationWindow
+    from log_collapse import LogCollapser
+    from net_table import NetTable
+    from network import NetworkManager
+    from util import logger
+
+    ds = DriveStationWindow()
+    logger.set_ds(BenchLogSink(ds))
+    ds.controller_status_timer.stop()
+    ds.controller_send_timer.stop()
+
+    # Pick up the virtual controller (if any) the same way a real one is found
+    has_controller = attach_virtual_controller()
+    ds.gamepad_manager.handle_events()
+    app.processEvents()
+    device_id = next(iter(ds.gamepad_manager.dev_map.keys()), 0)
+    if not has_controller or len(ds.gamepad_manager.dev_map) == 0:
+        print("Warning: no virtual controller available. Controller benchmarks use an absent device.")
+
+    benchmarks: List[Benchmark] = []
+
+    # Controller packet encoding
+    benchmarks.append(Benchmark(
+        "controller_encode",
+        lambda: ds.get_controller_data(0, device_id),
+        number=200
+    ))
+
+    # Net table frame parsing (1000 frames in one read)
+    nm = NetworkManager()
+    nt_socket = FeedSocket()
+    nm._NetworkManager__net_table_socket = nt_socket
+    frames = b''.join(f"key{i % 100}".encode() + b'\xff' + f"{i * 0.5}".encode() + b'\n' for i in range(1000))
+
+    def feed_frames():
+        nt_socket.data = frames
+    benchmarks.append(Benchmark(
+        "nt_parse_1000_frames",
+        lambda: nm._NetworkManager__net_table_ready_read(),
+        setup=feed_frames
+    ))
+
+    # Sync reconciliation (robot has 2000 keys, DS has 2000 keys, half of them shared)
+    sync_keys = [f"robot{i}" for i in range(1000)] + [f"shared{i}" for i in range(1000)]
+    sync_values = [str(i) for i in range(len(sync_keys))]
+    ds_keys = [f"ds{i}" for i in range(1000)] + [f"shared{i}" for i in range(1000)]
+
+    def sync_setup():
+        # Fresh net table each sample (otherwise the robot's values are already there and
+        # the sync only finds unchanged values)
+        nm._NetworkManager__net_table = NetTable()
+        for key in ds_keys:
+            nm.set_net_table(key, "0")
+        nm._NetworkManager__nt_start_sync()
+    benchmarks.append(Benchmark(
+        "nt_sync_2000_keys",
+        lambda: nm._NetworkManager__nt_finish_sync(sync_keys, sync_values),
+        setup=sync_setup
+    ))
+
+    # Log ingestion into the robot log pane (200 lines per read)
+    log_nm = NetworkManager()
+    log_socket = FeedSocket()
+    log_nm._NetworkManager__log_socket = log_socket
+    log_data = b''.join(f"[INFO]: Line {i} from the robot program\n".encode() for i in range(200))
+
+    def log_setup():
+        # Line bookkeeping starts over with the empty log
+        ds.ui.txt_robot_log.clear()
+        ds.robot_log_collapser = LogCollapser()
+        log_socket.data = log_data
+
+    def log_ingest():
+        # Lines are buffered then shown in the next UI frame
+        log_nm._NetworkManager__log_ready_read()
+        ds.refresh_ui()
+    benchmarks.append(Benchmark(
+        "log_ingest_200_lines",
+        log_ingest,
+        setup=log_setup
+    ))
+
+    # Fault storm (the same 2 lines repeated 100 times each per read)
+    storm_data = b"[WARNING]: Motor 2 stalled\n[ERROR]: Arm limit reached\n" * 100
+
+    def storm_setup():
+        # Line bookkeeping starts over with the empty log
+        ds.ui.txt_robot_log.clear()
+        ds.robot_log_collapser = LogCollapser()
+        log_socket.data = storm_data
+    benchmarks.append(Benchmark(
+        "log_storm_200_repeats",
+        log_ingest,
+        setup=storm_setup
+    ))
+
+    # Net table change handling with many keys (50 shown as indicators, 500 in the menu)
+    for i in range(50):
+        ds.add_indicator(f"ind{i}")
+    nt_updates = [(f"ind{i}", str(i)) for i in range(50)] + [(f"menu{i}", str(i)) for i in range(500)]
+
+    def nt_changed_setup():
+        # Every key is new to the menu and every indicator value changes each sample
+        for key, value in nt_updates:
+            if key in ds.indicators:
+                ds.indicators[key].value = ""
+            else:
+                ds.remove_from_robot_menu(key)
+        QApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+
+    def nt_changed():
+        for key, value in nt_updates:
+            ds.nt_data_changed(key, value)
+        ds.refresh_ui()
+    benchmarks.append(Benchmark(
+        "nt_data_changed_550_keys",
+        nt_changed,
+        setup=nt_changed_setup
+    ))
+
+    # Loading a large indicator layout into new widgets (none pooled). Widgets are polished as
+    # they would be when shown (the benchmark window is never shown).
+    load_keys = [f"load{i}" for i in range(200)]
+
+    def load_setup():
+        for key in load_keys:
+            if key in ds.indicators:
+                ds.release_indicator(key)
+        for ind in ds.indicator_pool:
+            ind.setParent(None)
+        ds.indicator_pool.clear()
+
+    def load_layout():
+        for i, key in enumerate(load_keys):
+            ds.add_indicator_at(key, QRect((i % 5) * 150, (i // 5) * 30, 140, 27))
+            ds.indicators[key].ensurePolished()
+    benchmarks.append(Benchmark(
+        "indicators_load_200",
+        load_layout,
+        setup=load_setup
+    ))
+
+    return benchmarks
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Drive station hot path microbenchmarks")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed slowdown (0.3 = 30%%)")
+    parser.add_argument("--samples", type=int, default=15, help="Samples per benchmark")
+    parser.add_argument("--filter", default="", help="Only run benchmarks containing this text")
+    args = parser.parse_args(argv)
+
+    app = QApplication([])
+    benchmarks = [b for b in build_benchmarks(app) if args.filter in b.name]
+
+    baseline: Dict[str, float] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r") as baseline_file:
+            baseline = json.load(baseline_file)
+
+    results: Dict[str, float] = {}
+    regressions: List[str] = []
+    for bench in benchmarks:
+        result = bench.run(args.samples)
+        results[bench.name] = result
+        line = f"{bench.name:<30} {result:>12.1f} us"
+        if bench.name in baseline:
+            ratio = result / baseline[bench.name]
+            line += f"   baseline {baseline[bench.name]:>12.1f} us   {(ratio - 1) * 100:+7.1f}%"
+            if ratio > 1 + args.tolerance:
+                line += "   REGRESSION"
+                regressions.append(bench.name)
+        print(line)
+
+    if args.save_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(baseline, baseline_file, indent=4, sort_keys=True)
+            baseline_file.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if len(regressions) > 0:
+        print(f"{len(regressions)} benchmark(s) regressed beyond {args.tolerance * 100:.0f}%: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,229 @@
+"""
+Drive station load test harness.
+
+Starts the mock robot (tools/mock_robot.py) in a separate process and connects the drive station's
+NetworkManager to it over loopback. Controller packets are sent at the drive station's normal rate
+while the mock robot generates the requested load. At the end a combined report of what both sides
+sent and received is printed (throughput, net table latency, event loop lag, reconnects, sync times).
+
+Note: NetworkManager pings the robot before connecting, so a ping command must be available.
+
+Usage:
+    python tools/load_test.py --duration 30 --nt-rate 500 --log-rate 200
+    python tools/load_test.py --duration 60 -- --scenario scenario.json
+Arguments after "--" are passed to the mock robot unchanged.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.join(script_dir, "..", "src"))
+
+from PySide6.QtCore import QCoreApplication, QTimer, Qt
+
+from network import NetworkManager
+from network_thread import ThreadedNetworkManager
+from util import logger
+
+
+class ConsoleLogSink:
+    """
+    Stands in for the drive station window as the logger's destination
+    """
+    def __init__(self, verbose: bool):
+        self.verbose = verbose
+        self.robot_lines = 0
+
+    def log_debug(self, msg: str):
+        if self.verbose:
+            print(f"[DEBUG]: {msg}")
+
+    def log_info(self, msg: str):
+        print(f"[INFO]: {msg}")
+
+    def log_warning(self, msg: str):
+        print(f"[WARNING]: {msg}")
+
+    def log_error(self, msg: str):
+        print(f"[ERROR]: {msg}")
+
+    def log_from_robot(self, msg: str):
+        self.robot_lines += 1
+
+
+class LoadTest:
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.sink = ConsoleLogSink(args.verbose)
+        self.net_manager = ThreadedNetworkManager() if args.network_thread else NetworkManager()
+        self.controller_packets_sent = 0
+        self.nt_updates = 0
+        self.nt_latencies_ms: List[float] = []
+        self.sync_durations_ms: List[float] = []
+        self.reconnects = 0
+        self.max_loop_lag_ms = 0.0
+        self.__sync_start = 0.0
+        self.__seq = 0
+
+        logger.set_ds(self.sink)
+        self.net_manager.use_binary_nt = args.binary_nt
+
+        self.net_manager.nt_data_changed.connect(self.nt_data_changed)
+        self.net_manager.state_changed.connect(self.state_changed)
+        self.net_manager.nt_sync_started.connect(self.sync_started)
+        self.net_manager.nt_sync_finished.connect(self.sync_finished)
+
+        self.send_timer = QTimer()
+        self.send_timer.setTimerType(Qt.PreciseTimer)
+        self.send_timer.timeout.connect(self.send_controller_data)
+
+        # Measures how late a short timer fires to estimate event loop lag
+        self.lag_interval = 5
+        self.lag_last = time.monotonic()
+        self.lag_timer = QTimer()
+        self.lag_timer.setTimerType(Qt.PreciseTimer)
+        self.lag_timer.timeout.connect(self.measure_lag)
+
+    def start(self):
+        self.net_manager.set_robot_address(self.args.address)
+        self.send_timer.start(self.args.send_interval)
+        self.lag_last = time.monotonic()
+        self.lag_timer.start(self.lag_interval)
+
+    def stop(self):
+        self.send_timer.stop()
+        self.lag_timer.stop()
+        self.net_manager.stop()
+
+    def measure_lag(self):
+        now = time.monotonic()
+        lag = (now - self.lag_last) * 1000.0 - self.lag_interval
+        self.lag_last = now
+        if lag > self.max_loop_lag_ms:
+            self.max_loop_lag_ms = lag
+
+    def send_controller_data(self):
+        # Same layout as DriveStationWindow.get_controller_data (6 axes, 11 buttons, 1 dpad)
+        self.__seq += 1
+        axis = (self.__seq * 512) % 65536 - 32768
+        for num in range(self.args.controllers):
+            data = bytearray([num, 6, 11, 1])
+            for _ in range(6):
+                data.extend(axis.to_bytes(length=2, byteorder='big', signed=True))
+            data.extend(b'\x00\x00\x00\n')
+            self.net_manager.send_controller_data(bytes(data))
+            if self.net_manager.current_state in [NetworkManager.State.Disabled, NetworkManager.State.Enabled]:
+                self.controller_packets_sent += 1
+
+    def nt_data_changed(self, key: str, value: str):
+        self.nt_updates += 1
+        if key.startswith("load"):
+            try:
+                self.nt_latencies_ms.append((time.monotonic_ns() - int(value)) / 1e6)
+            except ValueError:
+                pass
+
+    def state_changed(self, state: NetworkManager.State):
+        if state == NetworkManager.State.Disabled:
+            self.reconnects += 1
+
+    def sync_started(self):
+        self.__sync_start = time.monotonic()
+
+    def sync_finished(self):
+        if self.__sync_start != 0.0:
+            self.sync_durations_ms.append((time.monotonic() - self.__sync_start) * 1000.0)
+            self.__sync_start = 0.0
+
+    def report(self, duration: float) -> Dict[str, Any]:
+        def percentile(values: List[float], pct: float) -> float:
+            if len(values) == 0:
+                return 0.0
+            ordered = sorted(values)
+            return ordered[min(int(len(ordered) * pct), len(ordered) - 1)]
+
+        return {
+            "duration_s": duration,
+            "controller_packets_sent": self.controller_packets_sent,
+            "nt_updates_received": self.nt_updates,
+            "nt_updates_per_s": self.nt_updates / duration,
+            "nt_latency_ms_p50": percentile(self.nt_latencies_ms, 0.5),
+            "nt_latency_ms_p95": percentile(self.nt_latencies_ms, 0.95),
+            "nt_latency_ms_max": max(self.nt_latencies_ms) if len(self.nt_latencies_ms) > 0 else 0.0,
+            "log_lines_received": self.sink.robot_lines,
+            "log_lines_per_s": self.sink.robot_lines / duration,
+            "connects": self.reconnects,
+            "nt_binary": self.net_manager.nt_is_binary,
+            "sync_ms_max": max(self.sync_durations_ms) if len(self.sync_durations_ms) > 0 else 0.0,
+            "event_loop_lag_ms_max": self.max_loop_lag_ms,
+        }
+
+
+def main(argv: List[str]) -> int:
+    robot_args: List[str] = []
+    if "--" in argv:
+        robot_args = argv[argv.index("--") + 1:]
+        argv = argv[0:argv.index("--")]
+
+    parser = argparse.ArgumentParser(description="Drive station load test against the mock robot")
+    parser.add_argument("--address", default="127.0.0.1")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--controllers", type=int, default=1, help="Number of controllers to send data for")
+    parser.add_argument("--send-interval", type=int, default=20, help="Controller send interval (ms)")
+    parser.add_argument("--nt-rate", type=float, default=100.0)
+    parser.add_argument("--log-rate", type=float, default=50.0)
+    parser.add_argument("--sync-size", type=int, default=100)
+    parser.add_argument("--binary-nt", action="store_true", help="Request the binary net table protocol")
+    parser.add_argument("--network-thread", action="store_true", help="Run the network manager on its own thread")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args(argv)
+
+    report_fd, report_path = tempfile.mkstemp(suffix=".json")
+    os.close(report_fd)
+
+    robot = subprocess.Popen([
+        sys.executable, os.path.join(script_dir, "mock_robot.py"),
+        "--address", args.address,
+        "--duration", str(args.duration + 2),
+        "--report-interval", "0",
+        "--report-file", report_path,
+        "--nt-rate", str(args.nt_rate),
+        "--log-rate", str(args.log_rate),
+        "--sync-size", str(args.sync_size),
+        *robot_args
+    ], stdout=subprocess.DEVNULL)
+
+    app = QCoreApplication([])
+    test = LoadTest(args)
+
+    # Give the mock robot time to start listening
+    QTimer.singleShot(500, test.start)
+    QTimer.singleShot(int(args.duration * 1000) + 500, app.quit)
+    app.exec()
+    test.stop()
+
+    robot.wait()
+    with open(report_path, "r") as report_file:
+        robot_report = json.load(report_file)
+    os.remove(report_path)
+
+    report = {
+        "drive_station": test.report(args.duration),
+        "robot": robot_report
+    }
+    sent = report["drive_station"]["controller_packets_sent"]
+    if sent > 0:
+        report["controller_packet_loss"] = 1.0 - robot_report["controller_packets"] / sent
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
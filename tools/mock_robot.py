@@ -0,0 +1,511 @@
+"""
+Mock robot program used to exercise the drive station without real robot hardware.
+
+Implements the four ports described in src/network.py (controller, command, net table and log)
+and can generate configurable load (net table updates, log floods, large syncs and abrupt
+disconnects). Everything received from the drive station is counted and reported so drive
+station throughput, latency and stability can be measured on loopback.
+
+Usage:
+    python tools/mock_robot.py [--nt-rate N] [--log-rate N] [--sync-size N] ...
+    python tools/mock_robot.py --scenario scenario.json
+
+A scenario file is a JSON list of phases. Each phase runs for "duration" seconds and may set any
+of the load options (using the option names with underscores, eg "nt_rate"). A phase with
+"disconnect": true abruptly drops all drive station connections when it starts.
+    [
+        {"duration": 10, "nt_rate": 100},
+        {"duration": 1, "disconnect": true},
+        {"duration": 10, "nt_rate": 1000, "log_rate": 500}
+    ]
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import signal
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from PySide6.QtCore import QCoreApplication, QObject, QTimer, Qt
+from PySide6.QtNetwork import QAbstractSocket, QHostAddress, QTcpServer, QTcpSocket, QUdpSocket
+
+# Binary net table protocol implementation is shared with the drive station
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "src"))
+from nt_protocol import NtBinaryDecoder, NtBinaryEncoder, NT_BINARY_ACK, FRAME_SYNC_STOP
+
+
+class LoadConfig:
+    """
+    Load generated by the mock robot. Rates are per second.
+    """
+    def __init__(self):
+        self.nt_rate: float = 0.0           # Net table updates sent to the DS
+        self.nt_keys: int = 10              # Number of distinct keys the updates cycle through
+        self.log_rate: float = 0.0          # Log lines sent to the DS
+        self.log_line_size: int = 80        # Approximate length of each generated log line
+        self.sync_size: int = 0             # Extra static keys sent during each net table sync
+        self.vbat_rate: float = 1.0         # vbat0 updates sent to the DS
+        self.disconnect: bool = False       # Abruptly drop connections when phase starts
+
+    def update(self, values: Dict[str, Any]):
+        for key, value in values.items():
+            if key == "duration":
+                continue
+            if not hasattr(self, key):
+                raise ValueError(f"Unknown load option '{key}'")
+            setattr(self, key, type(getattr(self, key))(value))
+
+
+class MockRobot(QObject):
+
+    # Must match NetworkManager
+    CMD_ENABLE = b'ENABLE'
+    CMD_DISABLE = b'DISABLE'
+    CMD_NT_SYNC = b'NT_SYNC'
+    CMD_NT_BINARY = b'NT_BINARY'
+    CMD_UDP_DISABLE = b'UDP_DISABLE '
+    UDP_DISABLE_MARKER = 0xFF
+    UDP_DISABLE_ACK = b'\xff\xfd\n'
+
+    NT_SYNC_START_DATA = b'\xff\xff\n'
+    NT_SYNC_STOP_DATA = b'\xff\xff\xff\n'
+
+    # How often load is generated
+    TICK_INTERVAL = 5
+
+    def __init__(self, address: str = "127.0.0.1", port_base: int = 8090, binary_supported: bool = True,
+                 udp_disable_supported: bool = True):
+        super().__init__()
+        self.address = address
+        self.port_base = port_base
+        self.binary_supported = binary_supported
+        self.udp_disable_supported = udp_disable_supported
+        self.udp_disable_token: Optional[bytes] = None
+        self.load = LoadConfig()
+        self.enabled = False
+        self.net_table: Dict[str, str] = {}
+
+        self.__syncing = False
+        self.__sync_start_time = 0.0
+        self.__sync_received = 0
+        self.__nt_seq = 0
+        self.__log_seq = 0
+        self.__nt_debt = 0.0
+        self.__log_debt = 0.0
+        self.__vbat_debt = 0.0
+        self.__last_tick = time.monotonic()
+        self.__last_packet_time: Dict[int, float] = {}
+
+        self.__cmd_read_buf = bytearray()
+        self.__nt_read_buf = bytearray()
+
+        # Binary net table protocol state (per connection, separate for each direction)
+        self.__nt_send_binary = False
+        self.__nt_recv_binary = False
+        self.__nt_encoder = NtBinaryEncoder()
+        self.__nt_decoder = NtBinaryDecoder()
+
+        self.stats: Dict[str, Any] = {
+            "connections": 0,
+            "forced_disconnects": 0,
+            "commands": {},
+            "controller_packets": 0,
+            "controller_bytes": 0,
+            "controller_malformed": 0,
+            "controller_per_num": {},
+            "controller_interval_max_ms": 0.0,
+            "nt_frames_received": 0,
+            "nt_bytes_received": 0,
+            "nt_frames_sent": 0,
+            "nt_bytes_sent": 0,
+            "log_lines_sent": 0,
+            "log_bytes_sent": 0,
+            "binary_nt_connections": 0,
+            "udp_disables": 0,
+            "udp_disables_rejected": 0,
+            "syncs": 0,
+            "sync_durations_ms": [],
+        }
+
+        # Servers and client sockets
+        self.__cmd_server = QTcpServer(self)
+        self.__nt_server = QTcpServer(self)
+        self.__log_server = QTcpServer(self)
+        self.__cmd_client: Optional[QTcpSocket] = None
+        self.__nt_client: Optional[QTcpSocket] = None
+        self.__log_client: Optional[QTcpSocket] = None
+        self.__controller_socket = QUdpSocket(self)
+
+        self.__cmd_server.newConnection.connect(self.__cmd_new_connection)
+        self.__nt_server.newConnection.connect(self.__nt_new_connection)
+        self.__log_server.newConnection.connect(self.__log_new_connection)
+        self.__controller_socket.readyRead.connect(self.__controller_ready_read)
+
+        self.__tick_timer = QTimer(self)
+        self.__tick_timer.setTimerType(Qt.PreciseTimer)
+        self.__tick_timer.timeout.connect(self.__tick)
+
+    def start(self) -> bool:
+        addr = QHostAddress(self.address)
+        ok = self.__controller_socket.bind(addr, self.port_base)
+        ok = self.__cmd_server.listen(addr, self.port_base + 1) and ok
+        ok = self.__nt_server.listen(addr, self.port_base + 2) and ok
+        ok = self.__log_server.listen(addr, self.port_base + 3) and ok
+        if ok:
+            self.__tick_timer.start(self.TICK_INTERVAL)
+        return ok
+
+    def stop(self):
+        self.__tick_timer.stop()
+        for client in [self.__cmd_client, self.__nt_client, self.__log_client]:
+            if client is not None:
+                client.abort()
+
+    def set_load(self, values: Dict[str, Any]):
+        self.load = LoadConfig()
+        self.load.update(values)
+        if self.load.disconnect:
+            self.drop_connections()
+
+    def drop_connections(self):
+        # Abrupt disconnect (no clean shutdown) of every DS connection
+        self.stats["forced_disconnects"] += 1
+        self.enabled = False
+        self.__syncing = False
+        for client in [self.__cmd_client, self.__nt_client, self.__log_client]:
+            if client is not None:
+                client.abort()
+
+    def report(self) -> Dict[str, Any]:
+        rep = dict(self.stats)
+        durations = rep.pop("sync_durations_ms")
+        rep["sync_ms_max"] = max(durations) if len(durations) > 0 else 0.0
+        rep["sync_ms_avg"] = sum(durations) / len(durations) if len(durations) > 0 else 0.0
+        return rep
+
+    ############################################################################
+    # Connections
+    ############################################################################
+
+    def __take_client(self, server: QTcpServer, old: Optional[QTcpSocket]) -> QTcpSocket:
+        # Only one DS at a time. A new connection replaces the old one.
+        if old is not None:
+            old.abort()
+            old.deleteLater()
+        client = server.nextPendingConnection()
+        client.setSocketOption(QAbstractSocket.LowDelayOption, 1)
+        self.stats["connections"] += 1
+        return client
+
+    def __cmd_new_connection(self):
+        self.__cmd_client = self.__take_client(self.__cmd_server, self.__cmd_client)
+        self.__cmd_client.readyRead.connect(self.__cmd_ready_read)
+        self.__cmd_read_buf = bytearray()
+
+    def __nt_new_connection(self):
+        self.__nt_client = self.__take_client(self.__nt_server, self.__nt_client)
+        self.__nt_client.readyRead.connect(self.__nt_ready_read)
+        self.__nt_read_buf = bytearray()
+        self.__nt_send_binary = False
+        self.__nt_recv_binary = False
+        self.__syncing = False
+        self.enabled = False
+
+    def __log_new_connection(self):
+        self.__log_client = self.__take_client(self.__log_server, self.__log_client)
+
+    def __is_connected(self, client: Optional[QTcpSocket]) -> bool:
+        return client is not None and client.state() == QAbstractSocket.SocketState.ConnectedState
+
+    ############################################################################
+    # Incoming data
+    ############################################################################
+
+    def __cmd_ready_read(self):
+        self.__cmd_read_buf.extend(bytes(self.__cmd_client.readAll()))
+        while True:
+            end_pos = self.__cmd_read_buf.find(b'\n')
+            if end_pos == -1:
+                break
+            cmd = bytes(self.__cmd_read_buf[0:end_pos])
+            del self.__cmd_read_buf[0:end_pos + 1]
+            self.__handle_command(cmd)
+
+    def __handle_command(self, cmd: bytes):
+        name = cmd.decode(errors="replace").split(" ")[0]
+        self.stats["commands"][name] = self.stats["commands"].get(name, 0) + 1
+        if cmd == self.CMD_ENABLE:
+            self.enabled = True
+            self.__send_nt("robotstate", "ENABLED")
+        elif cmd == self.CMD_DISABLE:
+            self.enabled = False
+            self.__send_nt("robotstate", "DISABLED")
+        elif cmd == self.CMD_NT_SYNC:
+            self.__start_sync()
+        elif cmd == self.CMD_NT_BINARY and self.binary_supported and self.__is_connected(self.__nt_client):
+            # Acknowledge then send binary from now on
+            self.__send_nt_raw(NT_BINARY_ACK)
+            self.__nt_send_binary = True
+            self.__nt_encoder = NtBinaryEncoder()
+            self.stats["binary_nt_connections"] += 1
+        elif cmd.startswith(self.CMD_UDP_DISABLE) and self.udp_disable_supported and self.__is_connected(self.__nt_client):
+            try:
+                self.udp_disable_token = bytes.fromhex(cmd[len(self.CMD_UDP_DISABLE):].decode())
+            except ValueError:
+                return
+            self.__send_nt_raw(self.__nt_encoder.udp_disable_ack() if self.__nt_send_binary else self.UDP_DISABLE_ACK)
+
+    def __nt_ready_read(self):
+        data = bytes(self.__nt_client.readAll())
+        self.stats["nt_bytes_received"] += len(data)
+        if self.__nt_recv_binary:
+            self.__nt_binary_received(data)
+            return
+        self.__nt_read_buf.extend(data)
+        while True:
+            end_pos = self.__nt_read_buf.find(b'\n')
+            if end_pos == -1:
+                break
+            frame = bytes(self.__nt_read_buf[0:end_pos + 1])
+            del self.__nt_read_buf[0:end_pos + 1]
+            if frame == self.NT_SYNC_STOP_DATA:
+                self.__finish_sync()
+                continue
+            if frame == NT_BINARY_ACK:
+                # DS sends binary after this
+                self.__nt_recv_binary = True
+                self.__nt_decoder = NtBinaryDecoder()
+                remaining = bytes(self.__nt_read_buf)
+                self.__nt_read_buf = bytearray()
+                self.__nt_binary_received(remaining)
+                return
+            delim_pos = frame.find(b'\xff')
+            if delim_pos > -1:
+                self.__nt_received(frame[0:delim_pos].decode(), frame[delim_pos + 1:-1].decode())
+
+    def __nt_binary_received(self, data: bytes):
+        for frame_type, key, value in self.__nt_decoder.feed(data):
+            if frame_type == FRAME_SYNC_STOP:
+                self.__finish_sync()
+            elif key != "":
+                self.__nt_received(key, value)
+
+    def __nt_received(self, key: str, value: str):
+        self.stats["nt_frames_received"] += 1
+        self.net_table[key] = value
+        if self.__syncing:
+            self.__sync_received += 1
+
+    def __controller_ready_read(self):
+        while self.__controller_socket.hasPendingDatagrams():
+            datagram = self.__controller_socket.receiveDatagram()
+            data = bytes(datagram.data())
+            if len(data) > 0 and data[0] == self.UDP_DISABLE_MARKER:
+                # Disable from the DS on the controller port. Only accepted with this connection's token.
+                if self.udp_disable_token is not None and data == bytes([self.UDP_DISABLE_MARKER]) + self.udp_disable_token + b'\n':
+                    self.stats["udp_disables"] += 1
+                    if self.enabled:
+                        self.enabled = False
+                        self.__send_nt("robotstate", "DISABLED")
+                else:
+                    self.stats["udp_disables_rejected"] += 1
+                continue
+            self.stats["controller_packets"] += 1
+            self.stats["controller_bytes"] += len(data)
+            if len(data) < 5:
+                self.stats["controller_malformed"] += 1
+                continue
+            num, axes, buttons, dpads = data[0], data[1], data[2], data[3]
+            expected = 4 + 2 * axes + math.ceil(buttons / 8.0) + math.ceil(dpads / 2.0) + 1
+            if len(data) != expected or data[-1] != ord('\n'):
+                self.stats["controller_malformed"] += 1
+                continue
+            per_num = self.stats["controller_per_num"]
+            per_num[num] = per_num.get(num, 0) + 1
+
+            # Track the largest gap between packets for the same controller
+            now = time.monotonic()
+            if num in self.__last_packet_time:
+                gap = (now - self.__last_packet_time[num]) * 1000.0
+                if gap > self.stats["controller_interval_max_ms"]:
+                    self.stats["controller_interval_max_ms"] = gap
+            self.__last_packet_time[num] = now
+
+    ############################################################################
+    # Net table sync
+    ############################################################################
+
+    def __start_sync(self):
+        if not self.__is_connected(self.__nt_client):
+            return
+        self.__syncing = True
+        self.__sync_received = 0
+        self.__sync_start_time = time.monotonic()
+        for i in range(self.load.sync_size):
+            self.net_table[f"sync{i}"] = str(i)
+        self.__send_nt_raw(self.__nt_encoder.sync_start() if self.__nt_send_binary else self.NT_SYNC_START_DATA)
+        for key, value in self.net_table.items():
+            self.__send_nt(key, value)
+        self.__send_nt_raw(self.__nt_encoder.sync_stop() if self.__nt_send_binary else self.NT_SYNC_STOP_DATA)
+
+    def __finish_sync(self):
+        if not self.__syncing:
+            return
+        self.__syncing = False
+        self.stats["syncs"] += 1
+        self.stats["sync_durations_ms"].append((time.monotonic() - self.__sync_start_time) * 1000.0)
+        self.__send_nt("robotstate", "ENABLED" if self.enabled else "DISABLED")
+
+    ############################################################################
+    # Outgoing data
+    ############################################################################
+
+    def __send_nt_raw(self, data: bytes):
+        if self.__is_connected(self.__nt_client):
+            self.__nt_client.write(data)
+            self.stats["nt_bytes_sent"] += len(data)
+
+    def __send_nt(self, key: str, value: str):
+        if self.__is_connected(self.__nt_client):
+            if self.__nt_send_binary:
+                self.__send_nt_raw(self.__nt_encoder.set(key, value))
+            else:
+                self.__send_nt_raw(key.encode() + b'\xff' + value.encode() + b'\n')
+            self.stats["nt_frames_sent"] += 1
+
+    def __send_log(self, line: str):
+        if self.__is_connected(self.__log_client):
+            data = line.encode() + b'\n'
+            self.__log_client.write(data)
+            self.stats["log_lines_sent"] += 1
+            self.stats["log_bytes_sent"] += len(data)
+
+    def __tick(self):
+        now = time.monotonic()
+        elapsed = now - self.__last_tick
+        self.__last_tick = now
+
+        # Don't generate data while the DS is syncing (the robot's table is locked)
+        if self.__syncing:
+            return
+
+        # Accumulate fractional amounts so low rates still produce output
+        self.__nt_debt += self.load.nt_rate * elapsed
+        self.__log_debt += self.load.log_rate * elapsed
+        self.__vbat_debt += self.load.vbat_rate * elapsed
+
+        while self.__nt_debt >= 1.0:
+            self.__nt_debt -= 1.0
+            key = f"load{self.__nt_seq % max(self.load.nt_keys, 1)}"
+            self.__nt_seq += 1
+            # Value is a monotonic timestamp so the receiver can measure latency on loopback
+            value = str(time.monotonic_ns())
+            self.net_table[key] = value
+            self.__send_nt(key, value)
+
+        while self.__log_debt >= 1.0:
+            self.__log_debt -= 1.0
+            prefix = f"[INFO]: {self.__log_seq} "
+            self.__log_seq += 1
+            self.__send_log(prefix + "x" * max(self.load.log_line_size - len(prefix), 0))
+
+        while self.__vbat_debt >= 1.0:
+            self.__vbat_debt -= 1.0
+            value = "{:.2f}".format(7.5 + random.uniform(-0.5, 0.5))
+            self.net_table["vbat0"] = value
+            self.__send_nt("vbat0", value)
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    defaults = LoadConfig()
+    parser = argparse.ArgumentParser(description="Mock robot for drive station testing")
+    parser.add_argument("--address", default="127.0.0.1", help="Address to listen on")
+    parser.add_argument("--port-base", type=int, default=8090, help="Controller port. Other ports follow it.")
+    parser.add_argument("--duration", type=float, default=0.0, help="Exit after this many seconds (0 = run forever)")
+    parser.add_argument("--scenario", default="", help="JSON file describing load phases")
+    parser.add_argument("--report-interval", type=float, default=5.0, help="Seconds between printed reports (0 = never)")
+    parser.add_argument("--report-file", default="", help="Write final report to this JSON file")
+    parser.add_argument("--nt-rate", type=float, default=defaults.nt_rate)
+    parser.add_argument("--nt-keys", type=int, default=defaults.nt_keys)
+    parser.add_argument("--log-rate", type=float, default=defaults.log_rate)
+    parser.add_argument("--log-line-size", type=int, default=defaults.log_line_size)
+    parser.add_argument("--sync-size", type=int, default=defaults.sync_size)
+    parser.add_argument("--vbat-rate", type=float, default=defaults.vbat_rate)
+    parser.add_argument("--no-binary", action="store_true", help="Act like a robot without binary net table support")
+    parser.add_argument("--no-udp-disable", action="store_true", help="Act like a robot without controller port disable support")
+    parser.add_argument("--disconnect-every", type=float, default=0.0, help="Drop connections every N seconds")
+    return parser.parse_args(argv)
+
+
+def main(argv: List[str]) -> int:
+    args = parse_args(argv)
+    app = QCoreApplication([])
+
+    robot = MockRobot(args.address, args.port_base, not args.no_binary, not args.no_udp_disable)
+    if not robot.start():
+        print(f"Unable to listen on {args.address} ports {args.port_base}-{args.port_base + 3}", file=sys.stderr)
+        return 1
+    print(f"Mock robot listening on {args.address} ports {args.port_base}-{args.port_base + 3}")
+
+    # Phases either come from a scenario file or from the command line
+    if args.scenario != "":
+        with open(args.scenario, "r") as scenario_file:
+            phases: List[Dict[str, Any]] = json.load(scenario_file)
+    else:
+        phases = [{
+            "nt_rate": args.nt_rate,
+            "nt_keys": args.nt_keys,
+            "log_rate": args.log_rate,
+            "log_line_size": args.log_line_size,
+            "sync_size": args.sync_size,
+            "vbat_rate": args.vbat_rate,
+        }]
+
+    def run_phase(idx: int):
+        if idx >= len(phases):
+            if args.scenario != "" and args.duration == 0:
+                app.quit()
+            return
+        phase = phases[idx]
+        robot.set_load(phase)
+        print(f"Phase {idx}: {json.dumps(phase)}")
+        if phase.get("duration", 0) > 0:
+            QTimer.singleShot(int(phase["duration"] * 1000), lambda: run_phase(idx + 1))
+    run_phase(0)
+
+    if args.disconnect_every > 0:
+        disconnect_timer = QTimer(app)
+        disconnect_timer.timeout.connect(robot.drop_connections)
+        disconnect_timer.start(int(args.disconnect_every * 1000))
+
+    if args.report_interval > 0:
+        report_timer = QTimer(app)
+        report_timer.timeout.connect(lambda: print(json.dumps(robot.report())))
+        report_timer.start(int(args.report_interval * 1000))
+
+    if args.duration > 0:
+        QTimer.singleShot(int(args.duration * 1000), app.quit)
+
+    # Allow Ctrl+C to stop the mock robot (python signal handlers only run when python code runs)
+    signal.signal(signal.SIGINT, lambda *_: app.quit())
+    interrupt_timer = QTimer(app)
+    interrupt_timer.timeout.connect(lambda: None)
+    interrupt_timer.start(200)
+
+    app.exec()
+    robot.stop()
+
+    report = robot.report()
+    print(json.dumps(report, indent=2))
+    if args.report_file != "":
+        with open(args.report_file, "w") as report_out:
+            json.dump(report, report_out, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,163 @@
+"""
+Drive station soak test with virtual controllers.
+
+Runs the full drive station (session manager, window, network manager) with scripted virtual
+controllers (src/virtual_gamepad.py) against the mock robot (tools/mock_robot.py) on loopback.
+No controller hardware or display is needed. All controllers are selected and the robot is
+enabled once connected. At the end a report of input events, controller packets sent and
+received, packet loss, input latency, event loop stalls and memory use is printed.
+
+Settings and files are written to a temporary home directory (the user's settings are not used).
+Without --show the window is not visible (offscreen platform).
+Note: NetworkManager pings the robot before connecting, so a ping command must be available.
+
+Usage:
+    python tools/soak_test.py --duration 600 --devices 4 --input-rate 1000 --replug-every 5
+    python tools/soak_test.py --script my_script.json
+Arguments after "--" are passed to the mock robot unchanged.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+sys.path.insert(0, os.path.join(script_dir, "..", "src"))
+
+
+def memory_mb() -> float:
+    # Peak resident memory (0 if not available on this platform)
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kB on Linux, bytes on macOS
+    return rss / (1024.0 * 1024.0) if sys.platform == "darwin" else rss / 1024.0
+
+
+def main(argv: List[str]) -> int:
+    robot_args: List[str] = []
+    if "--" in argv:
+        robot_args = argv[argv.index("--") + 1:]
+        argv = argv[0:argv.index("--")]
+
+    parser = argparse.ArgumentParser(description="Drive station soak test with virtual controllers")
+    parser.add_argument("--address", default="127.0.0.1")
+    parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--devices", type=int, default=2, help="Number of virtual controllers")
+    parser.add_argument("--input-rate", type=float, default=1000.0, help="Input events per second per controller (at most 1000)")
+    parser.add_argument("--replug-every", type=float, default=0.0, help="Unplug and replug controller 0 every N seconds")
+    parser.add_argument("--script", default="", help="Virtual controller script (replaces --devices, --input-rate and --replug-every)")
+    parser.add_argument("--network-thread", action="store_true", help="Run the network manager on its own thread")
+    parser.add_argument("--show", action="store_true", help="Show the drive station window")
+    args = parser.parse_args(argv)
+
+    # Settings are read when the drive station modules are imported
+    home = tempfile.mkdtemp(prefix="ds-soak-")
+    os.environ["HOME"] = home
+    os.environ["USERPROFILE"] = home
+    os.makedirs(os.path.join(home, ".arpirobot"))
+    with open(os.path.join(home, ".arpirobot", "drivestation.ini"), "w") as settings_file:
+        settings_file.write("[General]\n")
+        settings_file.write(f"robot-address={args.address}\n")
+        settings_file.write(f"network-thread={'true' if args.network_thread else 'false'}\n")
+        settings_file.write("metrics-file=false\n")
+    if not args.show:
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    from PySide6.QtCore import QTimer, Qt
+    from PySide6.QtWidgets import QApplication
+
+    from diagnostics import input_latency
+    from metrics import metrics
+    from network import NetworkManager
+    from sessions import SessionManager
+    from virtual_gamepad import VirtualGamepadManager
+
+    if args.script != "":
+        script = VirtualGamepadManager.load_script(args.script)
+    else:
+        if args.replug_every > 0:
+            # Controller 0 is unplugged for a quarter of each period
+            period = args.replug_every * 1000.0
+            script = VirtualGamepadManager.sweep_script(args.devices, args.input_rate, period)
+            script["events"].append({"t": period * 0.5, "device": 0, "unplug": True})
+            script["events"].append({"t": period * 0.75, "device": 0, "plug": True})
+        else:
+            script = VirtualGamepadManager.sweep_script(args.devices, args.input_rate)
+
+    report_fd, report_path = tempfile.mkstemp(suffix=".json")
+    os.close(report_fd)
+    robot = subprocess.Popen([
+        sys.executable, os.path.join(script_dir, "mock_robot.py"),
+        "--address", args.address,
+        "--duration", str(args.duration + 4),
+        "--report-interval", "0",
+        "--report-file", report_path,
+        *robot_args
+    ], stdout=subprocess.DEVNULL)
+
+    app = QApplication([])
+    backend = VirtualGamepadManager(script)
+    session_manager = SessionManager(backend)
+    ds = session_manager.start()
+    ds.show()
+
+    # Select every controller (slots are kept while a controller is unplugged)
+    controllers = ds.controllers
+    for row in range(controllers.rowCount()):
+        controllers.setData(controllers.index(row), Qt.Checked, Qt.CheckStateRole)
+
+    enabled = []
+    def state_changed(state):
+        if state == NetworkManager.State.Disabled and len(enabled) == 0:
+            enabled.append(True)
+            ds.enable_clicked()
+    ds.net_manager.state_changed.connect(state_changed)
+
+    QTimer.singleShot(int(args.duration * 1000) + 1000, ds.close)
+    ds.closed.connect(app.quit)
+    app.exec()
+
+    robot.wait()
+    with open(report_path, "r") as report_file:
+        robot_report = json.load(report_file)
+    os.remove(report_path)
+
+    values = metrics.values()
+    def metric(name: str, labels: str = "") -> float:
+        # Sum over all series of a metric (with the given label if any)
+        return sum(value for key, value in values.items() if key.split("{", 1)[0] == name and labels in key)
+
+    latency = input_latency.event_to_sent
+    report: Dict[str, Any] = {
+        "drive_station": {
+            "duration_s": args.duration,
+            "input_events": backend.events_applied,
+            "controller_packets_sent": metric("ds_packets_sent_total", 'port="controller"'),
+            "input_latency_ms_avg": latency.avg_ms,
+            "input_latency_ms_p50": latency.percentile(0.5),
+            "input_latency_ms_p95": latency.percentile(0.95),
+            "input_latency_ms_p99": latency.percentile(0.99),
+            "input_latency_ms_max": latency.max_ms,
+            "event_loop_stalls": metric("ds_event_loop_stalls_total"),
+            "event_loop_stall_max_ms": metric("ds_event_loop_stall_max_ms"),
+            "watchdog_trips": metric("ds_watchdog_trips_total"),
+            "peak_memory_mb": memory_mb(),
+        },
+        "robot": robot_report
+    }
+    sent = report["drive_station"]["controller_packets_sent"]
+    if sent > 0:
+        report["controller_packet_loss"] = 1.0 - robot_report["controller_packets"] / sent
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
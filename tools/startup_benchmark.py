@@ -0,0 +1,106 @@
+"""
+Drive station startup benchmark.
+
+Starts the drive station several times and reports the time from launch until the main window is
+shown and the resident memory at that point. Each profile is a command that starts the drive station
+(eg the source tree or a bundle built by packaging/). The drive station exits as soon as its window is
+shown (it writes a report to the file named by the ARPIROBOT_STARTUP_REPORT environment variable).
+
+The first run of each profile is reported separately since it is closest to a cold start (files not
+yet in the OS cache). For a true cold start, clear the OS file cache before running (or reboot).
+
+Settings are written to a temporary home directory (the user's settings are not used).
+
+Usage:
+    python tools/startup_benchmark.py
+    python tools/startup_benchmark.py --runs 10 \\
+        --profile standard=packaging/windows/dist/standard/ArPiRobot-DriveStation/ArPiRobot-DriveStation.exe \\
+        --profile startup=packaging/windows/dist/startup/ArPiRobot-DriveStation/ArPiRobot-DriveStation.exe
+"""
+
+import argparse
+import json
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Tuple
+
+script_dir = os.path.dirname(os.path.realpath(__file__))
+
+
+def run_once(command: List[str], env: Dict[str, str], timeout: float) -> Optional[Tuple[float, float]]:
+    # Returns (seconds until the window was shown, resident memory MB) or None on failure
+    report_fd, report_path = tempfile.mkstemp(suffix=".json")
+    os.close(report_fd)
+    os.remove(report_path)
+    env = dict(env, ARPIROBOT_STARTUP_REPORT=report_path)
+    start = time.time()
+    try:
+        proc = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except OSError as e:
+        print(f"Unable to start {command}: {e}", file=sys.stderr)
+        return None
+    try:
+        proc.wait(timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+        print(f"{command} did not show its window within {timeout} s", file=sys.stderr)
+        return None
+    try:
+        with open(report_path, "r") as report_file:
+            report = json.load(report_file)
+        os.remove(report_path)
+    except (OSError, ValueError):
+        print(f"{command} exited without a startup report (exit code {proc.returncode})", file=sys.stderr)
+        return None
+    return report["window_shown"] - start, report["rss_kb"] / 1024.0
+
+
+def main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="Drive station startup time and memory")
+    parser.add_argument("--runs", type=int, default=5, help="Starts per profile")
+    parser.add_argument("--profile", action="append", default=[], metavar="NAME=COMMAND",
+                        help="Command to start the drive station (may be given more than once). Default: the source tree.")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for the window")
+    args = parser.parse_args(argv)
+
+    profiles: List[Tuple[str, List[str]]] = []
+    for profile in args.profile:
+        if "=" not in profile:
+            parser.error(f"Profile must be NAME=COMMAND: {profile}")
+        name, command = profile.split("=", 1)
+        profiles.append((name, shlex.split(command, posix=os.name != "nt")))
+    if len(profiles) == 0:
+        profiles.append(("source", [sys.executable, os.path.join(script_dir, "..", "src", "main.py")]))
+
+    home = tempfile.mkdtemp(prefix="ds-startup-")
+    env = dict(os.environ, HOME=home, USERPROFILE=home)
+
+    results = {}
+    for name, command in profiles:
+        times: List[float] = []
+        memory: List[float] = []
+        for _ in range(args.runs):
+            result = run_once(command, env, args.timeout)
+            if result is None:
+                break
+            times.append(result[0])
+            memory.append(result[1])
+        if len(times) == 0:
+            return 1
+        results[name] = (times, memory)
+
+    print(f"{'profile':<12} {'first run':>10} {'median':>10} {'min':>10} {'max':>10} {'memory':>10}")
+    for name, (times, memory) in results.items():
+        print(f"{name:<12} {times[0]:>9.3f}s {statistics.median(times):>9.3f}s {min(times):>9.3f}s "
+              f"{max(times):>9.3f}s {statistics.median(memory):>7.1f} MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))